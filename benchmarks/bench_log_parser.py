@@ -0,0 +1,58 @@
+"""
+Times the byte-level log.txt parser against the legacy line by line parser
+on generated logs.
+
+    python -m benchmarks.bench_log_parser [draw count] [repeats]
+"""
+
+import sys
+import time
+import tempfile
+
+from pathlib import Path
+
+from gui_collect.backend.analysis.log_parser import parse_log_file
+
+from tests.log_generator import generate_log
+from tests.test_log_parser import legacy_parse_frame_analysis_log_file
+
+
+def time_parse(parse, log_path: Path, repeats: int):
+    timings = []
+    for _ in range(repeats):
+        st = time.perf_counter()
+        parse(log_path)
+        timings.append(time.perf_counter() - st)
+    return min(timings)
+
+
+def main():
+    draw_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for crlf, non_ascii in [(False, False), (True, True)]:
+            log_path = Path(temp_dir, "log.txt")
+            generate_log(log_path, draw_count, crlf=crlf, non_ascii=non_ascii)
+            size = log_path.stat().st_size
+
+            legacy_time = time_parse(
+                legacy_parse_frame_analysis_log_file, log_path, repeats
+            )
+            new_time = time_parse(parse_log_file, log_path, repeats)
+            print(
+                "{:>8} draw ids, {:6.1f} MiB, crlf={:d} non_ascii={:d}: "
+                "legacy {:.3f}s, new {:.3f}s ({:.1f}x)".format(
+                    draw_count,
+                    size / (1 << 20),
+                    crlf,
+                    non_ascii,
+                    legacy_time,
+                    new_time,
+                    legacy_time / new_time,
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Measures the memory the parsed log and the vb0 writer take with tracemalloc.
+
+- The draw calls of a generated log, parsed into the legacy nested dicts
+  and into DrawCall records.
+- A vb0 text written block by block to a file, and built as a whole
+  string first.
+
+    python -m benchmarks.bench_memory [draw count] [vertex count]
+"""
+
+import gc
+import sys
+import time
+import tempfile
+import tracemalloc
+
+from pathlib import Path
+
+from gui_collect.backend.analysis.log_parser import parse_log_file
+from gui_collect.backend.utils.buffer_utils.buffer_encoder import (
+    construct_combined_buffer,
+    merge_buffers,
+)
+
+from tests.log_generator import generate_log
+from tests.test_buffer_encoder import make_buffer
+from tests.test_log_parser import legacy_parse_frame_analysis_log_file
+
+
+def measure(name: str, function):
+    gc.collect()
+    tracemalloc.start()
+    st = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - st
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        "{:32} retained {:7.1f} MiB, peak {:7.1f} MiB, {:.2f}s".format(
+            name, retained / (1 << 20), peak / (1 << 20), elapsed
+        )
+    )
+    return result
+
+
+def main():
+    draw_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    vertex_count = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+
+        log_path = temp_path / "log.txt"
+        generate_log(log_path, draw_count, hash_count=2000)
+        print(
+            "log.txt: {} draw ids, {:.1f} MiB".format(
+                draw_count, log_path.stat().st_size / (1 << 20)
+            )
+        )
+        measure(
+            "legacy nested dicts",
+            lambda: legacy_parse_frame_analysis_log_file(log_path),
+        )
+        measure("DrawCall records", lambda: parse_log_file(log_path))
+
+        position, position_elements = make_buffer(
+            temp_path,
+            "position",
+            ["R32G32B32_FLOAT", "R32G32B32_FLOAT", "R32G32B32A32_FLOAT"],
+            vertex_count,
+        )
+        blend, blend_elements = make_buffer(
+            temp_path, "blend", ["R32G32B32A32_FLOAT", "R32G32B32A32_UINT"], vertex_count
+        )
+        texcoord, texcoord_elements = make_buffer(
+            temp_path,
+            "texcoord",
+            ["R8G8B8A8_UNORM", "R16G16_FLOAT", "R16G16_FLOAT"],
+            vertex_count,
+        )
+        merged = merge_buffers(
+            [position, blend, texcoord],
+            [position_elements, blend_elements, texcoord_elements],
+        )
+        print("vb0: {} vertices".format(vertex_count))
+
+        def write_whole_text():
+            text = construct_combined_buffer(merged.buffer_data, merged.buffer_elements)
+            (temp_path / "whole.txt").write_text(text)
+
+        def write_blocks():
+            with open(temp_path / "blocks.txt", "wb") as f:
+                merged.write(f)
+
+        measure("vb0 built as a whole string", write_whole_text)
+        measure("vb0 written block by block", write_blocks)
+
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,7 @@ from gui_collect.frontend.state import State
 from gui_collect.backend.config.Config import Config
 from gui_collect.backend.analysis import targeted_analysis
 from gui_collect.backend.utils.texture_utils.TextureManager import TextureManager
+from gui_collect.backend.utils.deletion_service import DeletionService
 
 
 logger = logging.getLogger()
@@ -59,7 +60,11 @@ class App(tk.Tk):
         )
 
         self.terminal = Terminal(parent=self.mt_paned_window)
-        logger.addHandler(get_terminal_logging_handler(self.terminal.print))
+        self.terminal_logging_handler = get_terminal_logging_handler(
+            self.terminal.print
+        )
+        logger.addHandler(self.terminal_logging_handler)
+        self.emit_pending_logs()
 
         self.main = Main(
             parent=self.mt_paned_window, active_page=self.state.active_page
@@ -69,6 +74,11 @@ class App(tk.Tk):
         self.mt_paned_window.add(self.main)
         self.mt_paned_window.add(self.terminal)
 
+    def emit_pending_logs(self):
+        # Records logged by worker threads wait for the Tk thread to print them
+        self.terminal_logging_handler.emit_pending()
+        self.after(100, self.emit_pending_logs)
+
     def grid_widgets(self):
         self.sidebar.grid(column=0, row=0, sticky="nsew")
         self.mt_paned_window.grid(column=1, row=0, sticky="nsew")
@@ -139,6 +149,21 @@ def main():
         app.iconbitmap(Path("./resources/images/icons/Fofo.ico"))
         app.title(f"GUI Collect v{version}")
         TextureManager(temp_dir)
+        # Finish deleting what the last session left in the trash, once the
+        # main loop runs and can print what the deletion threads log
+        app.after(
+            0,
+            DeletionService().reclaim_trash,
+            [
+                Path(parent_path)
+                for game_cfg in cfg.data.game.values()
+                for parent_path in [
+                    game_cfg.extract_path,
+                    game_cfg.frame_analysis_parent_path,
+                ]
+                if parent_path
+            ],
+        )
 
         app.mainloop()
     cfg.save_config()
@@ -1,36 +1,59 @@
 import os
+import io
 import json
 import time
-import shutil
 import logging
+import threading
 import traceback
 import subprocess
 
 from pathlib import Path
 from typing import List
+from concurrent.futures import ThreadPoolExecutor
 
-from gui_collect.backend.utils.buffer_utils.buffer_reader import get_buffer_elements
+from gui_collect.backend.utils.buffer_utils.buffer_reader import (
+    get_buffer_elements,
+    collect_text_index_buffer_data,
+    read_index_buffer_header,
+    resolve_buffer_strides,
+)
+from gui_collect.backend.utils.buffer_utils.buffer_decoder import (
+    INDEX_BUFFER_FORMATS,
+    collect_binary_index_buffer_data,
+    get_index_byte_width,
+    get_max_index,
+    split_index_buffer,
+)
 from gui_collect.backend.utils.buffer_utils.buffer_encoder import (
+    TOPOLOGY_LINE_SIZE,
+    MergedBuffer,
     merge_buffers,
     handle_no_weight_blend,
+    construct_buffer_format,
+    write_binary_index_buffer,
+    write_index_buffer,
 )
-from gui_collect.backend.utils.buffer_utils.buffer_decoder import (
-    collect_binary_buffer_data,
-)
+from gui_collect.backend.utils.buffer_utils.buffer_cache import DecodedBufferCache
 from gui_collect.backend.utils.buffer_utils.exceptions import InvalidTextBufferException
 from gui_collect.backend.utils.buffer_utils.structs import (
     BufferElement,
     POSITION_FMT,
-    POSITION_EXTRA_TANGENT_FMT,
-    BLEND_4VGX_FMT,
-    BLEND_2VGX_FMT,
-    BLEND_1VGX_FMT,
+    POSITION_FMT_BY_STRIDE,
+    BLEND_FMT_BY_STRIDE,
+)
+from gui_collect.backend.utils.deletion_service import DeletionService
+from gui_collect.backend.utils.file_utils import (
+    ArchiveExporter,
+    ExportManifest,
+    FileExporter,
+    get_files_fingerprint,
+    write_text,
 )
 
 from gui_collect.backend.config.Config import Config
 
 from .LogAnalysis import LogAnalysis
-from .JsonBuilder import JsonBuilder
+from .JsonBuilder import JsonBuilder, JsonComponent
 from .structs import Component
 
 from gui_collect.frontend.state import State
@@ -41,11 +64,13 @@ logger = logging.getLogger(__name__)
 
 
 class FrameAnalysis:
-    def __init__(self, frame_analysis_path: Path):
+    def __init__(self, frame_analysis_path: Path, target_hashes: list[str] = None):
         logger.info("Starting Frame Analysis: <PATH>%s</PATH>\n", frame_analysis_path)
         self.path = frame_analysis_path
-        self.log_analysis = LogAnalysis(self.path)
+        self.log_analysis = LogAnalysis(self.path, target_hashes)
         self.cfg = Config.get_instance().data
+        self.buffer_cache = DecodedBufferCache()
+        self.file_exporter = FileExporter()
 
     def extract(
         self,
@@ -71,9 +96,21 @@ class FrameAnalysis:
                 f" - {name}" if name else "",
             )
             try:
-                self.log_analysis.extract(
-                    c, target_hash, game=game, reverse_shapekeys=reverse_shapekeys
-                )
+                try:
+                    self.log_analysis.extract(
+                        c, target_hash, game=game, reverse_shapekeys=reverse_shapekeys
+                    )
+                except Exception:
+                    if not self.log_analysis.lazy:
+                        raise
+                    logger.warning(
+                        "Partial log analysis failed. Retrying with the whole log.txt."
+                    )
+                    self.log_analysis = LogAnalysis(self.path)
+                    c = Component(name=name, options=options)
+                    self.log_analysis.extract(
+                        c, target_hash, game=game, reverse_shapekeys=reverse_shapekeys
+                    )
                 c.print()
             except BufferError:
                 logger.error("Log Analysis Failed!")
@@ -114,9 +151,7 @@ class FrameAnalysis:
         if buffer_stride is None:
             buffer_elements = POSITION_FMT
         else:
-            buffer_elements = {40: POSITION_FMT, 56: POSITION_EXTRA_TANGENT_FMT}[
-                buffer_stride
-            ]
+            buffer_elements = POSITION_FMT_BY_STRIDE[buffer_stride]
 
         if txt_buffer_paths := [p for p in buffer_paths if p.suffix != ".buf"]:
             try:
@@ -132,7 +167,7 @@ class FrameAnalysis:
 
         buffer_path = buffer_paths[0].with_suffix(".buf")
         buffer_formats = [element.Format for element in buffer_elements]
-        buffer = collect_binary_buffer_data(
+        buffer = self.buffer_cache.collect_binary_buffer_data(
             buffer_path, buffer_formats, buffer_stride, **shapekey_args
         )
 
@@ -141,25 +176,24 @@ class FrameAnalysis:
     def get_blend_data(self, buffer_paths: list[Path], expected_vertex_count: int):
         if len(buffer_paths) == 0:
             return None, None
+
+        # The blend stride is the one holding as many vertices as the
+        # position buffer, which the buffer size alone tells
+        buffer_path = buffer_paths[0].with_suffix(".buf")
+        (buffer_stride,) = resolve_buffer_strides(
+            [os.path.getsize(buffer_path)],
+            [list(BLEND_FMT_BY_STRIDE)],
+            expected_vertex_count,
+        )
         logger.debug(
-            f"Attempting blend data extraction expecting vertex count = {expected_vertex_count}"
+            f"Inferred blend stride = {buffer_stride} from vertex count = {expected_vertex_count}"
         )
-        for buffer_stride, buffer_elements in [
-            (32, BLEND_4VGX_FMT),
-            (16, BLEND_2VGX_FMT),
-            (4, BLEND_1VGX_FMT),
-        ]:
-            buffer_path = buffer_paths[0].with_suffix(".buf")
-            buffer_formats = [element.Format for element in buffer_elements]
-            buffer = collect_binary_buffer_data(
-                buffer_path, buffer_formats, buffer_stride
-            )
 
-            logger.debug(
-                f"\tGot {len(buffer)} vertex count with buffer stride = {buffer_stride}"
-            )
-            if len(buffer) == expected_vertex_count:
-                break
+        buffer_elements = BLEND_FMT_BY_STRIDE[buffer_stride]
+        buffer_formats = [element.Format for element in buffer_elements]
+        buffer = self.buffer_cache.collect_binary_buffer_data(
+            buffer_path, buffer_formats, buffer_stride
+        )
 
         return buffer, buffer_elements
 
@@ -177,7 +211,7 @@ class FrameAnalysis:
         else:
             buffer_path = buffer_paths[0].with_suffix(".buf")
             buffer_formats = [element.Format for element in buffer_elements]
-            buffer = collect_binary_buffer_data(
+            buffer = self.buffer_cache.collect_binary_buffer_data(
                 buffer_path, buffer_formats, buffer_stride
             )
 
@@ -187,176 +221,357 @@ class FrameAnalysis:
         self, export_name, components: list[Component], textures=None, *, game: str
     ):
         json_builder = JsonBuilder()
+        game_options = self.cfg.game[game].game_options
 
         extract_path = Path(self.cfg.game[game].extract_path, export_name)
-        if self.cfg.game[game].game_options.clean_extract_folder:
-            if extract_path.exists():
-                shutil.rmtree(extract_path)
-        extract_path.mkdir(parents=True, exist_ok=True)
+        archive_path = None
+        manifest = None
+        if game_options.export_archive:
+            # Nothing is written to extract_path, it only names the archive members
+            archive_path = extract_path.with_name(
+                "{}.{}".format(extract_path.name, game_options.archive_format)
+            )
+            archive_path.parent.mkdir(parents=True, exist_ok=True)
+        else:
+            # Incremental exports clean the folder up once done instead
+            if (
+                game_options.clean_extract_folder
+                and not game_options.incremental_export
+                and extract_path.exists()
+            ):
+                DeletionService.get_instance().delete(extract_path)
+            extract_path.mkdir(parents=True, exist_ok=True)
+
+            if game_options.incremental_export:
+                manifest = ExportManifest(extract_path)
 
         st = time.time()
 
-        for i, component in enumerate(components):
-            logger.info(f"Exporting [{component.ib_hash}] - {component.name}")
+        # Buffers shared by components are decoded once per export
+        self.buffer_cache = DecodedBufferCache()
+        if archive_path:
+            self.file_exporter = ArchiveExporter(
+                archive_path, game_options.archive_format, extract_path.parent
+            )
+        else:
+            self.file_exporter = FileExporter(
+                link=game_options.link_exported_files, manifest=manifest
+            )
+
+        with self.file_exporter:
+            self.export_components(
+                export_name, extract_path, components, textures, json_builder, game
+            )
+
+            json_out = json.dumps(json_builder.build(), indent=4)
+            self.file_exporter.write_file(
+                extract_path / "hash.json", None, lambda f: write_text(f, json_out)
+            )
+
+        if manifest:
+            manifest.remove_stale_files(
+                remove_unlisted=game_options.clean_extract_folder
+            )
+            manifest.save()
+
+        logger.info("Export done: {:.3}s".format(time.time() - st))
+        logger.info(
+            "Exported files: %s",
+            self.file_exporter.get_summary(),
+            extra={"TIMESTAMP": False},
+        )
+        # Let go of the decoded buffers
+        self.buffer_cache = DecodedBufferCache()
+
+        if game_options.delete_frame_analysis:
             logger.info(
-                (
-                    f"collect_model_data = {component.options['collect_model_data']}, "
-                    f"collect_model_hashes = {component.options['collect_model_hashes']} "
-                ),
-                extra={"TIMESTAMP": False},
+                "Deleting frame analysis <PATH>%s</PATH>", str(self.path.absolute())
             )
+            DeletionService.get_instance().delete(self.path)
+
+        if game_options.open_extract_folder:
+            opened_path = extract_path if not archive_path else archive_path.parent
+            subprocess.run([FILEBROWSER_PATH, opened_path])
             logger.info(
-                (
-                    f"collect_texture_data = {component.options['collect_texture_data']}, "
-                    f"collect_texture_hashes = {component.options['collect_texture_hashes']}"
-                ),
-                extra={"TIMESTAMP": False},
+                "Opening <PATH>%s</PATH> with File Explorer", opened_path.absolute()
             )
 
-            if (
-                component.options["collect_model_hashes"]
-                or component.options["collect_texture_hashes"]
-            ):
-                json_builder.add_component(
-                    component, textures[i] if textures else None, game
-                )
+    def export_components(
+        self,
+        export_name: str,
+        extract_path: Path,
+        components: list[Component],
+        textures,
+        json_builder: JsonBuilder,
+        game: str,
+    ):
+        export_workers = max(self.cfg.export_workers, 1)
+        if export_workers > 1:
+            self.export_components_concurrently(
+                export_workers,
+                export_name,
+                extract_path,
+                components,
+                textures,
+                json_builder,
+                game,
+            )
+            return
+
+        for i, component in enumerate(components):
+            component_textures = textures[i] if textures else None
+            json_component = self.add_json_component(
+                json_builder, component, component_textures, game
+            )
+            self.export_component_textures(
+                export_name, extract_path, component, component_textures
+            )
+            self.export_component_model(
+                export_name, extract_path, component, json_component, game
+            )
 
-            if component.options["collect_model_data"]:
-                buffers = []
-                elements = []
+    def export_components_concurrently(
+        self,
+        export_workers: int,
+        export_name: str,
+        extract_path: Path,
+        components: list[Component],
+        textures,
+        json_builder: JsonBuilder,
+        game: str,
+    ):
+        """
+        Exports the model data of components in a pool of threads, while
+        their textures are copied in another. hash.json entries are still
+        added in component order. Components with the same name write to
+        the same files, so those are exported one after the other, in
+        order, the same as they would be without the pools.
+        """
+        component_groups: dict[str, list[int]] = {}
+        for i, component in enumerate(components):
+            component_groups.setdefault(component.name, []).append(i)
 
-                position_paths = (
-                    [component.position_path]
-                    if component.position_path
-                    else component.backup_position_paths
-                )
-                blend_paths = [component.blend_path] if component.blend_path else []
-                texcoord_paths = (
-                    [component.texcoord_path]
-                    if component.texcoord_path
-                    else component.backup_texcoord_paths
-                )
+        json_components = [
+            self.add_json_component(
+                json_builder, component, textures[i] if textures else None, game
+            )
+            for i, component in enumerate(components)
+        ]
 
-                # In HSR, the position buffer can either be 56 or 40 stride. In addition, the blend stride can be
-                # strides 32 or 16 or 4 We can infer the correct stride with no ambiguity for each by matching the
-                # position vertex counts to the blend vertex counts computed from the different strides. This works
-                # because no ratio of position/blend stride within our possibilities is equal.
-                #     POSITION_SIZE/position_stride = BLEND_SIZE/blend_stride = vertex_count
-                #  => POSITION_SIZE/BLEND_SIZE = position_stride/blend_stride
-
-                position_stride = None
-                if component.position_path and component.blend_path:
-                    position_size = os.path.getsize(
-                        component.position_path.with_suffix(".buf")
-                    )
-                    blend_size = os.path.getsize(
-                        component.blend_path.with_suffix(".buf")
-                    )
-                    position_blend_ratio = {
-                        1.25: (40, 32),
-                        2.5: (40, 16),
-                        10: (40, 4),
-                        1.75: (56, 32),
-                        3.5: (56, 16),
-                        14: (56, 4),
-                    }
-                    try:
-                        position_stride, blend_stride = position_blend_ratio[
-                            position_size / blend_size
-                        ]
-                    except KeyError:
-                        logger.error(f'Position size: {position_size}')
-                        logger.error(f'Blend size: {blend_size}')
-                        raise Exception(
-                            "Unexpected position and blend buffer sizes given known strides"
-                        )
-
-                    logger.debug(
-                        f"Inferred position stride={position_stride} and blend stride={blend_stride}"
-                    )
-                    logger.debug(f"Vertex Count = {position_size // position_stride}")
-
-                position_data, position_elements = self.get_position_data(
-                    position_paths,
-                    position_stride,
-                    {
-                        "shapekey_buffer_path": component.shapekey_buffer_path,
-                        "shapekey_cb_paths": component.shapekey_cb_paths,
-                    }
-                    if component.shapekey_buffer_path and component.shapekey_cb_paths
-                    else {},
-                )
-                blend_data, blend_elements = self.get_blend_data(
-                    blend_paths, len(position_data)
+        def export_models(component_indices: list[int]):
+            for i in component_indices:
+                self.export_component_model(
+                    export_name, extract_path, components[i], json_components[i], game
                 )
-                texcoord_data, texcoord_elements = self.get_texcoord_data(
-                    texcoord_paths
+
+        def export_textures(component_indices: list[int]):
+            for i in component_indices:
+                self.export_component_textures(
+                    export_name,
+                    extract_path,
+                    components[i],
+                    textures[i] if textures else None,
                 )
 
-                if not position_data:
-                    json_builder.components[-1].__setattr__(f"position_vb", "")
-                if not blend_data:
-                    json_builder.components[-1].__setattr__(f"blend_vb", "")
-                if not texcoord_data:
-                    json_builder.components[-1].__setattr__(f"texcoord_vb", "")
-
-                if position_data:
-                    buffers.append(position_data)
-                if blend_data:
-                    buffers.append(blend_data)
-                if texcoord_data:
-                    buffers.append(texcoord_data)
-
-                if position_elements:
-                    elements.append(position_elements)
-                if blend_elements:
-                    elements.append(blend_elements)
-                if texcoord_elements:
-                    elements.append(texcoord_elements)
+        with ThreadPoolExecutor(
+            max_workers=export_workers
+        ) as model_executor, ThreadPoolExecutor(
+            max_workers=export_workers
+        ) as copy_executor:
+            futures = []
+            for component_indices in component_groups.values():
+                futures.append(model_executor.submit(export_models, component_indices))
+                futures.append(copy_executor.submit(export_textures, component_indices))
+
+            # Raises the first error in component order
+            for future in futures:
+                future.result()
+
+    def add_json_component(
+        self, json_builder: JsonBuilder, component: Component, textures, game: str
+    ):
+        logger.info(f"Exporting [{component.ib_hash}] - {component.name}")
+        logger.info(
+            (
+                f"collect_model_data = {component.options['collect_model_data']}, "
+                f"collect_model_hashes = {component.options['collect_model_hashes']} "
+            ),
+            extra={"TIMESTAMP": False},
+        )
+        logger.info(
+            (
+                f"collect_texture_data = {component.options['collect_texture_data']}, "
+                f"collect_texture_hashes = {component.options['collect_texture_hashes']}"
+            ),
+            extra={"TIMESTAMP": False},
+        )
 
-                logger.info(
-                    f"Constructing combined buffer for [{component.ib_hash}] - {component.name}"
-                )
-                vb_merged = merge_buffers(buffers, elements) if buffers else None
+        if (
+            component.options["collect_model_hashes"]
+            or component.options["collect_texture_hashes"]
+        ):
+            json_builder.add_component(component, textures, game)
+            return json_builder.components[-1]
 
-            if component.options["collect_texture_data"] and textures:
-                _export_component_textures(
-                    export_name, extract_path, component, textures[i]
-                )
-            if component.options["collect_model_data"] and vb_merged:
-                _export_component_buffers(
-                    export_name, extract_path, component, vb_merged
-                )
+        return None
 
-        json_out = json.dumps(json_builder.build(), indent=4)
-        (extract_path / "hash.json").write_text(json_out)
+    def export_component_textures(
+        self, export_name: str, extract_path: Path, component: Component, textures
+    ):
+        if component.options["collect_texture_data"] and textures:
+            _export_component_textures(
+                export_name, extract_path, component, textures, self.file_exporter
+            )
 
-        logger.info("Export done: {:.3}s".format(time.time() - st))
+    def export_component_model(
+        self,
+        export_name: str,
+        extract_path: Path,
+        component: Component,
+        json_component: JsonComponent,
+        game: str,
+    ):
+        if not component.options["collect_model_data"]:
+            return
 
-        if self.cfg.game[game].game_options.delete_frame_analysis:
-            shutil.rmtree(self.path)
-            logger.info(
-                "Deleted frame analysis <PATH>%s</PATH>", str(self.path.absolute())
+        buffers = []
+        elements = []
+
+        position_paths = (
+            [component.position_path]
+            if component.position_path
+            else component.backup_position_paths
+        )
+        blend_paths = [component.blend_path] if component.blend_path else []
+        texcoord_paths = (
+            [component.texcoord_path]
+            if component.texcoord_path
+            else component.backup_texcoord_paths
+        )
+
+        # In HSR, the position buffer can either be 56 or 40 stride. In addition, the blend stride can be
+        # strides 32 or 16 or 4. Both buffers hold the same vertex count, so the strides can be inferred with
+        # no ambiguity from the buffer sizes alone, because no ratio of position/blend stride within our
+        # possibilities is equal.
+        #     POSITION_SIZE/position_stride = BLEND_SIZE/blend_stride = vertex_count
+
+        position_stride = None
+        if component.position_path and component.blend_path:
+            position_size = os.path.getsize(component.position_path.with_suffix(".buf"))
+            blend_size = os.path.getsize(component.blend_path.with_suffix(".buf"))
+            try:
+                position_stride, blend_stride = resolve_buffer_strides(
+                    [position_size, blend_size],
+                    [list(POSITION_FMT_BY_STRIDE), list(BLEND_FMT_BY_STRIDE)],
+                )
+            except Exception:
+                logger.error(f'Position size: {position_size}')
+                logger.error(f'Blend size: {blend_size}')
+                raise
+
+            logger.debug(
+                f"Inferred position stride={position_stride} and blend stride={blend_stride}"
             )
+            logger.debug(f"Vertex Count = {position_size // position_stride}")
+
+        position_data, position_elements = self.get_position_data(
+            position_paths,
+            position_stride,
+            {
+                "shapekey_buffer_path": component.shapekey_buffer_path,
+                "shapekey_cb_paths": component.shapekey_cb_paths,
+            }
+            if component.shapekey_buffer_path and component.shapekey_cb_paths
+            else {},
+        )
+        blend_data, blend_elements = self.get_blend_data(blend_paths, len(position_data))
+        texcoord_data, texcoord_elements = self.get_texcoord_data(texcoord_paths)
+
+        if json_component:
+            if not position_data:
+                json_component.__setattr__(f"position_vb", "")
+            if not blend_data:
+                json_component.__setattr__(f"blend_vb", "")
+            if not texcoord_data:
+                json_component.__setattr__(f"texcoord_vb", "")
+
+        if position_data:
+            buffers.append(position_data)
+        if blend_data:
+            buffers.append(blend_data)
+        if texcoord_data:
+            buffers.append(texcoord_data)
+
+        if position_elements:
+            elements.append(position_elements)
+        if blend_elements:
+            elements.append(blend_elements)
+        if texcoord_elements:
+            elements.append(texcoord_elements)
+
+        logger.info(
+            f"Constructing combined buffer for [{component.ib_hash}] - {component.name}"
+        )
+        vb_merged = merge_buffers(buffers, elements) if buffers else None
+        if not vb_merged:
+            return
 
-        if self.cfg.game[game].game_options.open_extract_folder:
-            subprocess.run([FILEBROWSER_PATH, extract_path])
-            logger.info(
-                "Opening <PATH>%s</PATH> with File Explorer", extract_path.absolute()
+        # Everything the model data is made from, to tell whether the
+        # files of the previous export can be kept as they are
+        model_source_paths = [
+            component.shapekey_buffer_path,
+            *position_paths,
+            *blend_paths,
+            *texcoord_paths,
+            *component.ib_paths,
+            *(component.shapekey_cb_paths or []),
+        ]
+        model_fingerprint = get_files_fingerprint([
+            p.with_suffix(suffix)
+            for p in model_source_paths
+            if p
+            for suffix in (".txt", ".buf")
+        ])
+
+        if self.cfg.game[game].game_options.binary_model_data:
+            _export_component_binary_buffers(
+                export_name,
+                extract_path,
+                component,
+                vb_merged,
+                self.file_exporter,
+                model_fingerprint,
+            )
+        else:
+            _export_component_buffers(
+                export_name,
+                extract_path,
+                component,
+                vb_merged,
+                self.file_exporter,
+                model_fingerprint,
             )
 
 
 def _export_component_buffers(
-    export_name: str, path: Path, component: Component, vb_merged
+    export_name: str,
+    path: Path,
+    component: Component,
+    vb_merged: MergedBuffer,
+    file_exporter: FileExporter,
+    model_fingerprint: list,
 ):
     object_classification = component.object_classification
 
     # Instead of writing the same vb0 text file multiple times,
-    # write it once, and copy and rename it to spread it across
+    # write it once, and link or copy it to spread it across
     # the rest of the component's parts. Copying seems faster
     # than writing
     main_vb0_file_path = None
 
+    # The IB is only read if one of the parts has to be written
+    index_buffers = _IndexBuffers(component, len(vb_merged.buffer_data))
+
     for i, ib_path in enumerate(component.ib_paths):
         prefix = export_name + component.name + object_classification[i]
         vb0_file_name = "{}-vb0={}.txt".format(
@@ -367,17 +582,194 @@ def _export_component_buffers(
 
         vb0_file_path = path / vb0_file_name
         if not main_vb0_file_path:
-            vb0_file_path.write_text(vb_merged)
+            file_exporter.write_file(vb0_file_path, model_fingerprint, vb_merged.write)
             main_vb0_file_path = vb0_file_path
         else:
-            shutil.copyfile(main_vb0_file_path, vb0_file_path)
+            file_exporter.export_file(
+                main_vb0_file_path, vb0_file_path, model_fingerprint
+            )
 
         ib_file_path = path / ib_file_name
-        shutil.copyfile(ib_path, ib_file_path)
+        if not index_buffers.binary_path:
+            file_exporter.export_file(ib_path, ib_file_path)
+            continue
+
+        def write_text_index_buffer(f, i=i):
+            ib_header, indices = index_buffers.get_part(i)
+            # Text mode, so the output matches the text IB of the frame analysis
+            text_file = io.TextIOWrapper(f)
+            write_index_buffer(text_file, ib_header, indices)
+            text_file.detach()
+
+        file_exporter.write_file(
+            ib_file_path, index_buffers.get_fingerprint(i), write_text_index_buffer
+        )
+
+
+def _export_component_binary_buffers(
+    export_name: str,
+    path: Path,
+    component: Component,
+    vb_merged: MergedBuffer,
+    file_exporter: FileExporter,
+    model_fingerprint: list,
+):
+    object_classification = component.object_classification
+
+    # Same as the text vb0, the binary vb0 is written once and linked or copied
+    main_vb0_file_path = None
+
+    index_buffers = _IndexBuffers(component, len(vb_merged.buffer_data))
+
+    for i, ib_path in enumerate(component.ib_paths):
+        prefix = export_name + component.name + object_classification[i]
+        vb0_file_name = "{}-vb0={}.buf".format(
+            prefix,
+            component.position_hash if component.position_hash else component.draw_hash,
+        )
+        ib_file_name = "{}-ib={}.buf".format(prefix, component.ib_hash)
+        fmt_file_name = "{}.fmt".format(prefix)
+
+        vb0_file_path = path / vb0_file_name
+        if not main_vb0_file_path:
+            file_exporter.write_file(
+                vb0_file_path, model_fingerprint, vb_merged.write_binary
+            )
+            main_vb0_file_path = vb0_file_path
+        else:
+            file_exporter.export_file(
+                main_vb0_file_path, vb0_file_path, model_fingerprint
+            )
+
+        def write_binary_index_buffer_part(f, i=i):
+            ib_header, indices = index_buffers.get_part(i)
+            write_binary_index_buffer(f, ib_header["format"], indices)
+
+        def write_buffer_format(f, i=i):
+            ib_header, _ = index_buffers.get_part(i)
+            ib_format = ib_header["format"]
+            write_text(f, construct_buffer_format(vb_merged.buffer_elements, ib_format))
+
+        file_exporter.write_file(
+            path / ib_file_name,
+            index_buffers.get_fingerprint(i),
+            write_binary_index_buffer_part,
+        )
+        file_exporter.write_file(
+            path / fmt_file_name, model_fingerprint, write_buffer_format
+        )
+
+
+class _IndexBuffers:
+    """
+    The IB of every part of a component. The parts are draws of the same
+    IB, so the binary IB of the first part is read once, and every part's
+    indices are sliced out of it at the part's first index and index count.
+    Without a binary IB, each part's text IB is parsed instead. Either is
+    only read once a part is asked for. Safe to share between threads.
+
+    The binary IB is only used if every part's header has a format and
+    topology that the text IB can be written back in exactly as 3dmigoto
+    wrote it. Otherwise binary_path is None and the text IBs are copied.
+    """
+
+    def __init__(self, component: Component, vertex_count: int):
+        self.component = component
+        self.vertex_count = vertex_count
+        self.parts: list[tuple[dict[str, str], object]] = []
+        self.lock = threading.Lock()
+
+        binary_path = component.ib_paths[0].with_suffix(".buf")
+        self.binary_path = None
+        if binary_path.exists():
+            self.ib_headers = [
+                read_index_buffer_header(ib_path) for ib_path in component.ib_paths
+            ]
+            if self.has_supported_headers():
+                self.binary_path = binary_path
+
+    def has_supported_headers(self):
+        for ib_path, ib_header in zip(self.component.ib_paths, self.ib_headers):
+            ib_format = ib_header.get("format")
+            topology = ib_header.get("topology")
+            if ib_format != self.ib_headers[0].get("format") or (
+                ib_format not in INDEX_BUFFER_FORMATS
+                or topology not in TOPOLOGY_LINE_SIZE
+            ):
+                logger.debug(
+                    "Using the text IB of <PATH>%s</PATH>, not the binary IB (%s, %s)",
+                    ib_path.name,
+                    ib_format,
+                    topology,
+                )
+                return False
+        return True
+
+    def get_fingerprint(self, i: int):
+        paths = [self.component.ib_paths[i]]
+        if self.binary_path:
+            paths.append(self.binary_path)
+        return get_files_fingerprint(paths)
+
+    def get_part(self, i: int):
+        with self.lock:
+            if not self.parts:
+                if self.binary_path:
+                    self.parts = self.read_binary_parts()
+                else:
+                    self.parts = [
+                        collect_text_index_buffer_data(ib_path)
+                        for ib_path in self.component.ib_paths
+                    ]
+
+        return self.parts[i]
+
+    def read_binary_parts(self):
+        st = time.time()
+        ib_headers = self.ib_headers
+        ib_format = ib_headers[0]["format"]
+        indices = collect_binary_index_buffer_data(self.binary_path, ib_format)
+
+        # The IB may be bound past its start, which the first index is relative to
+        index_byte_width = get_index_byte_width(ib_format)
+        index_ranges = [
+            (
+                int(ib_header.get("byte offset", 0)) // index_byte_width + first_index,
+                count,
+            )
+            for ib_header, first_index, count in zip(
+                ib_headers,
+                self.component.object_indices,
+                self.component.object_indices_counts,
+            )
+        ]
+        parts = split_index_buffer(indices, index_ranges)
+
+        for ib_path, part in zip(self.component.ib_paths, parts):
+            if (max_index := get_max_index(part)) >= self.vertex_count:
+                logger.warning(
+                    "<PATH>%s</PATH> indexes vertex %d past the %d vertices of the vb0",
+                    ib_path.name,
+                    max_index,
+                    self.vertex_count,
+                )
+
+        logger.debug(
+            "Split %d indices of <PATH>%s</PATH> into %d parts in %.3fs",
+            len(indices),
+            self.binary_path.name,
+            len(parts),
+            time.time() - st,
+        )
+        return list(zip(ib_headers, parts))
 
 
 def _export_component_textures(
-    export_name: str, path: Path, component: Component, textures
+    export_name: str,
+    path: Path,
+    component: Component,
+    textures,
+    file_exporter: FileExporter,
 ):
     object_classification = component.object_classification
     for i, first_index in enumerate(textures):
@@ -388,4 +780,4 @@ def _export_component_textures(
             texture_file_name = (
                 base_texture_file_name + texture_type + texture.path.suffix
             )
-            shutil.copyfile(texture.path, (path / texture_file_name))
+            file_exporter.export_file(texture.path, path / texture_file_name)
@@ -4,10 +4,13 @@ import logging
 from collections import OrderedDict
 from pathlib import Path
 
-from gui_collect.backend.utils.buffer_utils.structs import BufferType
+from gui_collect.backend.utils.buffer_utils.structs import BufferType, BUFFER_NAME
 from gui_collect.backend.utils.texture_utils.TextureManager import TextureManager
 
-from .structs import Texture, Component, ID_Data
+from .structs import Texture, Component, ID_Data, LogIndex, CopyGraph, DrawCall
+from .log_cache import get_cache_key, has_cached_log, load_cached_log, save_cached_log
+from .log_parser import parse_log_file, parse_log_file_lazy, LAZY_PARSE_THRESHOLD
+from .pipeline_state import PipelineState, track_pipeline_state
 
 
 DIR_TEXTURE_PATTERN = re.compile(r"^\d{6}-ps-t(\d+)=(!.!=)?([a-f0-9]{8})")
@@ -15,10 +18,23 @@ logger = logging.getLogger(__name__)
 
 
 class LogAnalysis:
-    def __init__(self, frame_analysis_path: Path):
+    def __init__(self, frame_analysis_path: Path, target_hashes: list[str] = None):
+        """
+        If target_hashes are given, only the part of a large log.txt an
+        extraction of them can lead to may be parsed. `lazy` is set if so.
+        """
         self.frame_analysis_path = frame_analysis_path
-        self.log_data = parse_frame_analysis_log_file(
-            self.frame_analysis_path / "log.txt"
+        log_path = self.frame_analysis_path / "log.txt"
+
+        parsed_log = None
+        if target_hashes:
+            parsed_log = read_frame_analysis_log_file_lazy(log_path, target_hashes)
+        self.lazy = parsed_log is not None
+        if parsed_log is None:
+            parsed_log = read_frame_analysis_log_file(log_path)
+
+        self.log_data, self.pipeline_states, self.log_index, self.copy_graph = (
+            parsed_log
         )
 
         self.texture_manager = TextureManager.get_instance()
@@ -76,53 +92,36 @@ class LogAnalysis:
         logger.info("Log Based Extraction Done: {:.6}s".format(time.time() - st))
 
     def guess_hash_type(self, target_hash):
-        for id in self.log_data:
-            if (
-                "IASetIndexBuffer" in self.log_data[id]
-                and self.log_data[id]["IASetIndexBuffer"] == target_hash
-            ):
-                logger.debug(f"Got IB Hash [{target_hash}]")
-                return BufferType.IB
-            if (
-                "IASetVertexBuffers" in self.log_data[id]
-                and "0" in self.log_data[id]["IASetVertexBuffers"]
-                and self.log_data[id]["IASetVertexBuffers"]["0"] == target_hash
-            ):
-                logger.debug(f"Got Draw Hash [{target_hash}]")
-                return BufferType.Draw_VB
-            if (
-                "IASetVertexBuffers" in self.log_data[id]
-                and "2" in self.log_data[id]["IASetVertexBuffers"]
-                and self.log_data[id]["IASetVertexBuffers"]["2"] == target_hash
-            ):
-                logger.debug(f"Got Blend Hash [{target_hash}]")
-                return BufferType.Blend_VB
-        return None
+        # The hash type is decided by the earliest draw call binding the hash.
+        # Within the same draw call, IB takes precedence over Draw and Blend.
+        candidates = []
+        for precedence, (buffer_type, keyword, slot) in enumerate([
+            (BufferType.IB, "IASetIndexBuffer", None),
+            (BufferType.Draw_VB, "IASetVertexBuffers", "0"),
+            (BufferType.Blend_VB, "IASetVertexBuffers", "2"),
+        ]):
+            if ids := self.log_index.get_ids(keyword, target_hash, slot):
+                candidates.append((ids[0], precedence, buffer_type))
+
+        if not candidates:
+            return None
+
+        _, _, buffer_type = min(candidates)
+        logger.debug(f"Got {BUFFER_NAME[buffer_type]} Hash [{target_hash}]")
+        return buffer_type
 
     def get_relevant_ids(self, target_hash, target_hash_type: BufferType):
         if target_hash_type == BufferType.IB:
-            return [
-                id
-                for id in self.log_data
-                if "IASetIndexBuffer" in self.log_data[id]
-                and self.log_data[id]["IASetIndexBuffer"] == target_hash
-            ]
+            return self.log_index.get_ids("IASetIndexBuffer", target_hash)
         elif target_hash_type == BufferType.Draw_VB:
-            return [
-                id
-                for id in self.log_data
-                if "IASetVertexBuffers" in self.log_data[id]
-                and "0" in self.log_data[id]["IASetVertexBuffers"]
-                and self.log_data[id]["IASetVertexBuffers"]["0"] == target_hash
-            ]
+            return self.log_index.get_ids("IASetVertexBuffers", target_hash, "0")
         elif target_hash_type == BufferType.Blend_VB:
             return [
                 id
-                for id in self.log_data
-                if "IASetVertexBuffers" in self.log_data[id]
-                and "2" in self.log_data[id]["IASetVertexBuffers"]
-                and self.log_data[id]["IASetVertexBuffers"]["2"] == target_hash
-                and "IASetIndexBuffer" in self.log_data[id] # Only match IB DrawIndexed and not the pose draw
+                for id in self.log_index.get_ids("IASetVertexBuffers", target_hash, "2")
+                # Only match IB DrawIndexed and not the pose draw
+                if "IASetIndexBuffer" in self.get_draw_call(id)
+                or (self.get_draw_call(id).draw is not None and self.get_ib_hash(id))
             ]
         else:
             raise Exception()
@@ -220,7 +219,7 @@ class LogAnalysis:
         # 2. Apply Shapekeys on draw_pose_buffer
         # 3. Apply CS posing on draw_pose_buffer
         # 4. CopyResource: draw_pose_buffer -> draw_buffer
-        root_id, draw_copy_path = self.traverse_copy_resource(component.draw_hash)
+        root_id, draw_copy_path = self.copy_graph.get_chain(component.draw_hash)
         if len(draw_copy_path) != 3:
             return False
 
@@ -239,28 +238,11 @@ class LogAnalysis:
 
         return True
 
-    def traverse_copy_resource(self, start_hash):
-        buffer_copy_path = [start_hash]
-        root_id = None
-
-        for ID in reversed(self.log_data):
-            if "CopyResource" in self.log_data[ID]:
-                for src_hash, dst_hash in reversed(self.log_data[ID]["CopyResource"]):
-                    if buffer_copy_path[-1] == dst_hash:
-                        # Skip if src == dst and its already captured
-                        if buffer_copy_path[-1] == src_hash: continue
-                        buffer_copy_path.append(src_hash)
-                        root_id = ID
-
-        return root_id, buffer_copy_path
-
     def collect_pose_draw_call(self, component: Component, pose_draw_hash: str):
+        srv_ids = set(self.log_index.get_ids("CSSetShaderResources", pose_draw_hash))
         ID = [
-            idx for idx in self.log_data
-            if "CSSetUnorderedAccessViews" in self.log_data[idx]
-            and pose_draw_hash in self.log_data[idx]["CSSetUnorderedAccessViews"].values()
-            and "CSSetShaderResources" in self.log_data[idx]
-            and pose_draw_hash in self.log_data[idx]["CSSetShaderResources"].values()
+            idx for idx in self.log_index.get_ids("CSSetUnorderedAccessViews", pose_draw_hash)
+            if idx in srv_ids
         ]
         if len(ID) == 0:
             return None
@@ -269,8 +251,8 @@ class LogAnalysis:
 
         pose_cs_hash = self.get_compute_shader_hash(ID)
         pose_draw_cst_slot = [
-            s for s in self.log_data[ID]["CSSetShaderResources"]
-            if pose_draw_hash == self.log_data[ID]["CSSetShaderResources"][s]
+            s for s in self.get_draw_call(ID)["CSSetShaderResources"]
+            if pose_draw_hash == self.get_draw_call(ID)["CSSetShaderResources"][s]
         ][0]
         draw_pose_path = self.compile_cs_t_filepath(ID, pose_draw_hash, pose_draw_cst_slot, pose_cs_hash, ext=".buf")
         component.position_path = draw_pose_path
@@ -278,7 +260,7 @@ class LogAnalysis:
         # Coping. Haven't found a reliable way to identify the blend slot without hard coding shader hashes
         # This is likely to fail in batched posing scenarios
         blend_cst_slot = "1"
-        blend_hash = self.log_data[ID]["CSSetShaderResources"][blend_cst_slot]
+        blend_hash = self.get_draw_call(ID)["CSSetShaderResources"][blend_cst_slot]
         blend_path = self.compile_cs_t_filepath(ID, blend_hash, blend_cst_slot, pose_cs_hash, ext=".buf")
         component.blend_path = blend_path
         component.blend_hash = blend_hash
@@ -287,20 +269,18 @@ class LogAnalysis:
 
     def collect_shapekey_data(self, component: Component, pose_id: str, pose_draw_hash: str):
         # iterate from pose_id to root_cs_id to collect all shapekey buffers
-        for ID in reversed(self.log_data):
+        for ID in reversed(
+            self.log_index.get_ids("CSSetUnorderedAccessViews", pose_draw_hash, "0")
+        ):
             if ID >= pose_id: continue
-            if (
-                    "CSSetUnorderedAccessViews" in self.log_data[ID]
-                    and "CSSetShaderResources" in self.log_data[ID]
-                    and self.log_data[ID]["CSSetUnorderedAccessViews"]["0"] == pose_draw_hash
-            ):
+            if "CSSetShaderResources" in self.get_draw_call(ID):
                 cs_hash = self.get_compute_shader_hash(ID)
-                sk_buffer_hash = self.log_data[ID]["CSSetShaderResources"]["0"]
+                sk_buffer_hash = self.get_draw_call(ID)["CSSetShaderResources"]["0"]
                 sk_buffer_filename = self.compile_cs_t_filepath(ID, sk_buffer_hash, 0, cs_hash, ".buf")
                 sk_buffer_path = self.frame_analysis_path / sk_buffer_filename
                 component.shapekey_buffer_path = sk_buffer_path
 
-                for slot, cb_hash in self.log_data[ID]["CSSetConstantBuffers"].items():
+                for slot, cb_hash in self.get_draw_call(ID)["CSSetConstantBuffers"].items():
                     cb_filename_buf = self.compile_cs_cb_filepath(ID, cb_hash, slot, cs_hash, ".buf")
                     cb_filepath_buf = self.frame_analysis_path / cb_filename_buf
                     component.shapekey_cb_paths.append(cb_filepath_buf)
@@ -310,23 +290,16 @@ class LogAnalysis:
             return None
 
         # Unposed position data may be initialized by some cs long before the posing draw call.
-        root_cs_ids = sorted([
-            id
-            for id in self.log_data
-            if "CSSetUnorderedAccessViews" in self.log_data[id]
-            and component.draw_hash
-            in self.log_data[id]["CSSetUnorderedAccessViews"].values()
-        ])
+        root_cs_ids = sorted(
+            self.log_index.get_ids("CSSetUnorderedAccessViews", component.draw_hash)
+        )
         if len(root_cs_ids) == 0:
             return None
 
-        pose_ids = [
-            id
-            for id in root_cs_ids
-            if "CSSetShaderResources" in self.log_data[id]
-            and component.draw_vb2_hash
-            in self.log_data[id]["CSSetShaderResources"].values()
-        ]
+        blend_ids = set(
+            self.log_index.get_ids("CSSetShaderResources", component.draw_vb2_hash)
+        )
+        pose_ids = [id for id in root_cs_ids if id in blend_ids]
         if len(pose_ids) == 0:
             return None
 
@@ -336,12 +309,8 @@ class LogAnalysis:
         root_cs_hash = self.get_compute_shader_hash(root_cs_id)
         pose_cs_hash = self.get_compute_shader_hash(pose_id)
 
-        if "CopyResource" in self.log_data[root_cs_id] and (
-            src_uav_hashes := [
-                src_hash
-                for src_hash, dst_hash in self.log_data[root_cs_id]["CopyResource"]
-                if dst_hash == component.draw_hash
-            ]
+        if src_uav_hashes := self.copy_graph.get_sources(
+            component.draw_hash, root_cs_id
         ):
             position_slot = "0"
             position_hash = src_uav_hashes[0]
@@ -349,13 +318,13 @@ class LogAnalysis:
                 root_cs_id, component.draw_hash, position_slot, root_cs_hash, ext=".buf"
             )
 
-            cst0_hash = self.log_data[root_cs_id]["CSSetShaderResources"]["0"]
+            cst0_hash = self.get_draw_call(root_cs_id)["CSSetShaderResources"]["0"]
             cst0_filename = self.compile_cs_t_filepath(
                 root_cs_id, cst0_hash, 0, root_cs_hash, ".buf"
             )
 
             component.shapekey_buffer_path = self.frame_analysis_path / cst0_filename
-            for slot, cb_hash in self.log_data[root_cs_id][
+            for slot, cb_hash in self.get_draw_call(root_cs_id)[
                 "CSSetConstantBuffers"
             ].items():
                 cb_filename_buf = self.compile_cs_cb_filepath(
@@ -367,13 +336,13 @@ class LogAnalysis:
         else:
             position_slot = [
                 slot
-                for slot in self.log_data[root_cs_id][
+                for slot in self.get_draw_call(root_cs_id)[
                     "CSSetUnorderedAccessViews"
                 ].keys()
-                if self.log_data[root_cs_id]["CSSetUnorderedAccessViews"][slot]
+                if self.get_draw_call(root_cs_id)["CSSetUnorderedAccessViews"][slot]
                 == component.draw_hash
             ][0]
-            position_hash = self.log_data[root_cs_id]["CSSetShaderResources"][
+            position_hash = self.get_draw_call(root_cs_id)["CSSetShaderResources"][
                 position_slot
             ]
             position_path = self.compile_cs_t_filepath(
@@ -382,11 +351,11 @@ class LogAnalysis:
 
         blend_slot = [
             slot
-            for slot in self.log_data[pose_id]["CSSetShaderResources"].keys()
-            if self.log_data[pose_id]["CSSetShaderResources"][slot]
+            for slot in self.get_draw_call(pose_id)["CSSetShaderResources"].keys()
+            if self.get_draw_call(pose_id)["CSSetShaderResources"][slot]
             == component.draw_vb2_hash
         ][0]
-        blend_hash = self.log_data[pose_id]["CSSetShaderResources"][blend_slot]
+        blend_hash = self.get_draw_call(pose_id)["CSSetShaderResources"][blend_slot]
         blend_path = self.compile_cs_t_filepath(
             pose_id, blend_hash, blend_slot, pose_cs_hash, ext=".buf"
         )
@@ -404,13 +373,7 @@ class LogAnalysis:
         if not component.draw_hash:
             return None
 
-        pose_ids = [
-            id
-            for id in self.log_data
-            if "SOSetTargets" in self.log_data[id]
-            and "0" in self.log_data[id]["SOSetTargets"]
-            and self.log_data[id]["SOSetTargets"]["0"] == component.draw_hash
-        ]
+        pose_ids = self.log_index.get_ids("SOSetTargets", component.draw_hash, "0")
         if len(pose_ids) == 0:
             return None
         if len(pose_ids) == 1:
@@ -420,12 +383,12 @@ class LogAnalysis:
             # Draw hash may be shared.
             # Pick the pose_id with the matching texcoord_hash as well
             # TODO: Only handling hsr/zzz case currently. Investigate further later
-            prepose_buffer_count = len(self.log_data[pose_ids[0]]["IASetVertexBuffers"])
+            prepose_buffer_count = len(self.get_draw_call(pose_ids[0])["IASetVertexBuffers"])
             if prepose_buffer_count == 3:
                 pose_ids = [
                     id
                     for id in pose_ids
-                    if self.log_data[id]["IASetVertexBuffers"]["1"]
+                    if self.get_draw_call(id)["IASetVertexBuffers"]["1"]
                     == component.texcoord_hash
                 ]
 
@@ -434,9 +397,9 @@ class LogAnalysis:
 
     def set_prepose_data(self, component: Component, pose_id: str):
         vs_hash = self.get_vertex_shader_hash(pose_id)
-        assert "IASetVertexBuffers" in self.log_data[pose_id]
+        assert "IASetVertexBuffers" in self.get_draw_call(pose_id)
 
-        prepose_buffer_count = len(self.log_data[pose_id]["IASetVertexBuffers"])
+        prepose_buffer_count = len(self.get_draw_call(pose_id)["IASetVertexBuffers"])
         if prepose_buffer_count == 2:
             prepose_data = (["0", "1"], [BufferType.Position_VB, BufferType.Blend_VB])
         elif prepose_buffer_count == 3:
@@ -448,7 +411,7 @@ class LogAnalysis:
             raise Exception()
 
         for slot, buffer_type in zip(*prepose_data):
-            buffer_hash = self.log_data[pose_id]["IASetVertexBuffers"][slot]
+            buffer_hash = self.get_draw_call(pose_id)["IASetVertexBuffers"][slot]
             buffer_path = self.compile_vb_filepath(
                 pose_id, buffer_hash, slot, vs_hash, ext=".txt"
             )
@@ -468,19 +431,12 @@ class LogAnalysis:
         """
         Must be called after `set_prepose_data` since the position hash is used as a safeguard
         """
-        if "CopyResource" not in self.log_data[pose_id]:
-            return
-
         # There may be multiple CopyResource calls in the same draw call.
         # Though its very unlikely for the Pose draw call to be like so,
         # this is still a good safeguard to have.
         # We are only interested in the CopyResource that copies the UAV
         # data (source) into the pose call Position buffer (destination)
-        src_uav_hashes = [
-            src_hash
-            for src_hash, dst_hash in self.log_data[pose_id]["CopyResource"]
-            if dst_hash == component.position_hash
-        ]
+        src_uav_hashes = self.copy_graph.get_sources(component.position_hash, pose_id)
 
         if len(src_uav_hashes) == 0:
             return
@@ -491,25 +447,21 @@ class LogAnalysis:
         #   CopyResource(src=ccc, dst=123)
         src_uav_hash = src_uav_hashes[-1]
 
-        shapekey_ids = [
-            id
-            for id in self.log_data
-            if "CSSetUnorderedAccessViews" in self.log_data[id]
-            and "0" in self.log_data[id]["CSSetUnorderedAccessViews"]
-            and self.log_data[id]["CSSetUnorderedAccessViews"]["0"] == src_uav_hash
-        ]
+        shapekey_ids = self.log_index.get_ids(
+            "CSSetUnorderedAccessViews", src_uav_hash, "0"
+        )
 
         cs_hash = self.get_compute_shader_hash(shapekey_ids[0])
-        cst0_hash = self.log_data[shapekey_ids[0]]["CSSetShaderResources"]["0"]
+        cst0_hash = self.get_draw_call(shapekey_ids[0])["CSSetShaderResources"]["0"]
         cst0_filename = self.compile_cs_t_filepath(
             shapekey_ids[0], cst0_hash, 0, cs_hash, ".buf"
         )
 
         for shapekey_id in shapekey_ids:
-            assert "CSSetConstantBuffers" in self.log_data[shapekey_id]
+            assert "CSSetConstantBuffers" in self.get_draw_call(shapekey_id)
             assert cs_hash == self.get_compute_shader_hash(shapekey_id)
 
-            for slot, cb_hash in self.log_data[shapekey_id][
+            for slot, cb_hash in self.get_draw_call(shapekey_id)[
                 "CSSetConstantBuffers"
             ].items():
                 cb_filename_buf = self.compile_cs_cb_filepath(
@@ -555,11 +507,9 @@ class LogAnalysis:
                     component.tex_index_id[first_index] = draw_call_id
                     break
 
-                if game != "gi" and "render_targets" in self.log_data[draw_call_id]:
-                    has_o0 = any([
-                        rt["slot"] == "0"
-                        for rt in self.log_data[draw_call_id]["render_targets"].values()
-                    ])
+                render_targets = self.get_draw_call(draw_call_id).render_targets
+                if game != "gi" and render_targets is not None:
+                    has_o0 = "0" in render_targets[::2]
                     if has_o0:
                         component.tex_index_id[first_index] = draw_call_id
                         break
@@ -577,16 +527,27 @@ class LogAnalysis:
         for first_index in component.draw_data:
             initial_id = component.tex_index_id[first_index]
             for id in component.draw_data[first_index]:
-                if "textures" not in self.log_data[id]:
+                log_textures = self.get_draw_call(id).textures
+                if log_textures is None:
                     continue
 
                 component.draw_data[first_index][id].textures = sorted(
                     [
-                        Texture(Path(texture_str_filepath), **texture_info)
-                        for texture_str_filepath, texture_info in self.log_data[id][
-                            "textures"
-                        ].items()
-                        if Path(texture_str_filepath).exists()
+                        Texture(
+                            texture_filepath,
+                            texture_slot=t.texture_slot,
+                            texture_hash=t.texture_hash,
+                            texture_format=t.texture_format,
+                            contamination=t.contamination,
+                            extension=t.extension,
+                            bleed=t.bleed,
+                        )
+                        for t in log_textures
+                        if (
+                            texture_filepath := Path(
+                                self.frame_analysis_path, t.filename
+                            ).absolute()
+                        ).exists()
                     ],
                     key=lambda t: int(t.slot),
                 )
@@ -740,224 +701,167 @@ class LogAnalysis:
 
         return Path(self.frame_analysis_path, filename)
 
-    def get_prev_draw_id(self, draw_id: str):
-        draw_id = int(draw_id)
-        if draw_id == 1:
-            raise Exception()
-        return str(draw_id - 1).zfill(6)
+    def get_draw_call(self, draw_id: str) -> DrawCall:
+        return self.log_data[int(draw_id)]
+
+    def get_pipeline_state(self, draw_id: str) -> PipelineState:
+        return self.pipeline_states[int(draw_id)]
 
     def get_compute_shader_hash(self, draw_id: str):
-        while "CSSetShader" not in self.log_data[draw_id]:
-            draw_id = self.get_prev_draw_id(draw_id)
-        return self.log_data[draw_id]["CSSetShader"]
+        if (cs_hash := self.get_pipeline_state(draw_id).cs_hash) is None:
+            raise Exception()
+        return cs_hash
 
     def get_vertex_shader_hash(self, draw_id: str):
-        while "VSSetShader" not in self.log_data[draw_id]:
-            draw_id = self.get_prev_draw_id(draw_id)
-        return self.log_data[draw_id]["VSSetShader"]
+        if (vs_hash := self.get_pipeline_state(draw_id).vs_hash) is None:
+            raise Exception()
+        return vs_hash
 
     def get_pixel_shader_hash(self, draw_id: str):
-        while "PSSetShader" not in self.log_data[draw_id]:
-            draw_id = self.get_prev_draw_id(draw_id)
-        return self.log_data[draw_id]["PSSetShader"]
+        if (ps_hash := self.get_pipeline_state(draw_id).ps_hash) is None:
+            raise Exception()
+        return ps_hash
 
     def get_vb_hash(self, draw_id: str, slot: int):
         if (
-            "IASetVertexBuffers" in self.log_data[draw_id]
-            and str(slot) in self.log_data[draw_id]["IASetVertexBuffers"]
+            "IASetVertexBuffers" in self.get_draw_call(draw_id)
+            and str(slot) in self.get_draw_call(draw_id)["IASetVertexBuffers"]
         ):
-            return self.log_data[draw_id]["IASetVertexBuffers"][str(slot)]
+            return self.get_draw_call(draw_id)["IASetVertexBuffers"][str(slot)]
         return ""
 
     def get_ib_hash(self, draw_id: str):
-        return self.log_data[draw_id]["IASetIndexBuffer"]
+        return self.get_pipeline_state(draw_id).ib_hash
 
     def get_ib_index_count(self, draw_id: str) -> int:
-        if "DrawIndexedInstanced" in self.log_data[draw_id]:
-            return int(
-                self.log_data[draw_id]["DrawIndexedInstanced"]["IndexCountPerInstance"]
-            )
-        elif "DrawIndexed" in self.log_data[draw_id]:
-            return int(self.log_data[draw_id]["DrawIndexed"]["IndexCount"])
-        else:
-            print(self.log_data[draw_id])
+        draw_call = self.get_draw_call(draw_id)
+        if draw_call.index_count is None:
+            print(draw_call)
             raise Exception()
+        return draw_call.index_count
 
     def get_ib_first_index(self, draw_id: str) -> int:
-        if "DrawIndexedInstanced" in self.log_data[draw_id]:
-            return int(
-                self.log_data[draw_id]["DrawIndexedInstanced"]["StartIndexLocation"]
-            )
-        elif "DrawIndexed" in self.log_data[draw_id]:
-            return int(self.log_data[draw_id]["DrawIndexed"]["StartIndexLocation"])
-        else:
-            print(self.log_data[draw_id])
+        draw_call = self.get_draw_call(draw_id)
+        if draw_call.first_index is None:
+            print(draw_call)
             raise Exception()
+        return draw_call.first_index
 
 
-LOG_TEXTURE_PATTERN = re.compile(
-    r"""
-    ^
-    \d{6}\ 3DMigoto\ Dumping\ Texture2D\ .*?FrameAnalysis-.*?\\
-    (?P<texture_filename>\d{6}-(?P<resource_prefix>ps-t|o)(?P<texture_slot>\d+)=(?P<contamination>!.!=)?(?P<texture_hash>[a-f0-9]{8}).*?\.(?P<extension>.{3}))
-    \ ->\ .*\\[a-f0-9]{8}-(?P<texture_format>.*)\..{3}
-    $
-    """,
-    flags=re.VERBOSE,
-)
+def read_frame_analysis_log_file(log_path: Path):
+    """
+    Load the parsed log from its cache, or parse
+    log.txt and cache the result for later extractions
+    """
+    if cached := load_cached_log(log_path):
+        return cached
 
+    cache_key = get_cache_key(log_path)
+    parsed_log = parse_frame_analysis_log_file(log_path)
+    if parsed_log[0] is not None:
+        save_cached_log(log_path, cache_key, parsed_log)
+
+    return parsed_log
+
+
+def read_frame_analysis_log_file_lazy(log_path: Path, target_hashes: list[str]):
+    """
+    Parse only the draw ids of a large log.txt an extraction of target_hashes
+    can lead to, or load them from the cache of a previous lazy parse of the
+    same hashes. Returns None if the whole log should be read instead.
+    """
+    if log_path.stat().st_size < LAZY_PARSE_THRESHOLD or has_cached_log(log_path):
+        return None
+
+    if cached := load_cached_log(log_path, target_hashes):
+        return cached
 
-def parse_frame_analysis_log_file(log_path: Path):
     st = time.time()
-    log_data = {}
-
-    # "Guess" the encoding by attempting to read the log file
-    for encoding in ["UTF-8", "cp1252"]:
-        try:
-            log_path.read_text(encoding=encoding)
-            break
-        except UnicodeDecodeError as X:
-            continue
-    else:
-        logger.error(
-            "Malformed log.txt. Failed to decode log file using UTF-8 or cp1252 encodings"
-        )
+    cache_key = get_cache_key(log_path)
+    log_data = parse_log_file_lazy(log_path, target_hashes)
+    if log_data is None:
+        logger.debug("Lazy parse of %s gave up", log_path.name)
         return None
 
-    with open(log_path, "r", encoding=encoding) as log_file:
-        log_file.readline()  # skip first line
-
-        while line := log_file.readline():
-            if m := re.match(r"\d{6}", line):
-                draw_id = m.group()
-                if draw_id not in log_data:
-                    log_data[draw_id] = {}
-
-                    # Bleed some hashes into the previous ID
-                    # The data of the previous draw call has been fully captured
-                    # However, the game can bleed resources if they are used in consecutive draw calls instead
-                    # of re-assigning. This happens with the hsr log in screen train, the ib hash bleeds through
-                    # draw calls intentionally.
-                    # TODO this "bleed reconcilation" isnt called for the last draw call but I dont want to bother now
-                    if int(draw_id) > 1:
-                        prev_draw_id = "{:06}".format(int(draw_id) - 1)
-                        prev_prev_draw_id = "{:06}".format(int(draw_id) - 2)
-                        try:
-                            if (
-                                "DrawIndexedInstanced" in log_data[prev_draw_id]
-                                or "DrawIndexed" in log_data[prev_draw_id]
-                            ) and "IASetIndexBuffer" not in log_data[prev_draw_id]:
-                                log_data[prev_draw_id]["IASetIndexBuffer"] = log_data[
-                                    prev_prev_draw_id
-                                ]["IASetIndexBuffer"]
-                        except:
-                            # nop not handling this for the 1 in a thousand that a draw call is supposed to have an
-                            # ib hash but the previous draw doesnt either. This shouldnt happen but just in case it
-                            # ever does, pretend you saw nothing
-                            pass
-
-                if line[7:15] == "3DMigoto":
-                    if m := LOG_TEXTURE_PATTERN.match(line):
-                        filepath = Path(
-                            log_path.parent, m.group("texture_filename")
-                        ).absolute()
-                        if m.group("resource_prefix") == "ps-t":
-                            if "textures" not in log_data[draw_id]:
-                                log_data[draw_id]["textures"] = {}
-                            log_data[draw_id]["textures"][str(filepath)] = {
-                                "texture_slot": m.group("texture_slot"),
-                                "texture_hash": m.group("texture_hash"),
-                                "texture_format": m.group("texture_format"),
-                                "contamination": m.group("contamination")[:-1]
-                                if m.group("contamination")
-                                else "",
-                                "extension": m.group("extension"),
-                                "bleed": (
-                                    True
-                                    if "PSSetShaderResources" not in log_data[draw_id]
-                                    else True
-                                    if m.group("texture_slot")
-                                    not in log_data[draw_id]["PSSetShaderResources"]
-                                    else m.group("texture_hash")
-                                    not in log_data[draw_id]["PSSetShaderResources"][
-                                        m.group("texture_slot")
-                                    ]
-                                ),
-                            }
-                        else:
-                            if "render_targets" not in log_data[draw_id]:
-                                log_data[draw_id]["render_targets"] = {}
-                            log_data[draw_id]["render_targets"][str(filepath)] = {
-                                "slot": m.group("texture_slot")
-                            }
+    parsed_log = analyze_log_data(log_data)
+    save_cached_log(log_path, cache_key, parsed_log, target_hashes)
 
-                    continue
+    logger.info(
+        "Read {} draw calls of {} in {:.3}s".format(
+            len(log_data),
+            log_path.parent.name + "\\" + log_path.name,
+            time.time() - st,
+        )
+    )
 
-                keyword = line[7:].split("(", maxsplit=1)[0]
-                if keyword in [
-                    "IASetVertexBuffers",
-                    "SOSetTargets",
-                    "CSSetUnorderedAccessViews",
-                    "CSSetShaderResources",
-                    "CSSetConstantBuffers",
-                    "PSSetShaderResources",
-                ]:
-                    if keyword not in log_data[draw_id]:
-                        log_data[draw_id][keyword] = {}
-
-                    pos = log_file.tell()
-                    line = log_file.readline()
-                    while s := re.match(
-                        r"^\s*(.*):(?: view=0x.*?)? resource=.*? hash=(.*)$", line
-                    ):
-                        # assert(s.group(1) not in log_data[draw_id][keyword])
-                        log_data[draw_id][keyword][s.group(1)] = s.group(2)
-                        pos = log_file.tell()
-                        line = log_file.readline()
-                    log_file.seek(pos)
-
-                elif keyword in ["CopyResource"]:
-                    # CopyResource could be called multiple times in the same call with distinct key pairs (src, dst)
-                    if keyword not in log_data[draw_id]:
-                        log_data[draw_id][keyword] = []
-
-                    src_hash = log_file.readline().strip().split("hash=")[1]
-                    dst_hash = log_file.readline().strip().split("hash=")[1]
-                    log_data[draw_id][keyword].append((src_hash, dst_hash))
-
-                elif keyword in [
-                    "IASetIndexBuffer",
-                    "PSSetShader",
-                    "VSSetShader",
-                    "CSSetShader",
-                ]:
-                    hash_match = re.search(r"hash=([a-f0-9]+)", line)
-                    if not hash_match:
-                        continue
-                    # assert(keyword not in log_data[draw_id])
-                    log_data[draw_id][keyword] = hash_match.group(1)
-
-                elif keyword in ["DrawIndexedInstanced", "DrawIndexed"]:
-                    args = re.findall(
-                        r"\b([a-z]+):(.+?\b)",
-                        line.split("(")[1].split(")")[0],
-                        flags=re.IGNORECASE,
-                    )
-                    assert keyword not in log_data[draw_id]
-                    log_data[draw_id][keyword] = {arg[0]: arg[1] for arg in args}
+    return parsed_log
 
-                elif keyword in ["DrawIndexedInstancedIndirect"]:
-                    log_data[draw_id] = {}
 
-                elif keyword in ["ClearRenderTargetView"]:
-                    log_data[draw_id] = {}
+def parse_frame_analysis_log_file(log_path: Path):
+    st = time.time()
+
+    log_data = parse_log_file(log_path)
+    if log_data is None:
+        return None, None, None, None
+
+    parsed_log = analyze_log_data(log_data)
 
-            else:
-                continue
     logger.info(
         "Read {} in {:.3}s".format(
             log_path.parent.name + "\\" + log_path.name, time.time() - st
         )
     )
 
-    return log_data
+    return parsed_log
+
+
+def analyze_log_data(log_data):
+    pipeline_states = track_pipeline_state(log_data)
+    log_index = build_log_index(log_data, pipeline_states)
+    copy_graph = build_copy_graph(log_data)
+    return log_data, pipeline_states, log_index, copy_graph
+
+
+INDEXED_BINDING_KEYWORDS = [
+    "IASetVertexBuffers",
+    "SOSetTargets",
+    "CSSetUnorderedAccessViews",
+    "CSSetShaderResources",
+    "CSSetConstantBuffers",
+    "PSSetShaderResources",
+]
+
+
+def build_log_index(log_data, pipeline_states) -> LogIndex:
+    """
+    Index every resource hash bound in the parsed log data
+    to the draw ids it is bound at, in a single pass
+
+    Index buffers are also indexed at the indexed draw calls
+    that use them without binding them again themselves.
+    """
+    log_index = LogIndex()
+    for draw_call in log_data.values():
+        draw_id = draw_call.get_str_id()
+        if draw_call.ib_hash is not None:
+            log_index.add("IASetIndexBuffer", None, draw_call.ib_hash, draw_id)
+        elif draw_call.draw is not None and (
+            ib_hash := pipeline_states[draw_call.id].ib_hash
+        ):
+            log_index.add("IASetIndexBuffer", None, ib_hash, draw_id)
+
+        for keyword in INDEXED_BINDING_KEYWORDS:
+            for slot, resource_hash in draw_call.iter_bindings(keyword):
+                log_index.add(keyword, slot, resource_hash, draw_id)
+
+    return log_index
+
+
+def build_copy_graph(log_data) -> CopyGraph:
+    copy_graph = CopyGraph()
+    for draw_call in log_data.values():
+        if draw_call.copies:
+            draw_id = draw_call.get_str_id()
+            for src_hash, dst_hash in draw_call.copies:
+                copy_graph.add(src_hash, dst_hash, draw_id)
+    return copy_graph
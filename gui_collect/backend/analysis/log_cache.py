@@ -0,0 +1,144 @@
+import os
+import time
+import pickle
+import struct
+import hashlib
+import logging
+import tempfile
+
+from pathlib import Path
+
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the layout of the parsed log data or its indexes changes
+# so that caches written by older versions are rebuilt instead of loaded
+LOG_PARSER_VERSION = 5
+
+CACHE_MAGIC = b"GCLOG"
+CACHE_HEADER = struct.Struct("<5sIQq")
+
+# Caches are kept in the app's own folder, next to config.json. Frame analysis
+# folders get shared, and a cache found in one must never be unpickled.
+LOG_CACHE_DIR = Path("cache", "logs")
+# Only the caches of the most recently parsed logs are kept
+LOG_CACHE_MAX_COUNT = 16
+
+
+def get_cache_path(log_path: Path, target_hashes: list[str] = None):
+    """
+    The analysis of a lazy parse only holds what target_hashes lead to,
+    so it is cached apart from the full analysis, one per set of hashes
+    """
+    name = str(log_path.resolve())
+    if target_hashes:
+        name += "|" + ",".join(sorted(set(target_hashes)))
+    digest = hashlib.sha1(name.encode("utf-8")).hexdigest()
+    return LOG_CACHE_DIR / "{}.{}.cache".format(log_path.parent.name, digest[:16])
+
+
+def get_cache_key(log_path: Path):
+    """
+    The cache is only valid for the exact log file it was built from,
+    at the path it was built from
+    """
+    stat = log_path.stat()
+    return (LOG_PARSER_VERSION, stat.st_size, stat.st_mtime_ns)
+
+
+def has_cached_log(log_path: Path):
+    """
+    Check the cache of log_path is up to date without loading it
+    """
+    try:
+        with open(get_cache_path(log_path), "rb") as f:
+            header = CACHE_HEADER.unpack(f.read(CACHE_HEADER.size))
+        return header == (CACHE_MAGIC, *get_cache_key(log_path))
+    except Exception:
+        return False
+
+
+def load_cached_log(log_path: Path, target_hashes: list[str] = None):
+    """
+    Returns the cached parse results of log_path or None
+    if the cache is missing, stale or can't be read
+    """
+    st = time.time()
+    cache_path = get_cache_path(log_path, target_hashes)
+    if not cache_path.exists():
+        return None
+
+    try:
+        version, size, mtime_ns = get_cache_key(log_path)
+        with open(cache_path, "rb") as f:
+            magic, cached_version, cached_size, cached_mtime_ns = CACHE_HEADER.unpack(
+                f.read(CACHE_HEADER.size)
+            )
+            if (magic, cached_version, cached_size, cached_mtime_ns) != (
+                CACHE_MAGIC,
+                version,
+                size,
+                mtime_ns,
+            ):
+                logger.debug("Stale log cache <PATH>%s</PATH>", cache_path.name)
+                return None
+
+            parsed_log = pickle.load(f)
+
+    except Exception as X:
+        logger.warning("Discarding unreadable log cache %s: %s", cache_path.name, X)
+        return None
+
+    logger.info(
+        "Read cached {} in {:.3}s".format(
+            log_path.parent.name + "\\" + log_path.name, time.time() - st
+        )
+    )
+    return parsed_log
+
+
+def save_cached_log(
+    log_path: Path, cache_key, parsed_log: tuple, target_hashes: list[str] = None
+):
+    """
+    Write the parsed log to the cache folder. cache_key must be taken
+    before parsing so that a log modified mid-parse is never cached.
+    Failing to write the cache is not an error.
+    """
+    version, size, mtime_ns = cache_key
+    cache_path = get_cache_path(log_path, target_hashes)
+    temp_path = None
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        # Every writer gets its own temp file, so that a cache half written
+        # by one is never moved into place by another
+        fd, temp_path = tempfile.mkstemp(
+            suffix=".tmp", prefix=cache_path.name, dir=cache_path.parent
+        )
+        with open(fd, "wb") as f:
+            f.write(CACHE_HEADER.pack(CACHE_MAGIC, version, size, mtime_ns))
+            pickle.dump(parsed_log, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, cache_path)
+    except Exception as X:
+        logger.debug("Failed to write log cache %s: %s", cache_path.name, X)
+        if temp_path:
+            Path(temp_path).unlink(missing_ok=True)
+        return
+
+    prune_cached_logs()
+
+
+def prune_cached_logs():
+    """
+    Remove the least recently written caches past LOG_CACHE_MAX_COUNT
+    """
+    try:
+        cache_paths = sorted(
+            LOG_CACHE_DIR.glob("*.cache"),
+            key=lambda p: p.stat().st_mtime_ns,
+            reverse=True,
+        )
+        for cache_path in cache_paths[LOG_CACHE_MAX_COUNT:]:
+            cache_path.unlink(missing_ok=True)
+    except OSError as X:
+        logger.debug("Failed to prune log caches: %s", X)
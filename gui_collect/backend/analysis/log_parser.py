@@ -0,0 +1,533 @@
+import os
+import re
+import mmap
+import codecs
+import logging
+
+from sys import intern
+from pathlib import Path
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+
+from .structs import DrawCall, LogTexture
+
+
+logger = logging.getLogger(__name__)
+
+
+LOG_TEXTURE_PATTERN = re.compile(
+    r"""
+    ^
+    \d{6}\ 3DMigoto\ Dumping\ Texture2D\ .*?FrameAnalysis-.*?\\
+    (?P<texture_filename>\d{6}-(?P<resource_prefix>ps-t|o)(?P<texture_slot>\d+)=(?P<contamination>!.!=)?(?P<texture_hash>[a-f0-9]{8}).*?\.(?P<extension>.{3}))
+    \ ->\ .*\\[a-f0-9]{8}-(?P<texture_format>.*)\..{3}
+    $
+    """,
+    flags=re.VERBOSE,
+)
+BINDING_PATTERN = re.compile(rb"^\s*(.*):(?: view=0x.*?)? resource=.*? hash=(.*)$")
+HASH_PATTERN = re.compile(rb"hash=([a-f0-9]+)")
+DRAW_ARGS_PATTERN = re.compile(r"\b([a-z]+):(.+?\b)", flags=re.IGNORECASE)
+
+BINDING_KEYWORDS = {
+    b"IASetVertexBuffers": "IASetVertexBuffers",
+    b"SOSetTargets": "SOSetTargets",
+    b"CSSetUnorderedAccessViews": "CSSetUnorderedAccessViews",
+    b"CSSetShaderResources": "CSSetShaderResources",
+    b"CSSetConstantBuffers": "CSSetConstantBuffers",
+    b"PSSetShaderResources": "PSSetShaderResources",
+}
+HASH_KEYWORDS = {
+    b"IASetIndexBuffer": "IASetIndexBuffer",
+    b"PSSetShader": "PSSetShader",
+    b"VSSetShader": "VSSetShader",
+    b"CSSetShader": "CSSetShader",
+}
+DRAW_KEYWORDS = {
+    b"DrawIndexedInstanced": "DrawIndexedInstanced",
+    b"DrawIndexed": "DrawIndexed",
+}
+RESET_KEYWORDS = {b"DrawIndexedInstancedIndirect", b"ClearRenderTargetView"}
+# Parsed data of a draw id that a reset doesn't drop
+RESET_KEPT_DATA = ["ib_binding"]
+
+ENCODING_CHECK_CHUNK_SIZE = 1 << 24
+
+# Spawning the worker processes and sending the parsed chunks back
+# only pays off for large logs, and every chunk should be sizeable
+PARALLEL_PARSE_THRESHOLD = 64 << 20
+PARALLEL_PARSE_CHUNK_SIZE = 16 << 20
+
+# Hash targeted extractions of logs at least this large only parse the draw
+# ids they can lead to, unless those cover more than the given share of the log
+LAZY_PARSE_THRESHOLD = 256 << 20
+LAZY_PARSE_MAX_COVERAGE = 0.25
+# Buffers followed by the lazy parse. Textures and constant buffers
+# are shared by too many draw calls to be worth following.
+LAZY_PARSE_FOLLOWED_BINDINGS = ["vertex_buffers", "so_targets", "cs_uavs", "cs_srvs"]
+# Calls whose state carries over to later draw calls
+LAZY_PARSE_STATE_KEYWORDS = {
+    b" IASetIndexBuffer(": "ib_binding",
+    b" VSSetShader(": "vs_hash",
+    b" PSSetShader(": "ps_hash",
+    b" CSSetShader(": "cs_hash",
+}
+
+
+def strip_eol(line: bytes):
+    if line.endswith(b"\r\n"):
+        return line[:-2]
+    if line.endswith(b"\n"):
+        return line[:-1]
+    return line
+
+
+def detect_encoding(buffer):
+    """
+    "Guess" the encoding of the log file by attempting to decode it.
+    Pure ASCII logs, by far the most common, are never decoded.
+    """
+    if all(
+        buffer[offset : offset + ENCODING_CHECK_CHUNK_SIZE].isascii()
+        for offset in range(0, len(buffer), ENCODING_CHECK_CHUNK_SIZE)
+    ):
+        return "UTF-8"
+
+    for encoding in ["UTF-8", "cp1252"]:
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            for offset in range(0, len(buffer), ENCODING_CHECK_CHUNK_SIZE):
+                decoder.decode(buffer[offset : offset + ENCODING_CHECK_CHUNK_SIZE])
+            decoder.decode(b"", final=True)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+
+    return None
+
+
+def parse_log_file(log_path: Path):
+    """
+    Parse log.txt reading it once as bytes. Lines are tokenized on their
+    fixed width draw id prefix and keyword, and only the texture and draw
+    argument fragments are decoded. Returns None if the log can't be decoded.
+
+    Logs of at least PARALLEL_PARSE_THRESHOLD bytes are split on draw id
+    boundaries and their chunks are parsed in a process pool.
+    """
+    with open(log_path, "rb") as f:
+        if log_path.stat().st_size == 0:
+            return {}
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            encoding = detect_encoding(buffer)
+            if encoding is None:
+                logger.error(
+                    "Malformed log.txt. Failed to decode log file using UTF-8 or cp1252 encodings"
+                )
+                return None
+
+            buffer.readline()  # skip first line
+            chunk_count = min(
+                os.cpu_count() or 1, len(buffer) // PARALLEL_PARSE_CHUNK_SIZE
+            )
+            if len(buffer) < PARALLEL_PARSE_THRESHOLD or chunk_count < 2:
+                return parse_log_lines(buffer.readline, encoding)
+
+            offsets = get_chunk_offsets(buffer, buffer.tell(), chunk_count)
+
+    return parse_log_chunks(log_path, offsets, encoding)
+
+
+def get_chunk_offsets(buffer, start: int, chunk_count: int):
+    """
+    Split buffer[start:] in about chunk_count chunks. Every chunk starts
+    at the first line of a draw id, so all the lines of a draw call,
+    along with the binding and CopyResource lines that follow them,
+    always end up in the same chunk.
+    """
+    offsets = [start]
+    chunk_size = (len(buffer) - start) // chunk_count
+    for i in range(1, chunk_count):
+        offset = max(start + i * chunk_size, offsets[-1])
+        offset = buffer.find(b"\n", offset) + 1
+        if offset == 0:
+            break
+
+        draw_id = None
+        while offset < len(buffer):
+            prefix = buffer[offset : offset + 6]
+            if prefix.isdigit():
+                if draw_id is None:
+                    draw_id = prefix
+                elif prefix != draw_id:
+                    break
+            offset = buffer.find(b"\n", offset) + 1
+            if offset == 0:
+                offset = len(buffer)
+
+        if offset >= len(buffer):
+            break
+        offsets.append(offset)
+
+    offsets.append(len(buffer))
+    return offsets
+
+
+def parse_log_chunks(log_path: Path, offsets: list[int], encoding: str):
+    """
+    Parse the chunks of log.txt between consecutive offsets in a process
+    pool and merge the results in log order. Draw calls never span chunks,
+    so resets are handled within their chunk. State carried over from
+    earlier draw calls is resolved on the merged log data by the
+    pipeline state tracker.
+    """
+    log_data = {}
+    with ProcessPoolExecutor(max_workers=len(offsets) - 1) as executor:
+        for chunk_log_data in executor.map(
+            parse_log_chunk,
+            repeat(log_path),
+            offsets[:-1],
+            offsets[1:],
+            repeat(encoding),
+        ):
+            log_data.update(chunk_log_data)
+
+    return log_data
+
+
+def parse_log_chunk(log_path: Path, start: int, end: int, encoding: str):
+    with open(log_path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            return parse_log_span(buffer, start, end, encoding)
+
+
+def parse_log_span(buffer, start: int, end: int, encoding: str):
+    """
+    Parse buffer[start:end], which must start at the first line of a draw id
+    """
+    buffer.seek(start)
+
+    def readline():
+        if buffer.tell() >= end:
+            return b""
+        return buffer.readline()
+
+    return parse_log_lines(readline, encoding)
+
+
+def parse_log_file_lazy(log_path: Path, target_hashes: list[str]):
+    """
+    Parse only the draw ids of log.txt an extraction of target_hashes can lead to.
+
+    The draw ids binding a hash are found by searching the mapped log for it.
+    Starting from target_hashes, the buffers bound by the parsed draw ids are
+    searched for in turn, until no new buffer shows up. Then, the last shader
+    and index buffer bound before each parsed window of draw ids are parsed
+    as well, so that the pipeline state of every parsed draw id is complete.
+
+    Returns None if the log can't be decoded, if the parsed draw ids
+    cover too much of the log for the lazy parse to pay off, or if a
+    followed hash isn't bound anywhere the search can find it.
+    """
+    with open(log_path, "rb") as f:
+        if log_path.stat().st_size == 0:
+            return {}
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            encoding = detect_encoding(buffer)
+            if encoding is None:
+                return None
+
+            data_start = buffer.find(b"\n") + 1  # skip first line
+            if data_start == 0:
+                return {}
+
+            log_data: dict[int, DrawCall] = {}
+            spans = []
+            followed_hashes = set()
+            pending_hashes = set(target_hashes)
+            while pending_hashes:
+                new_spans, found_hashes = find_hash_spans(
+                    buffer, data_start, pending_hashes
+                )
+                # A target hash that isn't in the log isn't in the full parse
+                # either, but any other is bound by a parsed draw call. Not
+                # finding it would leave the parsed draw ids incomplete.
+                if missing_hashes := pending_hashes - found_hashes - set(target_hashes):
+                    logger.debug(
+                        "Lazy parse found no draw id binding %s",
+                        ", ".join(sorted(missing_hashes)),
+                    )
+                    return None
+
+                followed_hashes |= pending_hashes
+                pending_hashes = set()
+
+                spans = merge_spans(spans + new_spans)
+                if sum(end - start for start, end in spans) > (
+                    LAZY_PARSE_MAX_COVERAGE * len(buffer)
+                ):
+                    return None
+
+                for start, end in new_spans:
+                    for draw_id, draw_call in parse_log_span(
+                        buffer, start, end, encoding
+                    ).items():
+                        log_data[draw_id] = draw_call
+                        pending_hashes.update(
+                            resource_hash
+                            for resource_hash in get_followed_hashes(draw_call)
+                            if resource_hash not in followed_hashes
+                        )
+
+            for keyword, attribute in LAZY_PARSE_STATE_KEYWORDS.items():
+                lower = data_start
+                for start, _ in spans:
+                    upper = start
+                    # Shaders set by calls dropped by a reset aren't part of the
+                    # pipeline state, keep looking further back until one that
+                    # wasn't is found. Any IASetIndexBuffer sets the index buffer.
+                    while (offset := buffer.rfind(keyword, lower, upper)) >= 0:
+                        span_start, span_end = get_draw_id_span(
+                            buffer, data_start, offset
+                        )
+                        draw_calls = parse_log_span(
+                            buffer, span_start, span_end, encoding
+                        )
+                        log_data.update(draw_calls)
+                        if any(
+                            getattr(draw_call, attribute) is not None
+                            for draw_call in draw_calls.values()
+                        ):
+                            break
+                        upper = span_start
+                    lower = start
+
+    return dict(sorted(log_data.items()))
+
+
+def find_hash_spans(buffer, data_start: int, resource_hashes: set[str]):
+    """
+    Returns the (start, end) offsets of the lines of every draw id binding
+    any of resource_hashes, and the hashes found. Binding an index buffer
+    extends the span over the draw ids that follow, up to the one binding
+    the next index buffer, since indexed draw calls keep using it without
+    binding it again.
+    """
+    pattern = re.compile(
+        b"hash=("
+        + b"|".join(re.escape(h.encode("ascii")) for h in sorted(resource_hashes))
+        # Skip longer hashes starting with a resource hash
+        + b")(?![0-9A-Za-z])"
+    )
+
+    spans = []
+    found_hashes = set()
+    start = end = -1
+    for match in pattern.finditer(buffer, data_start):
+        found_hashes.add(match.group(1).decode("ascii"))
+        offset = match.start()
+        if offset >= end:
+            if end >= 0:
+                spans.append((start, end))
+            start, end = get_draw_id_span(buffer, data_start, offset)
+
+        line_start = buffer.rfind(b"\n", data_start - 1, offset) + 1
+        if buffer[line_start + 6 : line_start + 24] == b" IASetIndexBuffer(":
+            end = max(end, find_next_index_buffer_span(buffer, data_start, offset))
+
+    if end >= 0:
+        spans.append((start, end))
+    return spans, found_hashes
+
+
+def find_next_index_buffer_span(buffer, data_start: int, offset: int):
+    """
+    Returns the start of the draw id replacing the index buffer bound at offset.
+    Unbinding it replaces it too, as does a binding dropped by a reset.
+    """
+    line_end = buffer.find(b"\n", offset)
+    if line_end < 0:
+        return len(buffer)
+    offset = buffer.find(b" IASetIndexBuffer(", line_end)
+    if offset < 0:
+        return len(buffer)
+    return get_draw_id_start(buffer, data_start, offset)
+
+
+def get_draw_id_span(buffer, data_start: int, offset: int):
+    """
+    Returns the (start, end) offsets of the lines of the draw id logging the
+    line at offset. The lines of a draw id start at the first line prefixed
+    with it and end before the first line prefixed with another draw id.
+    """
+    start = get_draw_id_start(buffer, data_start, offset)
+    draw_id = buffer[start : start + 6]
+
+    end = buffer.find(b"\n", start) + 1
+    while 0 < end < len(buffer):
+        prefix = buffer[end : end + 6]
+        if prefix.isdigit() and prefix != draw_id:
+            return start, end
+        end = buffer.find(b"\n", end) + 1
+
+    return start, len(buffer)
+
+
+def get_draw_id_start(buffer, data_start: int, offset: int):
+    """
+    Returns the offset of the first line of the draw id logging the line at offset
+    """
+    lower = max(data_start - 1, 0)
+    line_start = buffer.rfind(b"\n", lower, offset) + 1
+    while not buffer[line_start : line_start + 6].isdigit() and line_start > data_start:
+        line_start = buffer.rfind(b"\n", lower, line_start - 1) + 1
+    draw_id = buffer[line_start : line_start + 6]
+
+    start = line_start
+    while line_start > data_start:
+        line_start = buffer.rfind(b"\n", lower, line_start - 1) + 1
+        prefix = buffer[line_start : line_start + 6]
+        if prefix.isdigit():
+            if prefix != draw_id:
+                break
+            start = line_start
+
+    return start
+
+
+def merge_spans(spans: list[tuple[int, int]]):
+    merged = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def get_followed_hashes(draw_call: DrawCall):
+    if draw_call.ib_hash is not None:
+        yield draw_call.ib_hash
+    if draw_call.ib_binding and draw_call.ib_binding != draw_call.ib_hash:
+        yield draw_call.ib_binding
+    for attribute in LAZY_PARSE_FOLLOWED_BINDINGS:
+        if bindings := getattr(draw_call, attribute):
+            yield from bindings[1::2]
+    for src_hash, dst_hash in draw_call.copies or ():
+        yield src_hash
+        yield dst_hash
+
+
+def parse_log_lines(readline, encoding: str, log_data: dict[int, DrawCall] = None):
+    """
+    Each draw id is parsed into nested dicts, which are packed
+    into a compact DrawCall once the next draw id shows up.
+    The draw calls are added to log_data if given.
+    """
+    if log_data is None:
+        log_data = {}
+
+    raw_draw_id = None
+    draw_id = None
+    draw_data = None
+
+    line = readline()
+    while line:
+        if not line[:6].isdigit():
+            line = readline()
+            continue
+
+        if line[:6] != raw_draw_id:
+            if draw_data is not None:
+                log_data[draw_id] = DrawCall.from_draw_data(draw_id, draw_data)
+            raw_draw_id = line[:6]
+            draw_id = int(raw_draw_id)
+            draw_data = log_data[draw_id].to_draw_data() if draw_id in log_data else {}
+
+        if line[7:15] == b"3DMigoto":
+            parse_texture_line(draw_data, strip_eol(line).decode(encoding))
+            line = readline()
+            continue
+
+        paren = line.find(b"(", 7)
+        keyword = line[7:paren] if paren >= 0 else None
+
+        if keyword in BINDING_KEYWORDS:
+            bindings = draw_data.setdefault(BINDING_KEYWORDS[keyword], {})
+            line = readline()
+            while s := BINDING_PATTERN.match(strip_eol(line)):
+                bindings[intern(s.group(1).decode(encoding))] = intern(
+                    s.group(2).decode(encoding)
+                )
+                line = readline()
+            continue
+
+        elif keyword == b"CopyResource":
+            # CopyResource could be called multiple times in the same call with distinct key pairs (src, dst)
+            copies = draw_data.setdefault("CopyResource", [])
+            src_hash = readline().strip().split(b"hash=")[1].decode(encoding)
+            dst_hash = readline().strip().split(b"hash=")[1].decode(encoding)
+            copies.append((intern(src_hash), intern(dst_hash)))
+
+        elif keyword in HASH_KEYWORDS:
+            if hash_match := HASH_PATTERN.search(line):
+                draw_data[HASH_KEYWORDS[keyword]] = intern(
+                    hash_match.group(1).decode("ascii")
+                )
+            if keyword == b"IASetIndexBuffer":
+                # Unbinding the index buffer isn't logged with a hash
+                draw_data["ib_binding"] = (
+                    draw_data["IASetIndexBuffer"] if hash_match else ""
+                )
+
+        elif keyword in DRAW_KEYWORDS:
+            args_fragment = line[paren + 1 :].split(b"(")[0].split(b")")[0]
+            args = DRAW_ARGS_PATTERN.findall(strip_eol(args_fragment).decode(encoding))
+            assert DRAW_KEYWORDS[keyword] not in draw_data
+            draw_data[DRAW_KEYWORDS[keyword]] = {arg[0]: arg[1] for arg in args}
+
+        elif keyword in RESET_KEYWORDS:
+            draw_data = {
+                key: draw_data[key] for key in RESET_KEPT_DATA if key in draw_data
+            }
+
+        line = readline()
+
+    if draw_data is not None:
+        log_data[draw_id] = DrawCall.from_draw_data(draw_id, draw_data)
+
+    return log_data
+
+
+def parse_texture_line(draw_data: dict, line: str):
+    m = LOG_TEXTURE_PATTERN.match(line)
+    if not m:
+        return
+
+    # Texture filenames are stored relative to the frame analysis folder
+    texture_filename = m.group("texture_filename")
+    if m.group("resource_prefix") == "ps-t":
+        if "textures" not in draw_data:
+            draw_data["textures"] = {}
+        draw_data["textures"][texture_filename] = LogTexture(
+            filename=texture_filename,
+            texture_slot=intern(m.group("texture_slot")),
+            texture_hash=intern(m.group("texture_hash")),
+            texture_format=intern(m.group("texture_format")),
+            contamination=m.group("contamination")[:-1]
+            if m.group("contamination")
+            else "",
+            extension=intern(m.group("extension")),
+            bleed=(
+                True
+                if "PSSetShaderResources" not in draw_data
+                else True
+                if m.group("texture_slot") not in draw_data["PSSetShaderResources"]
+                else m.group("texture_hash")
+                not in draw_data["PSSetShaderResources"][m.group("texture_slot")]
+            ),
+        )
+    else:
+        if "render_targets" not in draw_data:
+            draw_data["render_targets"] = {}
+        draw_data["render_targets"][texture_filename] = intern(m.group("texture_slot"))
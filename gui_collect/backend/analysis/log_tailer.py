@@ -0,0 +1,178 @@
+import time
+import logging
+import threading
+
+from io import BytesIO
+from pathlib import Path
+
+from .structs import DrawCall
+from .log_cache import get_cache_key, has_cached_log, save_cached_log
+from .log_parser import detect_encoding, get_draw_id_start, parse_log_lines
+from .LogAnalysis import analyze_log_data
+
+
+logger = logging.getLogger(__name__)
+
+LOG_TAIL_POLL_INTERVAL = 1.0
+# The dump is considered done once log.txt stops growing for this long
+LOG_TAIL_SETTLE_TIME = 5.0
+LOG_TAIL_READ_SIZE = 16 << 20
+
+
+class LogTailer:
+    """
+    Parse a log.txt 3DMigoto may still be writing, in a background thread.
+
+    Every poll resumes from the byte offset the last one stopped at. The
+    lines of the last draw id read so far are held back until the next draw
+    id shows up, so every parsed draw call is complete. Once log.txt stops
+    growing, the held back lines are parsed as well and the analysis is
+    written to the log cache, from which the next extraction loads it.
+    Should log.txt grow again afterwards, it is parsed from the start.
+
+    Extraction must stop the tailer first, so that the log is never parsed
+    twice at once and a finishing tailer gets to write the cache.
+    """
+
+    def __init__(self, log_path: Path):
+        self.log_path = log_path
+
+        self._thread = None
+        self._stop_event = threading.Event()
+
+        self._ready = False
+        self._failed = False
+        self.reset()
+
+    def reset(self):
+        self.offset = 0
+        self.pending = b""
+        self.header_skipped = False
+        self.encoding = None
+        self.log_data: dict[int, DrawCall] = {}
+        self.last_stat = None
+        self.last_change = None
+        self._ready = False
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop tailing and wait for the thread to exit
+        """
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def is_ready(self):
+        return self._ready
+
+    def has_failed(self):
+        return self._failed
+
+    def run(self):
+        try:
+            while not self._stop_event.is_set():
+                self.poll()
+                self._stop_event.wait(LOG_TAIL_POLL_INTERVAL)
+        except Exception as X:
+            logger.debug("Stopped tailing %s: %s", self.log_path, X)
+            self._ready = False
+            self._failed = True
+
+    def poll(self):
+        stat = self.log_path.stat()
+        stat_key = (stat.st_size, stat.st_mtime_ns)
+        # Nothing to parse if the dump is done and was already analyzed
+        if self.last_stat is None and has_cached_log(self.log_path):
+            self.last_stat = stat_key
+            self._ready = True
+            return
+
+        if stat_key != self.last_stat:
+            if stat.st_size < self.offset:
+                logger.debug("%s was truncated, parsing it again", self.log_path)
+                self.reset()
+            # A dump that was done before tailing started doesn't need to settle
+            self.last_change = (
+                time.time()
+                if self.last_stat is not None
+                else min(time.time(), stat.st_mtime)
+            )
+            self.last_stat = stat_key
+            self._ready = False
+            self.read()
+
+        if self._ready or time.time() - self.last_change < LOG_TAIL_SETTLE_TIME:
+            return
+
+        if has_cached_log(self.log_path):
+            self._ready = True
+            return
+
+        self.finish()
+
+    def read(self):
+        with open(self.log_path, "rb") as f:
+            f.seek(self.offset)
+            while not self._stop_event.is_set():
+                data = f.read(LOG_TAIL_READ_SIZE)
+                if not data:
+                    break
+                self.offset += len(data)
+                self.pending += data
+
+                if not self.header_skipped:
+                    header_end = self.pending.find(b"\n")
+                    if header_end < 0:
+                        continue
+                    self.pending = self.pending[header_end + 1 :]
+                    self.header_skipped = True
+
+                # The last draw id might not be fully written yet
+                last_line_end = self.pending.rfind(b"\n")
+                if last_line_end < 0:
+                    continue
+                last_line_start = self.pending.rfind(b"\n", 0, last_line_end) + 1
+                end = get_draw_id_start(self.pending, 0, last_line_start)
+
+                self.parse(self.pending[:end], self.log_data)
+                self.pending = self.pending[end:]
+
+    def parse(self, data: bytes, log_data: dict[int, DrawCall]):
+        if not data:
+            return
+
+        if not data.isascii():
+            encoding = detect_encoding(data)
+            # The whole log has to decode the same way it would if it was
+            # parsed once done, otherwise leave it to the full parse
+            if encoding is None or self.encoding not in [None, encoding]:
+                raise Exception("log.txt encoding is not consistent")
+            self.encoding = encoding
+
+        parse_log_lines(BytesIO(data).readline, self.encoding or "UTF-8", log_data)
+
+    def finish(self):
+        """
+        Cache the analysis of the whole log, held back lines included.
+        The parsed draw calls aren't needed past that, the cache has them.
+        """
+        st = time.time()
+        cache_key = get_cache_key(self.log_path)
+        if cache_key[1:] != self.last_stat:
+            return
+
+        self.parse(self.pending, self.log_data)
+        parsed_log = analyze_log_data(self.log_data)
+        save_cached_log(self.log_path, cache_key, parsed_log)
+
+        self.reset()
+        self._ready = True
+
+        logger.debug(
+            "Analysis of {} ready in {:.3}s".format(self.log_path, time.time() - st)
+        )
@@ -0,0 +1,99 @@
+from .structs import DrawCall, BINDING_KEYWORD_ATTRIBUTES
+
+
+class PipelineState:
+    """
+    Shaders and resources bound to the pipeline when a draw call is issued
+
+    States are never modified once built. A draw call that doesn't bind
+    anything shares the state of the draw call before it, and a draw call
+    binding a single keyword shares the bindings of every other keyword.
+
+    The resources bound by each binding keyword are stored as a tuple
+    indexed by slot, holding None at the slots nothing is bound to.
+    """
+
+    __slots__ = (
+        "vs_hash",
+        "ps_hash",
+        "cs_hash",
+        "ib_hash",
+        *BINDING_KEYWORD_ATTRIBUTES.values(),
+    )
+
+    def __init__(self):
+        self.vs_hash: str = None
+        self.ps_hash: str = None
+        self.cs_hash: str = None
+        self.ib_hash: str = None
+
+        self.vertex_buffers: tuple[str, ...] = ()
+        self.so_targets: tuple[str, ...] = ()
+        self.cs_uavs: tuple[str, ...] = ()
+        self.cs_srvs: tuple[str, ...] = ()
+        self.cs_cbs: tuple[str, ...] = ()
+        self.ps_srvs: tuple[str, ...] = ()
+
+    def apply(self, draw_call: DrawCall):
+        """
+        Returns the state after the calls logged under draw_call
+        """
+        state = self
+        for attribute in ["vs_hash", "ps_hash", "cs_hash"]:
+            value = getattr(draw_call, attribute)
+            if value is not None and value != getattr(state, attribute):
+                state = state.copy() if state is self else state
+                setattr(state, attribute, value)
+
+        if draw_call.ib_binding is not None:
+            ib_hash = draw_call.ib_binding or None
+            if ib_hash != state.ib_hash:
+                state = state.copy() if state is self else state
+                state.ib_hash = ib_hash
+
+        for attribute in BINDING_KEYWORD_ATTRIBUTES.values():
+            draw_bindings = getattr(draw_call, attribute)
+            if not draw_bindings:
+                continue
+
+            prev_bindings = getattr(self, attribute)
+            bindings = list(prev_bindings)
+            for slot, resource_hash in zip(draw_bindings[::2], draw_bindings[1::2]):
+                if not slot.isdigit():
+                    continue
+                slot = int(slot)
+                if slot >= len(bindings):
+                    bindings.extend([None] * (slot + 1 - len(bindings)))
+                bindings[slot] = resource_hash
+
+            bindings = tuple(bindings)
+            if bindings != prev_bindings:
+                state = state.copy() if state is self else state
+                setattr(state, attribute, bindings)
+
+        return state
+
+    def copy(self):
+        state = PipelineState.__new__(PipelineState)
+        for attribute in PipelineState.__slots__:
+            setattr(state, attribute, getattr(self, attribute))
+        return state
+
+
+def track_pipeline_state(log_data: dict[int, DrawCall]) -> dict[int, PipelineState]:
+    """
+    Compute the pipeline state of every draw id in a single forward pass
+    over the parsed log data. Shaders, the index buffer and the resources
+    bound at each slot carry over from earlier draw calls until rebound.
+
+    Calls that unbind a shader or a resource view aren't logged with a hash,
+    so they don't clear it from the pipeline state. The index buffer is the
+    exception: it is set by every IASetIndexBuffer, including those unbinding
+    it and those dropped by a reset later in their draw id.
+    """
+    pipeline_states = {}
+    state = PipelineState()
+    for draw_id, draw_call in log_data.items():
+        state = state.apply(draw_call)
+        pipeline_states[draw_id] = state
+    return pipeline_states
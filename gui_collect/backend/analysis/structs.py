@@ -2,8 +2,10 @@ import struct
 import logging
 import threading
 
+from bisect import bisect_left
 from dataclasses import dataclass, field
 from pathlib import Path
+from typing import NamedTuple
 from os.path import getsize
 
 from gui_collect.backend.utils.texture_utils.texdiag_helper import get_texdiag_info
@@ -230,6 +232,303 @@ def read_width_height(image_path):
     return (width, height)
 
 
+class LogIndex:
+    """
+    Inverted index of the resource hashes bound in log.txt
+
+    Maps a (keyword, slot) binding kind to the draw ids each resource
+    hash is bound at, in log order. A slot of None matches the hash
+    bound at any slot of that keyword.
+    """
+
+    def __init__(self):
+        self._index: dict[tuple[str, str], dict[str, list[str]]] = {}
+
+    def add(self, keyword: str, slot: str, resource_hash: str, draw_id: str):
+        keys = [(keyword, None)]
+        if slot is not None:
+            keys.append((keyword, slot))
+
+        for key in keys:
+            draw_ids = self._index.setdefault(key, {}).setdefault(resource_hash, [])
+            # The same hash may be bound at multiple slots of the same draw call
+            if not draw_ids or draw_ids[-1] != draw_id:
+                draw_ids.append(draw_id)
+
+    def get_ids(self, keyword: str, resource_hash: str, slot: str = None) -> list[str]:
+        return list(self._index.get((keyword, slot), {}).get(resource_hash, []))
+
+
+class CopyGraph:
+    """
+    Directed graph of the CopyResource calls in log.txt
+
+    Every destination hash maps to its incoming edges in log order. Each
+    edge holds the position of the copy among all copies of the log, the
+    draw id it was called at and the source hash.
+    """
+
+    def __init__(self):
+        self._edges: dict[str, list[tuple[int, str, str]]] = {}
+        self._copy_count = 0
+
+    def add(self, src_hash: str, dst_hash: str, draw_id: str):
+        self._edges.setdefault(dst_hash, []).append(
+            (self._copy_count, draw_id, src_hash)
+        )
+        self._copy_count += 1
+
+    def get_sources(self, dst_hash: str, draw_id: str = None) -> list[str]:
+        """
+        Returns the hashes copied to dst_hash in log order,
+        only those copied at draw_id if given
+        """
+        return [
+            src_hash
+            for _, edge_draw_id, src_hash in self._edges.get(dst_hash, [])
+            if draw_id is None or edge_draw_id == draw_id
+        ]
+
+    def get_chain(self, start_hash: str) -> tuple[str, list[str]]:
+        """
+        Follow start_hash back through the copies that produced it. Each
+        step takes the last copy to the current hash that happened before
+        the copy followed in the previous step. Copies of a resource onto
+        itself are skipped.
+
+        Returns the draw id of the earliest copy followed, or None, and
+        the chain of hashes starting at start_hash.
+        """
+        chain = [start_hash]
+        root_id = None
+        cursor = self._copy_count
+        while True:
+            edges = self._edges.get(chain[-1], [])
+            for i in reversed(range(bisect_left(edges, (cursor,)))):
+                seq, draw_id, src_hash = edges[i]
+                if src_hash != chain[-1]:
+                    break
+            else:
+                return root_id, chain
+
+            chain.append(src_hash)
+            root_id = draw_id
+            cursor = seq
+
+    def get_ancestors(self, resource_hash: str) -> set[str]:
+        """
+        Returns every hash that was copied into resource_hash,
+        directly or through intermediate copies, at any point of the log
+        """
+        ancestors = set()
+        pending = [resource_hash]
+        while pending:
+            for _, _, src_hash in self._edges.get(pending.pop(), []):
+                if src_hash not in ancestors and src_hash != resource_hash:
+                    ancestors.add(src_hash)
+                    pending.append(src_hash)
+        return ancestors
+
+
+class LogTexture(NamedTuple):
+    filename: str
+    texture_slot: str
+    texture_hash: str
+    texture_format: str
+    contamination: str
+    extension: str
+    bleed: bool
+
+
+# Attribute of DrawCall holding the data logged by each keyword
+HASH_KEYWORD_ATTRIBUTES = {
+    "IASetIndexBuffer": "ib_hash",
+    "VSSetShader": "vs_hash",
+    "PSSetShader": "ps_hash",
+    "CSSetShader": "cs_hash",
+}
+BINDING_KEYWORD_ATTRIBUTES = {
+    "IASetVertexBuffers": "vertex_buffers",
+    "SOSetTargets": "so_targets",
+    "CSSetUnorderedAccessViews": "cs_uavs",
+    "CSSetShaderResources": "cs_srvs",
+    "CSSetConstantBuffers": "cs_cbs",
+    "PSSetShaderResources": "ps_srvs",
+}
+
+
+class DrawCall:
+    """
+    Compact record of everything log.txt logged under a single draw id
+
+    Hashes and slots are interned strings. The resources bound by each
+    binding keyword are stored as a flat (slot, hash, slot, hash, ...)
+    tuple. Keywords that weren't logged are None, while binding keywords
+    logged without any bound resource are an empty tuple.
+
+    draw_call[keyword] reads of the hash, binding and CopyResource keywords
+    build the same str, dict and list values the log used to be parsed into.
+
+    ib_binding is the index buffer left bound by the last IASetIndexBuffer
+    of the draw id, an empty string if it unbound it. Unlike ib_hash, it is
+    kept when a reset drops the rest of the draw id's data.
+    """
+
+    __slots__ = (
+        "id",
+        *HASH_KEYWORD_ATTRIBUTES.values(),
+        "ib_binding",
+        *BINDING_KEYWORD_ATTRIBUTES.values(),
+        "copies",
+        "draw",
+        "index_count",
+        "first_index",
+        "textures",
+        "render_targets",
+    )
+
+    def __init__(self, draw_id: int):
+        self.id: int = draw_id
+
+        self.ib_hash: str = None
+        self.vs_hash: str = None
+        self.ps_hash: str = None
+        self.cs_hash: str = None
+        self.ib_binding: str = None
+
+        self.vertex_buffers: tuple[str, ...] = None
+        self.so_targets: tuple[str, ...] = None
+        self.cs_uavs: tuple[str, ...] = None
+        self.cs_srvs: tuple[str, ...] = None
+        self.cs_cbs: tuple[str, ...] = None
+        self.ps_srvs: tuple[str, ...] = None
+
+        # (src_hash, dst_hash) pairs in call order
+        self.copies: tuple[tuple[str, str], ...] = None
+
+        # DrawIndexed or DrawIndexedInstanced
+        self.draw: str = None
+        self.index_count: int = None
+        self.first_index: int = None
+
+        self.textures: tuple[LogTexture, ...] = None
+        # Flat (slot, filename, slot, filename, ...) tuple
+        self.render_targets: tuple[str, ...] = None
+
+    @classmethod
+    def from_draw_data(cls, draw_id: int, draw_data: dict):
+        """
+        Build the record from the nested dicts of a draw id
+        in the layout used while parsing log.txt
+        """
+        draw_call = cls(draw_id)
+        for keyword, attribute in HASH_KEYWORD_ATTRIBUTES.items():
+            if keyword in draw_data:
+                setattr(draw_call, attribute, draw_data[keyword])
+        draw_call.ib_binding = draw_data.get("ib_binding")
+
+        for keyword, attribute in BINDING_KEYWORD_ATTRIBUTES.items():
+            if keyword in draw_data:
+                setattr(
+                    draw_call,
+                    attribute,
+                    tuple(v for binding in draw_data[keyword].items() for v in binding),
+                )
+
+        if "CopyResource" in draw_data:
+            draw_call.copies = tuple(draw_data["CopyResource"])
+
+        for keyword, index_count_arg in [
+            ("DrawIndexedInstanced", "IndexCountPerInstance"),
+            ("DrawIndexed", "IndexCount"),
+        ]:
+            if keyword in draw_data:
+                draw_call.draw = keyword
+                draw_call.index_count = to_int(draw_data[keyword].get(index_count_arg))
+                draw_call.first_index = to_int(
+                    draw_data[keyword].get("StartIndexLocation")
+                )
+                break
+
+        if "textures" in draw_data:
+            draw_call.textures = tuple(draw_data["textures"].values())
+        if "render_targets" in draw_data:
+            draw_call.render_targets = tuple(
+                v
+                for filename, slot in draw_data["render_targets"].items()
+                for v in (slot, filename)
+            )
+
+        return draw_call
+
+    def to_draw_data(self) -> dict:
+        """
+        Inverse of from_draw_data, only needed
+        if a draw id shows up again later in log.txt
+        """
+        draw_data = {}
+        for keyword in [*HASH_KEYWORD_ATTRIBUTES, *BINDING_KEYWORD_ATTRIBUTES]:
+            if keyword in self:
+                draw_data[keyword] = self[keyword]
+        if self.ib_binding is not None:
+            draw_data["ib_binding"] = self.ib_binding
+        if self.copies is not None:
+            draw_data["CopyResource"] = list(self.copies)
+        if self.draw is not None:
+            draw_data[self.draw] = {
+                "IndexCountPerInstance"
+                if self.draw == "DrawIndexedInstanced"
+                else "IndexCount": str(self.index_count),
+                "StartIndexLocation": str(self.first_index),
+            }
+        if self.textures is not None:
+            draw_data["textures"] = {t.filename: t for t in self.textures}
+        if self.render_targets is not None:
+            draw_data["render_targets"] = dict(
+                zip(self.render_targets[1::2], self.render_targets[::2])
+            )
+        return draw_data
+
+    def iter_bindings(self, keyword: str):
+        """
+        Yields the (slot, hash) pairs bound by keyword
+        """
+        bindings = getattr(self, BINDING_KEYWORD_ATTRIBUTES[keyword])
+        if bindings:
+            yield from zip(bindings[::2], bindings[1::2])
+
+    def get_str_id(self):
+        return "{:06}".format(self.id)
+
+    def __contains__(self, keyword: str):
+        if keyword == "CopyResource":
+            return self.copies is not None
+        if keyword in HASH_KEYWORD_ATTRIBUTES:
+            return getattr(self, HASH_KEYWORD_ATTRIBUTES[keyword]) is not None
+        if keyword in BINDING_KEYWORD_ATTRIBUTES:
+            return getattr(self, BINDING_KEYWORD_ATTRIBUTES[keyword]) is not None
+        return False
+
+    def __getitem__(self, keyword: str):
+        if keyword not in self:
+            raise KeyError(keyword)
+        if keyword == "CopyResource":
+            return list(self.copies)
+        if keyword in HASH_KEYWORD_ATTRIBUTES:
+            return getattr(self, HASH_KEYWORD_ATTRIBUTES[keyword])
+        return dict(self.iter_bindings(keyword))
+
+    def __repr__(self):
+        return "DrawCall({}, {})".format(self.get_str_id(), self.to_draw_data())
+
+
+def to_int(value: str):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
 @dataclass
 class ID_Data:
     vs_hash: str = ""
@@ -11,6 +11,9 @@ GAME_NAME = {
     "hi3": "Honkai Impact 3rd",
 }
 
+# Tar archives are written uncompressed, zip archives deflate all but textures
+ARCHIVE_FORMATS = ["zip", "tar"]
+
 
 @dataclass
 class _TargetedConfigOptionData:
@@ -25,6 +28,11 @@ class _GameConfigOptionData:
     clean_extract_folder: bool = True
     open_extract_folder: bool = True
     delete_frame_analysis: bool = False
+    binary_model_data: bool = False
+    link_exported_files: bool = False
+    incremental_export: bool = False
+    export_archive: bool = False
+    archive_format: str = "zip"
 
 
 @dataclass
@@ -75,6 +83,7 @@ class ConfigData:
     targeted_analysis_enabled: bool = False
     reverse_shapekeys_hsr: bool = True
     reverse_shapekeys_zzz: bool = False
+    export_workers: int = 1
     game: dict[str, _GameConfigData] = field(
         default_factory=lambda: {
             "zzz": _GameConfigData(_game="zzz"),
@@ -95,7 +104,7 @@ class ConfigData:
         This method will check if all keys are present and
         add if needed add those keys with default values.
         Unrecognized and deprecated keys will be removed.
-        The value is not validated.
+        The value is not validated, except for archive_format.
         """
         default_config_data = asdict(ConfigData())
 
@@ -109,6 +118,7 @@ class ConfigData:
                 "targeted_analysis_enabled",
                 "reverse_shapekeys_hsr",
                 "reverse_shapekeys_zzz",
+                "export_workers",
                 "game",
             },
         )
@@ -134,8 +144,20 @@ class ConfigData:
                     "clean_extract_folder",
                     "open_extract_folder",
                     "delete_frame_analysis",
+                    "binary_model_data",
+                    "link_exported_files",
+                    "incremental_export",
+                    "export_archive",
+                    "archive_format",
                 },
             )
+            game_options = d["game"][g]["game_options"]
+            if game_options["archive_format"] not in ARCHIVE_FORMATS:
+                print(
+                    '\t- Replaced unsupported "game/{}/game_options/archive_format" '
+                    '"{}" with "zip"'.format(g, game_options["archive_format"])
+                )
+                game_options["archive_format"] = "zip"
             _validate_helper(
                 d,
                 default_config_data,
@@ -0,0 +1,317 @@
+import io
+import os
+import time
+import zlib
+import struct
+import shutil
+import tarfile
+import tempfile
+import threading
+
+from pathlib import Path
+
+
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+ZIP_COMPRESS_LEVEL = 6
+# Same as zipfile, for readers that take the sizes as signed
+ZIP64_LIMIT = (1 << 31) - 1
+ZIP64_MARKER = 0xFFFFFFFF
+ZIP_UTF8_FLAG = 0x800
+
+# Prepared members past this size are spooled to a temporary file
+ARCHIVE_SPOOL_SIZE = 4 << 20
+COPY_BUFFER_SIZE = 1 << 20
+
+
+class ArchiveMember(io.RawIOBase):
+    """
+    Writable file holding the data of a member while it is produced,
+    deflated on the fly if compress is set. This happens in the thread
+    producing the member, outside of the lock of the archive, so members
+    are compressed in parallel. Only the finished data is then copied
+    into the archive.
+    """
+
+    def __init__(self, compress: bool):
+        super().__init__()
+        self.method = ZIP_DEFLATED if compress else ZIP_STORED
+        self.data = tempfile.SpooledTemporaryFile(max_size=ARCHIVE_SPOOL_SIZE)
+        self.crc = 0
+        self.size = 0
+        self.compress_size = 0
+        self.compressor = (
+            zlib.compressobj(ZIP_COMPRESS_LEVEL, zlib.DEFLATED, -15)
+            if compress
+            else None
+        )
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.crc = zlib.crc32(b, self.crc)
+        self.size += len(b)
+        self.write_data(self.compressor.compress(b) if self.compressor else b)
+        return len(b)
+
+    def write_data(self, data: bytes):
+        self.compress_size += len(data)
+        self.data.write(data)
+
+    def finish(self):
+        if self.compressor:
+            self.write_data(self.compressor.flush())
+            self.compressor = None
+
+    def close(self):
+        self.data.close()
+        super().close()
+
+
+class ZipStreamWriter:
+    """
+    Writes a zip archive one member at a time, as they are finished.
+    Members are either prepared as an ArchiveMember, or stored straight
+    from their file. Zip64 records are only written where the sizes or
+    offsets need them. Safe to share between threads.
+    """
+
+    compresses = True
+
+    def __init__(self, path: Path):
+        self.file = open(path, "wb")
+        self.entries = []
+        self.lock = threading.Lock()
+
+    def add_member(self, name: str, member: ArchiveMember):
+        with self.lock:
+            self.write_local_header(
+                name, member.method, member.crc, member.compress_size, member.size
+            )
+            member.data.seek(0)
+            shutil.copyfileobj(member.data, self.file, COPY_BUFFER_SIZE)
+
+    def add_file(self, name: str, src_path: Path):
+        size = os.path.getsize(src_path)
+        with self.lock, open(src_path, "rb") as src:
+            offset = self.write_local_header(name, ZIP_STORED, 0, size, size)
+
+            crc = 0
+            while chunk := src.read(COPY_BUFFER_SIZE):
+                crc = zlib.crc32(chunk, crc)
+                self.file.write(chunk)
+
+            # The CRC is only known once the file was read
+            end = self.file.tell()
+            self.file.seek(offset + 14)
+            self.file.write(struct.pack("<L", crc))
+            self.file.seek(end)
+            self.entries[-1]["crc"] = crc
+
+    def write_local_header(
+        self, name: str, method: int, crc: int, compress_size: int, size: int
+    ):
+        offset = self.file.tell()
+        name_bytes = name.encode("utf-8")
+        flags = 0 if name.isascii() else ZIP_UTF8_FLAG
+        dos_time, dos_date = get_dos_date_time(time.localtime())
+
+        self.entries.append({
+            "name": name_bytes,
+            "flags": flags,
+            "method": method,
+            "time": dos_time,
+            "date": dos_date,
+            "crc": crc,
+            "compress_size": compress_size,
+            "size": size,
+            "offset": offset,
+        })
+
+        # The local header holds both sizes in the zip64 extra field, or neither
+        extra = b""
+        version = 20
+        if size >= ZIP64_LIMIT or compress_size >= ZIP64_LIMIT:
+            extra = struct.pack("<HHQQ", 1, 16, size, compress_size)
+            version = 45
+            size = compress_size = ZIP64_MARKER
+
+        self.file.write(
+            struct.pack(
+                "<LHHHHHLLLHH",
+                0x04034B50,
+                version,
+                flags,
+                method,
+                dos_time,
+                dos_date,
+                crc,
+                compress_size,
+                size,
+                len(name_bytes),
+                len(extra),
+            )
+        )
+        self.file.write(name_bytes)
+        self.file.write(extra)
+
+        return offset
+
+    def close(self):
+        with self.lock:
+            central_directory_offset = self.file.tell()
+            for entry in self.entries:
+                self.write_central_directory_header(entry)
+            central_directory_size = self.file.tell() - central_directory_offset
+
+            entry_count = len(self.entries)
+            if (
+                entry_count >= 0xFFFF
+                or central_directory_offset >= ZIP64_LIMIT
+                or central_directory_size >= ZIP64_LIMIT
+            ):
+                zip64_end_offset = self.file.tell()
+                self.file.write(
+                    struct.pack(
+                        "<LQHHLLQQQQ",
+                        0x06064B50,
+                        44,
+                        45,
+                        45,
+                        0,
+                        0,
+                        entry_count,
+                        entry_count,
+                        central_directory_size,
+                        central_directory_offset,
+                    )
+                )
+                self.file.write(
+                    struct.pack("<LLQL", 0x07064B50, 0, zip64_end_offset, 1)
+                )
+                # The values are read from the zip64 record instead
+                entry_count = 0xFFFF
+                central_directory_size = ZIP64_MARKER
+                central_directory_offset = ZIP64_MARKER
+
+            self.file.write(
+                struct.pack(
+                    "<LHHHHLLH",
+                    0x06054B50,
+                    0,
+                    0,
+                    entry_count,
+                    entry_count,
+                    central_directory_size,
+                    central_directory_offset,
+                    0,
+                )
+            )
+            self.file.close()
+
+    def write_central_directory_header(self, entry: dict):
+        # Only the fields that don't fit are moved into the zip64 extra field
+        zip64_fields = []
+        size = entry["size"]
+        compress_size = entry["compress_size"]
+        offset = entry["offset"]
+        if size >= ZIP64_LIMIT:
+            zip64_fields.append(size)
+            size = ZIP64_MARKER
+        if compress_size >= ZIP64_LIMIT:
+            zip64_fields.append(compress_size)
+            compress_size = ZIP64_MARKER
+        if offset >= ZIP64_LIMIT:
+            zip64_fields.append(offset)
+            offset = ZIP64_MARKER
+
+        extra = b""
+        version = 20
+        if zip64_fields:
+            extra = struct.pack(
+                "<HH" + "Q" * len(zip64_fields), 1, 8 * len(zip64_fields), *zip64_fields
+            )
+            version = 45
+
+        self.file.write(
+            struct.pack(
+                "<LHHHHHHLLLHHHHHLL",
+                0x02014B50,
+                version,
+                version,
+                entry["flags"],
+                entry["method"],
+                entry["time"],
+                entry["date"],
+                entry["crc"],
+                compress_size,
+                size,
+                len(entry["name"]),
+                len(extra),
+                0,
+                0,
+                0,
+                0,
+                offset,
+            )
+        )
+        self.file.write(entry["name"])
+        self.file.write(extra)
+
+    def discard(self):
+        with self.lock:
+            self.file.close()
+
+
+class TarStreamWriter:
+    """
+    Writes an uncompressed tar archive one member at a time, as they are
+    finished. Tar has no compression of its own per member, and compressing
+    the whole stream would deflate the textures too, so nothing is
+    compressed. Safe to share between threads.
+    """
+
+    compresses = False
+
+    def __init__(self, path: Path):
+        self.tar = tarfile.open(path, "w", format=tarfile.PAX_FORMAT)
+        self.lock = threading.Lock()
+
+    def add_member(self, name: str, member: ArchiveMember):
+        tar_info = tarfile.TarInfo(name)
+        tar_info.size = member.size
+        tar_info.mtime = int(time.time())
+        with self.lock:
+            member.data.seek(0)
+            self.tar.addfile(tar_info, member.data)
+
+    def add_file(self, name: str, src_path: Path):
+        st = os.stat(src_path)
+        tar_info = tarfile.TarInfo(name)
+        tar_info.size = st.st_size
+        tar_info.mtime = int(st.st_mtime)
+        with self.lock, open(src_path, "rb") as src:
+            self.tar.addfile(tar_info, src)
+
+    def close(self):
+        with self.lock:
+            self.tar.close()
+
+    def discard(self):
+        with self.lock:
+            self.tar.fileobj.close()
+
+
+ARCHIVE_WRITERS = {
+    "zip": ZipStreamWriter,
+    "tar": TarStreamWriter,
+}
+
+
+def get_dos_date_time(t: time.struct_time):
+    # Dos dates start at 1980 and count seconds by two
+    year = max(t.tm_year, 1980)
+    dos_date = (year - 1980) << 9 | t.tm_mon << 5 | t.tm_mday
+    dos_time = t.tm_hour << 11 | t.tm_min << 5 | t.tm_sec // 2
+    return dos_time, dos_date
@@ -0,0 +1,76 @@
+import logging
+import threading
+
+from collections import OrderedDict
+from pathlib import Path
+
+from .structs import BufferData
+from .buffer_decoder import collect_binary_buffer_data
+
+
+logger = logging.getLogger(__name__)
+
+# Total size of the source buffers whose decoded data is kept around
+DECODED_BUFFER_CACHE_SIZE = 512 << 20
+
+
+class DecodedBufferCache:
+    """
+    Decoded buffers of an export, so that the buffers several components
+    point to are only read and decoded once. The least recently used
+    buffers are dropped once the buffers add up to more than max_size
+    bytes. Safe to share between threads.
+    """
+
+    def __init__(self, max_size: int = DECODED_BUFFER_CACHE_SIZE):
+        self.max_size = max_size
+        self.size = 0
+        self.buffers: OrderedDict[tuple, BufferData] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def collect_binary_buffer_data(
+        self,
+        buffer_path: Path,
+        buffer_formats: list[str],
+        buffer_stride: int,
+        *,
+        shapekey_buffer_path: Path = None,
+        shapekey_cb_paths: list[Path] = None,
+    ):
+        key = (
+            buffer_path.resolve(),
+            buffer_stride,
+            tuple(buffer_formats),
+            shapekey_buffer_path.resolve() if shapekey_buffer_path else None,
+            tuple([p.resolve() for p in shapekey_cb_paths or []]),
+        )
+
+        with self.lock:
+            if (buffer_data := self.buffers.get(key)) is not None:
+                self.buffers.move_to_end(key)
+                logger.debug("Reusing decoded <PATH>%s</PATH>", buffer_path.name)
+                return buffer_data
+
+        buffer_data = collect_binary_buffer_data(
+            buffer_path,
+            buffer_formats,
+            buffer_stride,
+            shapekey_buffer_path=shapekey_buffer_path,
+            shapekey_cb_paths=shapekey_cb_paths,
+        )
+
+        with self.lock:
+            if key not in self.buffers:
+                self.buffers[key] = buffer_data
+                self.size += get_buffer_size(buffer_data)
+
+            # Always keep the buffer that was just decoded
+            while self.size > self.max_size and len(self.buffers) > 1:
+                _, evicted_buffer_data = self.buffers.popitem(last=False)
+                self.size -= get_buffer_size(evicted_buffer_data)
+
+        return buffer_data
+
+
+def get_buffer_size(buffer_data: BufferData):
+    return len(buffer_data.buffer) if buffer_data.buffer is not None else 0
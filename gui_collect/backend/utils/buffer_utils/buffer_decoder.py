@@ -1,89 +1,34 @@
-import re
+import sys
 import logging
 import struct
 
+from array import array
 from pathlib import Path
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
-logger = logging.getLogger(__name__)
-
-
-# Major thanks to DarkStarSword
-# https://github.com/DarkStarSword/3d-fixes/blob/cef49cbe6b324dc7a2041c1928f9b41678b3c61e/blender_3dmigoto.py#L113
-
-u8_pattern = re.compile(r"""(?:[RGBAD]8)+_UINT""")
-u16_pattern = re.compile(r"""(?:[RGBAD]16)+_UINT""")
-u32_pattern = re.compile(r"""(?:[RGBAD]32)+_UINT""")
-
-s8_pattern = re.compile(r"""(?:[RGBAD]8)+_SINT""")
-s16_pattern = re.compile(r"""(?:[RGBAD]16)+_SINT""")
-s32_pattern = re.compile(r"""(?:[RGBAD]32)+_SINT""")
+from .structs import BufferData
+from .dxgi_format import get_dxgi_format
 
-f16_pattern = re.compile(r"""(?:[RGBAD]16)+_FLOAT""")
-f32_pattern = re.compile(r"""(?:[RGBAD]32)+_FLOAT""")
 
-unorm8_pattern = re.compile(r"""(?:[RGBAD]8)+_UNORM""")
-unorm16_pattern = re.compile(r"""(?:[RGBAD]16)+_UNORM""")
+logger = logging.getLogger(__name__)
 
-snorm8_pattern = re.compile(r"""(?:[RGBAD]8)+_SNORM""")
-snorm16_pattern = re.compile(r"""(?:[RGBAD]16)+_SNORM""")
+# Array typecode and numpy dtype of the index buffer formats
+INDEX_BUFFER_FORMATS = {
+    "DXGI_FORMAT_R16_UINT": ("H", "<u2"),
+    "DXGI_FORMAT_R32_UINT": ("I", "<u4"),
+}
 
 
 def get_byte_width(dxgi_format: str):
-    matches = re.findall(r"([0-9]+)", dxgi_format.split("_", maxsplit=1)[0])
-    return sum([int(x) for x in matches]) // 8
+    return get_dxgi_format(dxgi_format).byte_width
 
 
 def get_decoder(dxgi_format: str):
-    matches = re.findall(r"([0-9]+)", dxgi_format.split("_", maxsplit=1)[0])
-    component_count = len(matches)
-
-    FORMAT = lambda x: "<{}".format(x * component_count)
-
-    # Build the struct once, instead of building it each time the lambda is called
-
-    if f16_pattern.match(dxgi_format):
-        unpack_from = struct.Struct(FORMAT("e")).unpack_from
-        return lambda buffer, offset: unpack_from(buffer, offset)
-    if f32_pattern.match(dxgi_format):
-        unpack_from = struct.Struct(FORMAT("f")).unpack_from
-        return lambda buffer, offset: unpack_from(buffer, offset)
-
-    if u8_pattern.match(dxgi_format):
-        unpack_from = struct.Struct(FORMAT("B")).unpack_from
-        return lambda buffer, offset: unpack_from(buffer, offset)
-    if u16_pattern.match(dxgi_format):
-        unpack_from = struct.Struct(FORMAT("H")).unpack_from
-        return lambda buffer, offset: unpack_from(buffer, offset)
-    if u32_pattern.match(dxgi_format):
-        unpack_from = struct.Struct(FORMAT("L")).unpack_from
-        return lambda buffer, offset: unpack_from(buffer, offset)
-
-    if s8_pattern.match(dxgi_format):
-        unpack_from = struct.Struct(FORMAT("b")).unpack_from
-        return lambda buffer, offset: unpack_from(buffer, offset)
-    if s16_pattern.match(dxgi_format):
-        unpack_from = struct.Struct(FORMAT("h")).unpack_from
-        return lambda buffer, offset: unpack_from(buffer, offset)
-    if s32_pattern.match(dxgi_format):
-        unpack_from = struct.Struct(FORMAT("l")).unpack_from
-        return lambda buffer, offset: unpack_from(buffer, offset)
-
-    if unorm8_pattern.match(dxgi_format):
-        unpack_from = struct.Struct(FORMAT("B")).unpack_from
-        return lambda buffer, offset: [x / 255.0 for x in unpack_from(buffer, offset)]
-    if unorm16_pattern.match(dxgi_format):
-        unpack_from = struct.Struct(FORMAT("H")).unpack_from
-        return lambda buffer, offset: [x / 65535.0 for x in unpack_from(buffer, offset)]
-
-    if snorm8_pattern.match(dxgi_format):
-        unpack_from = struct.Struct(FORMAT("b")).unpack_from
-        return lambda buffer, offset: [x / 127.0 for x in unpack_from(buffer, offset)]
-    if snorm16_pattern.match(dxgi_format):
-        unpack_from = struct.Struct(FORMAT("h")).unpack_from
-        return lambda buffer, offset: [x / 32767.0 for x in unpack_from(buffer, offset)]
-
-    raise Exception("Unrecognized dxgi format: {}".format(dxgi_format))
+    return get_dxgi_format(dxgi_format).get_struct_decoder()
 
 
 def collect_binary_buffer_data(
@@ -102,24 +47,123 @@ def collect_binary_buffer_data(
             bytearray(buffer), shapekey_buffer_path.read_bytes(), shapekey_cb_paths
         )
 
+    vertex_count = len(buffer) // buffer_stride
+    expressed_stride = sum(get_byte_width(format) for format in buffer_formats)
+
+    # Elements reaching past the stride can't be expressed as a structured dtype
+    if np is not None and expressed_stride <= buffer_stride:
+        return decode_buffer_numpy(buffer, buffer_formats, buffer_stride, vertex_count)
+
     byte_offset = 0
     decoder_offset = []
     for format in buffer_formats:
         decoder_offset.append((get_decoder(format), byte_offset))
         byte_offset += get_byte_width(format)
 
-    vertex_count = len(buffer) // buffer_stride
     # assert(byte_offset == buffer_stride)
 
-    buffer_data = [
+    columns = [
         [
             decoder(buffer, vertex_index * buffer_stride + offset)
-            for decoder, offset in decoder_offset
+            for vertex_index in range(vertex_count)
         ]
-        for vertex_index in range(vertex_count)
+        for decoder, offset in decoder_offset
     ]
 
-    return buffer_data
+    return BufferData(columns, vertex_count, buffer, buffer_stride)
+
+
+def decode_buffer_numpy(
+    buffer, buffer_formats: list[str], buffer_stride: int, vertex_count: int
+):
+    """
+    Decode every vertex at once by viewing the buffer as an array
+    of records, with one field per element at its byte offset
+    """
+    names, formats, offsets, dxgi_formats = [], [], [], []
+    byte_offset = 0
+    for j, format in enumerate(buffer_formats):
+        dxgi_format = get_dxgi_format(format)
+
+        names.append("e{}".format(j))
+        formats.append(dxgi_format.get_numpy_field())
+        offsets.append(byte_offset)
+        dxgi_formats.append(dxgi_format)
+        byte_offset += dxgi_format.byte_width
+
+    records = np.frombuffer(
+        buffer,
+        dtype=np.dtype({
+            "names": names,
+            "formats": formats,
+            "offsets": offsets,
+            "itemsize": buffer_stride,
+        }),
+        count=vertex_count,
+    )
+
+    columns = [
+        dxgi_format.decode_array(records[name])
+        for name, dxgi_format in zip(names, dxgi_formats)
+    ]
+
+    return BufferData(columns, vertex_count, buffer, buffer_stride)
+
+
+def get_index_buffer_format(ib_format: str):
+    if (index_buffer_format := INDEX_BUFFER_FORMATS.get(ib_format)) is None:
+        raise Exception("Unexpected index buffer format {}".format(ib_format))
+    return index_buffer_format
+
+
+def get_index_byte_width(ib_format: str):
+    typecode, _ = get_index_buffer_format(ib_format)
+    return array(typecode).itemsize
+
+
+def collect_binary_index_buffer_data(ib_buffer_path: Path, ib_format: str):
+    """
+    Reads every index of a binary index buffer, as a numpy array viewing
+    the read bytes, or as an array if numpy isn't available
+    """
+    typecode, dtype = get_index_buffer_format(ib_format)
+    buffer = ib_buffer_path.read_bytes()
+    index_count = len(buffer) // get_index_byte_width(ib_format)
+
+    if np is not None:
+        return np.frombuffer(buffer, dtype=dtype, count=index_count)
+
+    indices = array(typecode)
+    indices.frombytes(buffer[: index_count * indices.itemsize])
+    if sys.byteorder != "little":
+        indices.byteswap()
+    return indices
+
+
+def split_index_buffer(indices, index_ranges: list[tuple[int, int]]):
+    """
+    Slices the first index and index count range of every part out of the
+    indices. The parts are views of the indices when they're a numpy array.
+    """
+    parts = []
+    for first_index, index_count in index_ranges:
+        if first_index < 0 or first_index + index_count > len(indices):
+            raise Exception(
+                "Indices {} to {} are past the end of the index buffer ({})".format(
+                    first_index, first_index + index_count, len(indices)
+                )
+            )
+        parts.append(indices[first_index : first_index + index_count])
+
+    return parts
+
+
+def get_max_index(indices):
+    if len(indices) == 0:
+        return -1
+    if np is not None and isinstance(indices, np.ndarray):
+        return int(indices.max())
+    return max(indices)
 
 
 # Hardcoded specifically for hsr/zzz extraction and shapekey reversal
@@ -131,6 +175,17 @@ def reverse_applied_shapekeys(
 
     logger.info("Reversing Applied Shapkeys")
 
+    if np is not None:
+        # position_buffer is a bytearray, the view writes through to it
+        positions = np.frombuffer(
+            position_buffer, dtype="<f4", count=len(position_buffer) // 4
+        )
+        shapekeys = np.frombuffer(
+            shapekey_buffer,
+            dtype=np.dtype([("index", "<u4"), ("values", "<f4", (9,))]),
+            count=len(shapekey_buffer) // STRIDE,
+        )
+
     prev_offset = 0
     prev_count = 0
     for cb_filepath in shapekey_cb_paths:
@@ -147,6 +202,17 @@ def reverse_applied_shapekeys(
         prev_offset = offset
         prev_count = vertex_count
 
+        if np is not None:
+            if offset + vertex_count > len(shapekeys):
+                raise Exception("Shapekey buffer is too small for its metadata")
+            reverse_shapekey_block(
+                positions,
+                shapekeys[offset : offset + vertex_count],
+                multiplier,
+                STRIDE,
+            )
+            continue
+
         for i in range(vertex_count):
             idx, *s = struct.unpack_from(
                 "<L9f", shapekey_buffer, i * STRIDE + offset * STRIDE
@@ -161,3 +227,36 @@ def reverse_applied_shapekeys(
             )
 
     return position_buffer
+
+
+def reverse_shapekey_block(positions, shapekeys, multiplier: float, stride: int):
+    """
+    Vectorized equivalent of the shapekey loop above. The subtraction is done
+    in float64 and rounded to float32, like struct does. Vertices listed more
+    than once are handled in rounds, each holding the next occurrence of every
+    listed vertex, so that they are applied in order as in the loop.
+    """
+    if len(shapekeys) == 0:
+        return
+
+    indices = shapekeys["index"].astype(np.int64)
+    shapekey_values = shapekeys["values"].astype(np.float64) * multiplier
+
+    # Rank every occurrence of a vertex among the occurrences of that vertex
+    order = np.argsort(indices, kind="stable")
+    sorted_indices = indices[order]
+    positions_in_order = np.arange(len(indices))
+    is_first = np.empty(len(indices), dtype=bool)
+    is_first[0] = True
+    is_first[1:] = sorted_indices[1:] != sorted_indices[:-1]
+    first_positions = np.maximum.accumulate(np.where(is_first, positions_in_order, 0))
+    ranks = np.empty(len(indices), dtype=np.int64)
+    ranks[order] = positions_in_order - first_positions
+
+    component_offsets = np.arange(9)
+    for rank in range(ranks.max() + 1):
+        selected = ranks == rank
+        flat_indices = indices[selected, None] * (stride // 4) + component_offsets
+        positions[flat_indices] = (
+            positions[flat_indices].astype(np.float64) - shapekey_values[selected]
+        ).astype(np.float32)
@@ -1,38 +1,101 @@
 import re
+import sys
 import logging
 
-from .structs import BufferElement
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from array import array
+from io import StringIO, TextIOWrapper
+from typing import BinaryIO, TextIO
+
+from .structs import BufferElement, BufferData
+from .buffer_decoder import get_index_buffer_format
 
 
 logger = logging.getLogger(__name__)
 
 
-def merge_buffers(buffers, buffer_formats: list[list[BufferElement]]):
+# Number of vertices formatted at once when writing a vb0 text file
+COMBINED_BUFFER_BLOCK_SIZE = 4096
+# Number of indices formatted at once when writing an ib text file
+INDEX_BUFFER_BLOCK_SIZE = 3 << 16
+
+# Indices per line of an ib text file, by topology
+TOPOLOGY_LINE_SIZE = {
+    "pointlist": 1,
+    "linelist": 2,
+    "trianglelist": 3,
+}
+
+
+class MergedBuffer:
+    """
+    The buffers of a component merged into a single vb0. The source buffers
+    are kept as they are, and their vertices are only interleaved block by
+    block while the vb0 is written out, as text or as binary.
+    """
+
+    def __init__(
+        self, buffers: list[BufferData], buffer_formats: list[list[BufferElement]]
+    ):
+        self.buffers = buffers
+        self.buffer_formats = buffer_formats
+        self.buffer_elements = [
+            element for buffer_format in buffer_formats for element in buffer_format
+        ]
+        self.buffer_data = BufferData(
+            [column for buffer in buffers for column in buffer.columns],
+            len(buffers[0]),
+        )
+
+    def write(self, file: BinaryIO):
+        # Text mode, so the output matches a file opened with open(path, "w")
+        text_file = TextIOWrapper(file)
+        write_combined_buffer(text_file, self.buffer_data, self.buffer_elements)
+        text_file.detach()
+
+    def write_binary(self, file: BinaryIO):
+        write_binary_buffer(file, self.buffers, self.buffer_formats)
+
+
+def merge_buffers(
+    buffers: list[BufferData], buffer_formats: list[list[BufferElement]]
+):
     vertex_counts = [len(buffer) for buffer in buffers]
     if len(set(vertex_counts)) != 1:
         raise Exception(f"Buffer vertex count mismatch: {vertex_counts}")
 
-    vertex_count = vertex_counts[0]
-    merged_data = []
-    for j in range(vertex_count):
-        temp = []
-        for buffer in buffers:
-            temp.extend(buffer[j])
-        merged_data.append(temp)
+    merged_buffer = MergedBuffer(buffers, buffer_formats)
 
-    merged_format = []
-    for buffer_format in buffer_formats:
-        merged_format.extend(buffer_format)
+    for element in merged_buffer.buffer_elements:
+        logger.info(
+            f"{element.Name:12} - {element.ByteWidth:2} - {element.Format}",
+            extra={"TIMESTAMP": False},
+        )
+    stride = sum([element.ByteWidth for element in merged_buffer.buffer_elements])
+    logger.info(f"Total Stride: %s\n", stride, extra={"TIMESTAMP": False})
 
-    return construct_combined_buffer(merged_data, merged_format)
+    return merged_buffer
 
 
 # Constructs the output file that will be loaded into 3dmigoto
-def construct_combined_buffer(buffer_data, buffer_elements: list[BufferElement]):
+def construct_combined_buffer(
+    buffer_data: BufferData, buffer_elements: list[BufferElement]
+):
+    vb_merged = StringIO()
+    write_combined_buffer(vb_merged, buffer_data, buffer_elements)
+    return vb_merged.getvalue()
+
 
+def write_combined_buffer(
+    file: TextIO, buffer_data: BufferData, buffer_elements: list[BufferElement]
+):
     stride = sum([element.ByteWidth for element in buffer_elements])
 
-    vb_merged = "\n".join([
+    header = "\n".join([
         "stride: {}".format(stride),
         "first vertex: 0",
         "vertex count: {}".format(len(buffer_data)),
@@ -40,13 +103,51 @@ def construct_combined_buffer(buffer_data, buffer_elements: list[BufferElement])
         "",
     ])
 
+    header += format_buffer_elements(buffer_elements)
+
     byte_offset = 0
     byte_offsets, element_names = [], []
-    for i, element in enumerate(buffer_elements):
+    for element in buffer_elements:
         byte_offsets.append(f"{str(byte_offset).zfill(3)}")
         element_names.append(element.Name)
+        byte_offset += element.ByteWidth
 
-        vb_merged += "\n".join([
+    header += "\nvertex-data:\n\n"
+    file.write(header)
+
+    # Every line of a vertex only differs in its vertex index and
+    # values, which are formatted beforehand one whole column at a time
+    vertex_template = "".join([
+        f"vb0[{{0}}]+{byte_offsets[j]} {escape_template(element_names[j])}: {{{j + 1}}}\n"
+        for j in range(len(buffer_elements))
+    ])
+
+    # Vertices are formatted and written in blocks, so that memory
+    # use stays the same however many vertices the buffer holds
+    for start, stop, columns in buffer_data.iter_blocks(COMBINED_BUFFER_BLOCK_SIZE):
+        column_texts = [format_column(column) for column in columns]
+
+        # Vertices are separated by an empty line
+        if start > 0:
+            file.write("\n")
+        file.write(
+            "\n".join(map(vertex_template.format, range(start, stop), *column_texts))
+        )
+
+    # Scyll: Equivalent to (Slow):
+    # for i in range(len(buffer_data)):
+    #     byte_offset = 0
+    #     for j, element in enumerate(element_format):
+    #         vb_merged += f'vb0[{i}]+{str(byte_offset).zfill(3)} {element["element_name"]}: {", ".join(buffer_data[i][j])}\n'
+    #         byte_offset += element['bytewidth']
+    #     vb_merged += "\n"
+
+
+def format_buffer_elements(buffer_elements: list[BufferElement]):
+    text = ""
+    byte_offset = 0
+    for i, element in enumerate(buffer_elements):
+        text += "\n".join([
             f"element[{i}]:",
             f"  SemanticName: {element.SemanticName}",
             f"  SemanticIndex: {element.SemanticIndex}",
@@ -59,36 +160,186 @@ def construct_combined_buffer(buffer_data, buffer_elements: list[BufferElement])
         ])
         byte_offset += element.ByteWidth
 
-        logger.info(
-            f"{element.Name:12} - {element.ByteWidth:2} - {element.Format}",
-            extra={"TIMESTAMP": False},
-        )
+    return text
 
-    logger.info(f"Total Stride: %s\n", stride, extra={"TIMESTAMP": False})
 
-    vb_merged += "\nvertex-data:\n\n"
+# Describes the layout of a binary vb and ib pair to 3dmigoto tools
+def construct_buffer_format(buffer_elements: list[BufferElement], ib_format: str):
+    stride = sum([element.ByteWidth for element in buffer_elements])
 
-    # Scyll: Extremely fast - avoid excessive string concatenation with +=
-    vb_merged += "\n".join([
-        "".join([
-            f"vb0[{i}]+{byte_offsets[j]} {element_names[j]}: {', '.join(map(str, buffer_data[i][j]))}\n"
-            for j in range(len(buffer_elements))
-        ])
-        for i in range(len(buffer_data))
+    return "\n".join([
+        "stride: {}".format(stride),
+        "topology: trianglelist",
+        "format: {}".format(ib_format),
+        format_buffer_elements(buffer_elements),
     ])
 
-    # Scyll: Equivalent to (Slow):
-    # for i in range(len(buffer_data)):
-    #     byte_offset = 0
-    #     for j, element in enumerate(element_format):
-    #         vb_merged += f'vb0[{i}]+{str(byte_offset).zfill(3)} {element["element_name"]}: {", ".join(buffer_data[i][j])}\n'
-    #         byte_offset += element['bytewidth']
-    #     vb_merged += "\n"
 
-    return vb_merged
+def write_binary_buffer(
+    file: BinaryIO,
+    buffers: list[BufferData],
+    buffer_formats: list[list[BufferElement]],
+):
+    """
+    Writes the encoded vertices of the buffers interleaved into records
+    of the merged elements, the way 3dmigoto lays out a .buf file
+    """
+    sources = []
+    for buffer, buffer_format in zip(buffers, buffer_formats):
+        byte_width = sum([element.ByteWidth for element in buffer_format])
+        if buffer.buffer is None or byte_width > buffer.stride:
+            raise Exception(
+                "Buffer elements ({}) can't be written as binary".format(
+                    ", ".join([element.Name for element in buffer_format])
+                )
+            )
+        sources.append((memoryview(buffer.buffer), buffer.stride, byte_width))
+
+    stride = sum([byte_width for _, _, byte_width in sources])
+    vertex_count = len(buffers[0]) if buffers else 0
+
+    if np is not None:
+        vertex_arrays = [
+            np.frombuffer(
+                view, dtype=np.uint8, count=vertex_count * buffer_stride
+            ).reshape(vertex_count, buffer_stride)[:, :byte_width]
+            for view, buffer_stride, byte_width in sources
+        ]
+
+    for start in range(0, vertex_count, COMBINED_BUFFER_BLOCK_SIZE):
+        stop = min(start + COMBINED_BUFFER_BLOCK_SIZE, vertex_count)
+
+        if np is not None:
+            records = np.empty((stop - start, stride), dtype=np.uint8)
+            byte_offset = 0
+            for vertices in vertex_arrays:
+                byte_width = vertices.shape[1]
+                records[:, byte_offset : byte_offset + byte_width] = vertices[
+                    start:stop
+                ]
+                byte_offset += byte_width
+            file.write(records.data)
+        else:
+            file.write(
+                b"".join([
+                    view[i * buffer_stride : i * buffer_stride + byte_width]
+                    for i in range(start, stop)
+                    for view, buffer_stride, byte_width in sources
+                ])
+            )
+
+
+def write_binary_index_buffer(file: BinaryIO, ib_format: str, indices):
+    typecode, dtype = get_index_buffer_format(ib_format)
+
+    if np is not None and isinstance(indices, np.ndarray):
+        file.write(indices.astype(dtype, copy=False).tobytes())
+        return
+
+    index_array = array(typecode, indices)
+    if sys.byteorder != "little":
+        index_array.byteswap()
+    file.write(index_array.tobytes())
+
+
+def write_index_buffer(file: TextIO, ib_header: dict[str, str], indices):
+    """
+    Writes the indices as a 3dmigoto ib text file, under the given header,
+    with the indices of each primitive on their own line
+    """
+    file.write("".join(["{}: {}\n".format(k, v) for k, v in ib_header.items()]))
+    file.write("\n")
 
+    line_size = TOPOLOGY_LINE_SIZE.get(ib_header.get("topology"), 1)
+    # Whole lines per block, so that only the last block can end mid line
+    block_size = INDEX_BUFFER_BLOCK_SIZE - INDEX_BUFFER_BLOCK_SIZE % line_size
+    for start in range(0, len(indices), block_size):
+        block = indices[start : start + block_size]
+        if np is not None and isinstance(block, np.ndarray):
+            file.write(format_indices_numpy(block, line_size))
+        else:
+            file.write(format_indices(list(block), line_size))
 
-def handle_no_weight_blend(blend, blend_elements: list[BufferElement]):
+
+def format_indices(indices: list[int], line_size: int):
+    line_count, remainder = divmod(len(indices), line_size)
+    template = " ".join(["{}"] * line_size) + "\n"
+    template = template * line_count
+    if remainder:
+        template += " ".join(["{}"] * remainder) + "\n"
+    return template.format(*indices)
+
+
+def format_indices_numpy(indices, line_size: int):
+    """
+    Same as format_indices, with the digits of every index computed at
+    once. Each index gets a row of as many digits as the largest one, and
+    a separator. Leading zeros are then masked out, and what's left of the
+    rows joined is the text.
+    """
+    if len(indices) == 0:
+        return ""
+
+    values = indices.astype(np.uint32)
+    width = len(str(int(values.max())))
+    chars = np.empty((len(values), width + 1), dtype=np.uint8)
+    for column in range(width - 1, -1, -1):
+        chars[:, column] = values % 10 + ord("0")
+        values //= 10
+
+    chars[:, width] = ord(" ")
+    chars[line_size - 1 :: line_size, width] = ord("\n")
+    chars[-1, width] = ord("\n")
+
+    # The last digit is kept for zeros
+    keep = np.maximum.accumulate(chars[:, :width] != ord("0"), axis=1)
+    keep[:, width - 1] = True
+    keep = np.concatenate([keep, np.ones((len(values), 1), dtype=bool)], axis=1)
+
+    return chars[keep].tobytes().decode("ascii")
+
+
+def format_column(column) -> list[str]:
+    """
+    Formats the values of every vertex of a column the way
+    ", ".join(map(str, values)) would, for the whole column at once
+    """
+    if not hasattr(column, "tolist") or column.dtype.kind not in "fiu":
+        return [", ".join(map(str, values)) for values in column]
+
+    if len(column) == 0:
+        return []
+
+    if column.dtype.kind != "f":
+        return format_rows(column.tolist())
+
+    # Formatting a float takes far longer than looking it up, and meshes
+    # repeat a lot of values, so each distinct value is only formatted once.
+    # Values are told apart by their bits, keeping -0.0 and 0.0 apart.
+    column = np.ascontiguousarray(column)
+    unique_bits, inverse = np.unique(
+        column.view("u{}".format(column.dtype.itemsize)), return_inverse=True
+    )
+    unique_texts = np.array(
+        str(unique_bits.view(column.dtype).tolist())[1:-1].split(", "), dtype=object
+    )
+    value_texts = unique_texts[inverse.reshape(column.shape)].tolist()
+
+    return list(map(", ".join, value_texts))
+
+
+def format_rows(rows: list[list]) -> list[str]:
+    # str of a list of lists of ints and floats formats every value with
+    # the same shortest repr str would, separated by ", ". Splitting it
+    # between the inner lists leaves the text of each row.
+    return str(rows)[2:-2].split("], [")
+
+
+def escape_template(text: str):
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+def handle_no_weight_blend(blend: BufferData, blend_elements: list[BufferElement]):
     if (
         len(blend_elements) == 1
         and blend_elements[0].Name == "BLENDINDICES"
@@ -100,7 +351,15 @@ def handle_no_weight_blend(blend, blend_elements: list[BufferElement]):
         logger.info("Manually inserted BLENDWEIGHTS = 1 for each vertex.")
         logger.info("")
 
-        blend = [blend[vertex_idx] + ["1"] for vertex_idx in range(len(blend))]
+        weight = (1).to_bytes(4, "little")
+        view = memoryview(blend.buffer)
+        encoded_blend = b"".join([
+            view[i * blend.stride : i * blend.stride + 4].tobytes() + weight
+            for i in range(len(blend))
+        ])
+        blend = BufferData(
+            [*blend.columns, [("1",)] * len(blend)], len(blend), encoded_blend, 8
+        )
 
         blend_elements = [
             *blend_elements,
@@ -1,15 +1,29 @@
 import re
 import logging
+import threading
 
 from pathlib import Path
-from io import TextIOWrapper
+from io import StringIO, TextIOWrapper
+from itertools import product
+from concurrent.futures import ThreadPoolExecutor
 
 from .structs import BufferElement
-from .exceptions import InvalidTextBufferException
+from .dxgi_format import get_dxgi_format
+from .exceptions import InvalidTextBufferException, AmbiguousStrideException
 
 
 logger = logging.getLogger(__name__)
 
+# Characters read at first when probing the header of a text buffer. Enough
+# for the header and the first vertex, which the probe reads twice as many
+# characters again for until it has both.
+HEADER_PROBE_SIZE = 16 << 10
+HEADER_PROBE_WORKERS = 8
+
+# Clean headers by buffer path, along with the size and mtime they were read at
+_header_probe_cache: dict[Path, tuple[tuple[int, int], tuple]] = {}
+_header_probe_cache_lock = threading.Lock()
+
 
 def read_header(buffer: TextIOWrapper):
     key_value_pattern = re.compile(r"^\s*(.*?): (.*)$")
@@ -130,11 +144,8 @@ def get_clean_buffer_elements(
         if element_name not in valid_element_names:
             continue
 
-        matches = re.findall(r"([0-9]+)", element.Format.split("_", maxsplit=1)[0])
-
         element.Name = element_name
-        # TODO remove
-        element.ByteWidth = sum([int(x) for x in matches]) // 8
+        element.ByteWidth = get_dxgi_format(element.Format).byte_width
         element.AlignedByteOffset = byte_offset
 
         byte_offset += element.ByteWidth
@@ -166,18 +177,114 @@ def collect_text_buffer_data(buffer_path: Path, filter_element_names: set = None
     return header, buffer_elements, vertex_data
 
 
+def collect_text_index_buffer_data(ib_path: Path):
+    with open(ib_path, "r") as buffer:
+        header, _, index_data_start_pos = read_header(buffer)
+        if index_data_start_pos < 0:
+            return header, []
+
+        indices = [int(index) for index in buffer.read().split()]
+        assert int(header["index count"]) == len(indices)
+
+    return header, indices
+
+
+def read_index_buffer_header(ib_path: Path):
+    # The header ends at the first line that isn't a key: value pair
+    with open(ib_path, "r") as buffer:
+        header, _, _ = read_header(buffer)
+    return header
+
+
 def read_clean_header(buffer_path: Path):
-    with open(buffer_path, "r") as buffer:
-        header, buffer_elements, vertex_data_start_pos = read_header(buffer)
-        active_element_names = read_active_element_names(buffer, vertex_data_start_pos)
-        buffer_elements = get_clean_buffer_elements(
-            buffer_elements, active_element_names
-        )
-        assert len(buffer_elements) == len(active_element_names)
+    """
+    Reads the header and the elements the first vertex has values for,
+    from as short a prefix of the buffer as holds both
+    """
+    probe_size = HEADER_PROBE_SIZE
+    with open(buffer_path, "r") as f:
+        text = f.read(probe_size)
+        while True:
+            is_whole_file = len(text) < probe_size or not f.read(1)
+            if not is_whole_file:
+                f.seek(0)
+                # Leave out the line the prefix cuts through
+                text = text[: text.rfind("\n") + 1]
+
+            buffer = StringIO(text)
+            header, buffer_elements, vertex_data_start_pos = read_header(buffer)
+            active_element_names = read_active_element_names(
+                buffer, vertex_data_start_pos
+            )
+
+            # The first vertex may reach past the end of the prefix
+            if is_whole_file or (
+                vertex_data_start_pos >= 0 and buffer.tell() < len(text)
+            ):
+                break
+
+            probe_size *= 2
+            text = f.read(probe_size)
+
+    buffer_elements = get_clean_buffer_elements(buffer_elements, active_element_names)
+    assert len(buffer_elements) == len(active_element_names)
 
     return header, buffer_elements
 
 
+def probe_clean_header(buffer_path: Path):
+    """
+    read_clean_header, cached until the buffer's size or mtime changes
+    """
+    stat = buffer_path.stat()
+    stat_key = (stat.st_size, stat.st_mtime_ns)
+
+    with _header_probe_cache_lock:
+        cached = _header_probe_cache.get(buffer_path)
+    if cached is None or cached[0] != stat_key:
+        cached = (stat_key, read_clean_header(buffer_path))
+        with _header_probe_cache_lock:
+            _header_probe_cache[buffer_path] = cached
+
+    # Shared between callers, the same way the known buffer formats are
+    return cached[1]
+
+
+def probe_clean_headers(buffer_paths: list[Path]):
+    """
+    Yields the clean header of every buffer in order. The first buffer
+    often is the one the caller looks for, so it is read on its own. If
+    the caller asks for more, the rest that aren't cached yet are then
+    all read concurrently.
+    """
+    if len(buffer_paths) == 0:
+        return
+    yield probe_clean_header(buffer_paths[0])
+
+    buffer_paths = buffer_paths[1:]
+    with _header_probe_cache_lock:
+        uncached_paths = [
+            buffer_path
+            for buffer_path in buffer_paths
+            if buffer_path not in _header_probe_cache
+        ]
+
+    if len(uncached_paths) < 2:
+        for buffer_path in buffer_paths:
+            yield probe_clean_header(buffer_path)
+        return
+
+    executor = ThreadPoolExecutor(
+        max_workers=min(HEADER_PROBE_WORKERS, len(uncached_paths))
+    )
+    try:
+        for clean_header in executor.map(probe_clean_header, buffer_paths):
+            yield clean_header
+    finally:
+        # Probes of buffers past the one the caller stopped at aren't needed
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
 def get_buffer_elements(buffer_paths: list[Path]):
     min_trash_buffer_elements = None
     max_expressed_stride = -1
@@ -187,8 +294,9 @@ def get_buffer_elements(buffer_paths: list[Path]):
         "Iterating over buffer paths to find best fitting format for extraction"
     )
 
-    for buffer_path in buffer_paths:
-        header, buffer_elements = read_clean_header(buffer_path)
+    for buffer_path, (header, buffer_elements) in zip(
+        buffer_paths, probe_clean_headers(buffer_paths)
+    ):
 
         if int(header["stride"]) == 0:
             continue
@@ -196,20 +304,22 @@ def get_buffer_elements(buffer_paths: list[Path]):
         expressed_stride = sum(element.ByteWidth for element in buffer_elements)
         buffer_stride = int(header["stride"])
 
-        logger.debug(
-            "    "
-            + " ".join(
-                f"""
-                - <PATH>{buffer_path.name}</PATH>: 
-                - first vertex={header["first vertex"]}
-                - vertex_count={header["vertex count"]} 
-                - buffer_stride={buffer_stride}
-                - expressed_stride={expressed_stride}
-                - {[(element.Name, element.ByteWidth) for element in buffer_elements]}
-            """.split()
-            ),
-            extra={"TIMESTAMP": False},
-        )
+        # Only build the message when it is logged, probes are cached and cheap
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "    "
+                + " ".join(
+                    f"""
+                    - <PATH>{buffer_path.name}</PATH>: 
+                    - first vertex={header["first vertex"]}
+                    - vertex_count={header["vertex count"]} 
+                    - buffer_stride={buffer_stride}
+                    - expressed_stride={expressed_stride}
+                    - {[(element.Name, element.ByteWidth) for element in buffer_elements]}
+                """.split()
+                ),
+                extra={"TIMESTAMP": False},
+            )
 
         if buffer_stride == expressed_stride:
             return buffer_stride, buffer_elements
@@ -238,6 +348,48 @@ def get_buffer_elements(buffer_paths: list[Path]):
     return buffer_stride, min_trash_buffer_elements
 
 
+def resolve_buffer_strides(
+    buffer_sizes: list[int],
+    stride_candidates: list[list[int]],
+    vertex_count: int = None,
+):
+    """
+    Picks a stride out of the candidates of every buffer, such that all
+    the buffers hold the same number of vertices (vertex_count if given),
+    from their sizes alone. Strides that divide the buffer sizes exactly
+    win over ones that leave trailing bytes. Raises if no pick or more
+    than one pick fits.
+    """
+    exact_fits, fits = [], []
+    for strides in product(*stride_candidates):
+        vertex_counts = {size // stride for size, stride in zip(buffer_sizes, strides)}
+        if len(vertex_counts) != 1:
+            continue
+        if vertex_count is not None and vertex_counts != {vertex_count}:
+            continue
+
+        fits.append(strides)
+        if all(size % stride == 0 for size, stride in zip(buffer_sizes, strides)):
+            exact_fits.append(strides)
+
+    fits = exact_fits or fits
+    if len(fits) == 1:
+        return fits[0]
+
+    description = "buffer sizes {} with stride candidates {}{}".format(
+        buffer_sizes,
+        stride_candidates,
+        f" and vertex count {vertex_count}" if vertex_count is not None else "",
+    )
+    if len(fits) == 0:
+        raise Exception("No strides fit " + description)
+    raise AmbiguousStrideException(
+        "Strides {} all fit {}".format(
+            ", ".join([str(strides) for strides in fits]), description
+        )
+    )
+
+
 def extract_from_txt(key, filepath) -> int:
     if key not in ["vertex count", "first index"]:
         raise Exception("Unexpected key: {}".format(key))
@@ -0,0 +1,257 @@
+import re
+import math
+import struct
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Major thanks to DarkStarSword
+# https://github.com/DarkStarSword/3d-fixes/blob/cef49cbe6b324dc7a2041c1928f9b41678b3c61e/blender_3dmigoto.py#L113
+
+# Struct format character, numpy dtype and normalizing divisor of the
+# component types that are a whole number of bytes wide
+COMPONENT_TYPES = {
+    ("FLOAT", 16): ("e", "<f2", None),
+    ("FLOAT", 32): ("f", "<f4", None),
+    ("UINT", 8): ("B", "u1", None),
+    ("UINT", 16): ("H", "<u2", None),
+    ("UINT", 32): ("L", "<u4", None),
+    ("SINT", 8): ("b", "i1", None),
+    ("SINT", 16): ("h", "<i2", None),
+    ("SINT", 32): ("l", "<i4", None),
+    ("UNORM", 8): ("B", "u1", 255.0),
+    ("UNORM", 16): ("H", "<u2", 65535.0),
+    ("SNORM", 8): ("b", "i1", 127.0),
+    ("SNORM", 16): ("h", "<i2", 32767.0),
+}
+
+# Packed formats are read as a single little endian word of their byte width
+PACKED_WORD_TYPES = {
+    2: ("H", "<u2"),
+    4: ("L", "<u4"),
+    8: ("Q", "<u8"),
+}
+
+COMPONENT_TYPE_NAMES = {"FLOAT", "UINT", "SINT", "UNORM", "SNORM", "TYPELESS"}
+
+channels_pattern = re.compile(r"(?:[RGBADSX][0-9]+)+")
+channel_pattern = re.compile(r"([RGBADSX])([0-9]+)")
+
+
+class DXGIFormat:
+    """
+    Layout of a DXGI format, shared by the struct and the numpy decoders.
+
+    components holds the type and bit width of every component from the
+    lowest bits up, with unused bits typed "X". Formats with components all
+    of one type and a whole number of bytes wide map straight to struct and
+    numpy types. The others are packed into a single word, out of which each
+    component is unpacked with bit operations.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.components = parse_components(name)
+
+        bit_width = sum([bits for _, bits in self.components])
+        component_types = [component_type for component_type, _ in self.components]
+        self.byte_width = bit_width // 8
+        self.component_count = len(component_types) - component_types.count("X")
+
+        self.is_packed = not (
+            len(set(self.components)) == 1 and self.components[0] in COMPONENT_TYPES
+        )
+        if not self.is_packed:
+            self.struct_code, self.dtype, self.divisor = COMPONENT_TYPES[
+                self.components[0]
+            ]
+        elif (
+            self.byte_width not in PACKED_WORD_TYPES
+            or bit_width != self.byte_width * 8
+            or "TYPELESS" in component_types
+        ):
+            raise Exception("Unsupported dxgi format: {}".format(name))
+        else:
+            self.struct_code, self.dtype = PACKED_WORD_TYPES[self.byte_width]
+            self.divisor = None
+
+    def get_struct_decoder(self):
+        """
+        Returns a function decoding the components of the element at
+        an offset of a buffer, one at a time
+        """
+        if self.is_packed:
+            unpack_word = struct.Struct("<" + self.struct_code).unpack_from
+            unpackers = self.get_component_unpackers()
+            return lambda buffer, offset: tuple([
+                unpack(unpack_word(buffer, offset)[0]) for unpack in unpackers
+            ])
+
+        # Build the struct once, instead of building it each time the lambda is called
+        unpack_from = struct.Struct(
+            "<" + self.struct_code * self.component_count
+        ).unpack_from
+        if self.divisor is None:
+            return lambda buffer, offset: unpack_from(buffer, offset)
+
+        divisor = self.divisor
+        return lambda buffer, offset: [x / divisor for x in unpack_from(buffer, offset)]
+
+    def get_component_unpackers(self):
+        unpackers = []
+        shift = 0
+        for component_type, bits in self.components:
+            if component_type != "X":
+                unpackers.append(get_component_unpacker(component_type, bits, shift))
+            shift += bits
+
+        return unpackers
+
+    def get_numpy_field(self):
+        """
+        Returns the dtype and shape of the element as a field of a structured dtype
+        """
+        if self.is_packed:
+            return self.dtype, ()
+        return self.dtype, (self.component_count,)
+
+    def decode_array(self, values):
+        """
+        Decodes the values of the numpy field of the element for every
+        vertex at once, into a 2D array, or into a list of tuples if
+        its components don't all share a type
+        """
+        if not self.is_packed:
+            if self.divisor is not None:
+                return values.astype(np.float64) / self.divisor
+            return values
+
+        words = values.astype(np.uint64)
+        columns = []
+        shift = 0
+        for component_type, bits in self.components:
+            if component_type != "X":
+                component = (words >> np.uint64(shift)) & np.uint64((1 << bits) - 1)
+                columns.append(unpack_component_array(component, component_type, bits))
+            shift += bits
+
+        if len(set([column.dtype.kind for column in columns])) > 1:
+            return list(zip(*[column.tolist() for column in columns]))
+        return np.stack(columns, axis=1)
+
+
+DXGI_FORMATS: dict[str, DXGIFormat] = {}
+
+
+def get_dxgi_format(name: str):
+    if (dxgi_format := DXGI_FORMATS.get(name)) is None:
+        dxgi_format = DXGI_FORMATS[name] = DXGIFormat(name)
+    return dxgi_format
+
+
+def parse_components(name: str):
+    components: list[tuple[str, int]] = []
+    channels: list[tuple[str, str]] = []
+
+    for token in name.split("_"):
+        if token in COMPONENT_TYPE_NAMES:
+            if not channels:
+                break
+            components.extend([
+                ("X" if channel == "X" else token, int(bits))
+                for channel, bits in channels
+            ])
+            channels = []
+        elif channels_pattern.fullmatch(token):
+            channels.extend(channel_pattern.findall(token))
+        elif token != "SRGB":
+            break
+    else:
+        if components and not channels:
+            return components
+
+    raise Exception("Unrecognized dxgi format: {}".format(name))
+
+
+def get_component_unpacker(component_type: str, bits: int, shift: int):
+    mask = (1 << bits) - 1
+    sign_bit = 1 << (bits - 1)
+
+    if component_type == "UINT":
+        return lambda word: word >> shift & mask
+    if component_type == "SINT":
+        return lambda word: ((word >> shift & mask) ^ sign_bit) - sign_bit
+    if component_type == "UNORM":
+        return lambda word: (word >> shift & mask) / float(mask)
+    if component_type == "SNORM":
+        return lambda word: (((word >> shift & mask) ^ sign_bit) - sign_bit) / float(
+            sign_bit - 1
+        )
+
+    if component_type == "FLOAT" and bits in (16, 32):
+        unpack = struct.Struct({16: "<e", 32: "<f"}[bits]).unpack
+        byte_width = bits // 8
+
+        def unpack_float(word: int):
+            return unpack((word >> shift & mask).to_bytes(byte_width, "little"))[0]
+
+        return unpack_float
+    if component_type == "FLOAT" and bits in (10, 11):
+        return lambda word: unpack_small_float(word >> shift & mask, bits - 5)
+
+    raise Exception("Unsupported {}-bit {} component".format(bits, component_type))
+
+
+def unpack_component_array(component, component_type: str, bits: int):
+    sign_bit = 1 << (bits - 1)
+
+    if component_type == "UINT":
+        return component
+    if component_type == "SINT":
+        return (component.astype(np.int64) ^ sign_bit) - sign_bit
+    if component_type == "UNORM":
+        return component / float((1 << bits) - 1)
+    if component_type == "SNORM":
+        return ((component.astype(np.int64) ^ sign_bit) - sign_bit) / float(
+            sign_bit - 1
+        )
+
+    if component_type == "FLOAT" and bits in (16, 32):
+        return component.astype({16: "<u2", 32: "<u4"}[bits]).view(
+            {16: "<f2", 32: "<f4"}[bits]
+        )
+    if component_type == "FLOAT" and bits in (10, 11):
+        return unpack_small_float_array(component, bits - 5)
+
+    raise Exception("Unsupported {}-bit {} component".format(bits, component_type))
+
+
+# 11 and 10 bit floats have no sign bit, a 5 bit exponent and a 6 or 5 bit mantissa
+def unpack_small_float(bits: int, mantissa_bits: int):
+    exponent = bits >> mantissa_bits
+    mantissa = bits & ((1 << mantissa_bits) - 1)
+
+    if exponent == 31:
+        return math.inf if mantissa == 0 else math.nan
+    if exponent == 0:
+        return math.ldexp(mantissa, -14 - mantissa_bits)
+    return math.ldexp(mantissa | 1 << mantissa_bits, exponent - 15 - mantissa_bits)
+
+
+def unpack_small_float_array(bits, mantissa_bits: int):
+    exponent = (bits >> np.uint64(mantissa_bits)).astype(np.int64)
+    mantissa = (bits & np.uint64((1 << mantissa_bits) - 1)).astype(np.int64)
+
+    # Denormals have the exponent of the smallest normal, without the implicit 1
+    is_normal = exponent != 0
+    values = np.ldexp(
+        (mantissa | is_normal.astype(np.int64) << mantissa_bits).astype(np.float64),
+        np.maximum(exponent, 1) - 15 - mantissa_bits,
+    )
+
+    is_special = exponent == 31
+    values[is_special] = np.where(mantissa[is_special] == 0, np.inf, np.nan)
+    return values
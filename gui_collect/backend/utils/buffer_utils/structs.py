@@ -38,6 +38,40 @@ class BufferElement:
             self.__setattr__(key.replace(" ", ""), value)
 
 
+class BufferData:
+    """
+    Vertex data decoded from a buffer, stored per element. columns[j] holds
+    the values of the j-th element of every vertex, as a 2D numpy array or
+    as a list of tuples if numpy isn't available.
+
+    buffer holds the encoded vertices the columns were decoded from, one
+    every stride bytes, with the elements at the start of each vertex.
+    """
+
+    def __init__(
+        self, columns: list, vertex_count: int, buffer: bytes = None, stride: int = 0
+    ):
+        self.columns = columns
+        self.vertex_count = vertex_count
+        self.buffer = buffer
+        self.stride = stride
+
+    def __len__(self):
+        return self.vertex_count
+
+    def __getitem__(self, vertex_index: int):
+        return [column[vertex_index] for column in self.columns]
+
+    def iter_blocks(self, block_size: int):
+        """
+        Yields the vertices block_size at a time, as the start and stop
+        vertex index of the block and the slice of every column
+        """
+        for start in range(0, self.vertex_count, block_size):
+            stop = min(start + block_size, self.vertex_count)
+            yield start, stop, [column[start:stop] for column in self.columns]
+
+
 POSITION_FMT = [
     BufferElement({
         "Name": "POSITION",
@@ -136,3 +170,15 @@ BLEND_1VGX_FMT = [
         "ByteWidth": 4,
     })
 ]
+
+# Known layouts of position and blend buffers by stride
+POSITION_FMT_BY_STRIDE = {
+    40: POSITION_FMT,
+    56: POSITION_EXTRA_TANGENT_FMT,
+}
+
+BLEND_FMT_BY_STRIDE = {
+    32: BLEND_4VGX_FMT,
+    16: BLEND_2VGX_FMT,
+    4: BLEND_1VGX_FMT,
+}
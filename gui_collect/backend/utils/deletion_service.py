@@ -0,0 +1,226 @@
+import os
+import time
+import shutil
+import logging
+import tempfile
+import threading
+
+from concurrent.futures import ThreadPoolExecutor, wait, ALL_COMPLETED, FIRST_COMPLETED
+from pathlib import Path
+
+
+logger = logging.getLogger(__name__)
+
+TRASH_DIR_NAME = ".gui_collect_trash"
+DELETION_WORKERS = 4
+# Files unlinked by a single task of the pool
+DELETION_BATCH_SIZE = 256
+# Seconds between progress reports of a deletion
+DELETION_PROGRESS_INTERVAL = 2.0
+
+
+class DeletionService:
+    """
+    Deletes folders without blocking the caller. The folder is renamed into
+    a trash folder next to it, which is atomic on the same volume, so it is
+    gone from its path right away. Its files are then unlinked in the
+    background by a pool of threads, while the progress is logged.
+
+    Every deletion moves its folder into a folder of its own in the trash.
+    The trash folder itself is shared, and only removed once no deletion
+    is using it, under the same lock deletions are moved into it with.
+
+    Anything left in a trash folder by a deletion that didn't get to finish
+    is deleted by reclaim_trash.
+    """
+
+    __instance = None
+
+    def __init__(self):
+        if DeletionService.__instance != None:
+            raise Exception("DeletionService already created.")
+        DeletionService.__instance = self
+
+        self.executor = ThreadPoolExecutor(
+            max_workers=DELETION_WORKERS, thread_name_prefix="deletion"
+        )
+
+        self.trash_lock = threading.Lock()
+        # Deletions not done yet, per trash folder
+        self.trash_users: dict[Path, int] = {}
+
+    @staticmethod
+    def get_instance():
+        if DeletionService.__instance == None:
+            raise Exception("DeletionService hasn't been initialized.")
+        return DeletionService.__instance
+
+    def delete(self, path: Path):
+        trash_path = path.parent / TRASH_DIR_NAME
+        item_path = None
+        try:
+            with self.trash_lock:
+                trash_path.mkdir(exist_ok=True)
+                # Created atomically, under a name no other deletion has
+                item_path = Path(
+                    tempfile.mkdtemp(prefix=path.name + ".", dir=trash_path)
+                )
+                os.rename(path, item_path / path.name)
+                self.trash_users[trash_path] = self.trash_users.get(trash_path, 0) + 1
+        except OSError as X:
+            # Files kept open by another program can't be moved on Windows
+            logger.warning("Couldn't move <PATH>%s</PATH> to trash: %s", path, X)
+            if item_path:
+                item_path.rmdir()
+            self.remove_unused_trash(trash_path)
+            shutil.rmtree(path)
+            logger.info("Deleted <PATH>%s</PATH>", path)
+            return
+
+        self.start_deletion(item_path, path)
+
+    def reclaim_trash(self, parent_paths: list[Path]):
+        for parent_path in set(parent_paths):
+            trash_path = parent_path / TRASH_DIR_NAME
+            if not trash_path.is_dir():
+                continue
+
+            with self.trash_lock:
+                entries = list(os.scandir(trash_path))
+                self.trash_users[trash_path] = (
+                    self.trash_users.get(trash_path, 0) + len(entries)
+                )
+
+            for entry in entries:
+                logger.info("Reclaiming leftover trash <PATH>%s</PATH>", entry.path)
+                self.start_deletion(Path(entry.path), Path(entry.path))
+
+    def release_trash(self, trash_path: Path):
+        with self.trash_lock:
+            self.trash_users[trash_path] -= 1
+        self.remove_unused_trash(trash_path)
+
+    def remove_unused_trash(self, trash_path: Path):
+        with self.trash_lock:
+            if self.trash_users.get(trash_path, 0) > 0:
+                return
+            self.trash_users.pop(trash_path, None)
+            try:
+                # Fails if a deletion left files behind, which is fine
+                trash_path.rmdir()
+            except OSError:
+                pass
+
+    def start_deletion(self, trashed_path: Path, original_path: Path):
+        # The thread walking the folder is a daemon so that closing the app
+        # isn't held up. Whatever is left is reclaimed on the next start.
+        thread = threading.Thread(
+            target=self.run_deletion, args=(trashed_path, original_path), daemon=True
+        )
+        thread.start()
+        return thread
+
+    def run_deletion(self, trashed_path: Path, original_path: Path):
+        try:
+            self.delete_trashed(trashed_path, original_path)
+        finally:
+            self.release_trash(trashed_path.parent)
+
+    def delete_trashed(self, trashed_path: Path, original_path: Path):
+        st = time.time()
+        last_report = st
+        file_count = 0
+        error_count = 0
+        directories = []
+        futures = set()
+
+        def collect_finished(return_when):
+            nonlocal futures, file_count, error_count
+            done, futures = wait(futures, return_when=return_when)
+            for future in done:
+                removed_count, failed_count = future.result()
+                file_count += removed_count
+                error_count += failed_count
+
+        def submit_batch(batch: list[str]):
+            nonlocal last_report
+            futures.add(self.executor.submit(unlink_files, batch))
+
+            # Don't queue more than the pool can keep up with
+            if len(futures) > DELETION_WORKERS * 2:
+                collect_finished(FIRST_COMPLETED)
+
+            if time.time() - last_report > DELETION_PROGRESS_INTERVAL:
+                last_report = time.time()
+                logger.info(
+                    "Deleting <PATH>%s</PATH>: %d files removed",
+                    original_path,
+                    file_count,
+                )
+
+        try:
+            if not trashed_path.is_dir() or trashed_path.is_symlink():
+                submit_batch([str(trashed_path)])
+            else:
+                # Walk the folder, unlinking its files a batch at a time
+                batch = []
+                stack = [str(trashed_path)]
+                while stack:
+                    directory = stack.pop()
+                    directories.append(directory)
+                    with os.scandir(directory) as entries:
+                        for entry in entries:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                                continue
+
+                            batch.append(entry.path)
+                            if len(batch) == DELETION_BATCH_SIZE:
+                                submit_batch(batch)
+                                batch = []
+
+                if batch:
+                    submit_batch(batch)
+
+            collect_finished(ALL_COMPLETED)
+
+            # Subfolders were walked after their parent
+            for directory in reversed(directories):
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    error_count += 1
+
+        except Exception as X:
+            logger.error("Failed to delete <PATH>%s</PATH>: %s", original_path, X)
+            return
+
+        if error_count:
+            logger.warning(
+                "Couldn't delete %d files or folders of <PATH>%s</PATH>, "
+                "left in <PATH>%s</PATH>",
+                error_count,
+                original_path,
+                trashed_path,
+            )
+            return
+
+        logger.info(
+            "Deleted <PATH>%s</PATH> (%d files) in %.3fs",
+            original_path,
+            file_count,
+            time.time() - st,
+        )
+
+
+def unlink_files(file_paths: list[str]):
+    removed_count = 0
+    failed_count = 0
+    for file_path in file_paths:
+        try:
+            os.unlink(file_path)
+            removed_count += 1
+        except OSError:
+            failed_count += 1
+
+    return removed_count, failed_count
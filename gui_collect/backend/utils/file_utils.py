@@ -0,0 +1,333 @@
+import io
+import os
+import json
+import shutil
+import logging
+import threading
+
+from collections import Counter
+from pathlib import Path
+from typing import BinaryIO
+
+from .archive_utils import ArchiveMember, ARCHIVE_WRITERS
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+# linux/fs.h _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+# Already compressed, so stored as they are in archives
+STORED_SUFFIXES = {".dds", ".jpg", ".jpeg", ".png"}
+
+EXPORT_MANIFEST_NAME = ".export_manifest.json"
+# Bump whenever the exported files change for the same sources
+EXPORT_MANIFEST_VERSION = 1
+
+
+class ExportManifest:
+    """
+    Output files of the previous export of an extract folder, along with the
+    fingerprint of the sources each was made from, and its own size and mtime
+    once written. An output is unchanged if both fingerprints match and it
+    wasn't modified since. Safe to share between threads.
+    """
+
+    def __init__(self, extract_path: Path):
+        self.path = extract_path / EXPORT_MANIFEST_NAME
+        self.previous_files: dict[str, dict] = {}
+        self.files: dict[str, dict] = {}
+        self.lock = threading.Lock()
+
+        try:
+            manifest = json.loads(self.path.read_text())
+            if manifest["version"] == EXPORT_MANIFEST_VERSION:
+                self.previous_files = manifest["files"]
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring invalid <PATH>%s</PATH>", self.path)
+
+    def is_unchanged(self, file_path: Path, fingerprint: list):
+        if fingerprint is None:
+            return False
+
+        entry = self.previous_files.get(file_path.name)
+        if entry is None or entry["fingerprint"] != fingerprint:
+            return False
+
+        try:
+            st = file_path.stat()
+        except FileNotFoundError:
+            return False
+        if st.st_size != entry["size"] or st.st_mtime_ns != entry["mtime_ns"]:
+            return False
+
+        with self.lock:
+            self.files[file_path.name] = entry
+        return True
+
+    def add(self, file_path: Path, fingerprint: list):
+        st = file_path.stat()
+        with self.lock:
+            self.files[file_path.name] = {
+                "fingerprint": fingerprint,
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+            }
+
+    def remove_stale_files(self, remove_unlisted: bool = False):
+        """
+        Removes the outputs of the previous export that this one didn't make.
+        With remove_unlisted, removes everything else in the folder too.
+        """
+        extract_path = self.path.parent
+        if remove_unlisted:
+            stale_names = [p.name for p in extract_path.iterdir()]
+        else:
+            stale_names = list(self.previous_files)
+
+        for name in stale_names:
+            if name in self.files or name == EXPORT_MANIFEST_NAME:
+                continue
+
+            stale_path = extract_path / name
+            if stale_path.is_dir() and not stale_path.is_symlink():
+                shutil.rmtree(stale_path)
+            else:
+                remove_file(stale_path)
+            logger.debug("Removed stale <PATH>%s</PATH>", name)
+
+    def save(self):
+        self.path.write_text(
+            json.dumps({"version": EXPORT_MANIFEST_VERSION, "files": self.files})
+        )
+
+
+class FileExporter:
+    """
+    Places files of the frame analysis, or files already exported, at their
+    export path. When link is set, the file is hardlinked if both paths are
+    on the same volume, else cloned with a reflink or copy_file_range where
+    the filesystem supports it, else copied. The method used for every file
+    is logged and counted. Safe to share between threads.
+
+    Given a manifest, files whose sources didn't change since the previous
+    export are left as they are.
+    """
+
+    def __init__(self, link: bool = False, manifest: ExportManifest = None):
+        self.link = link
+        self.manifest = manifest
+        self.methods: Counter[str] = Counter()
+        self.lock = threading.Lock()
+
+    def export_file(self, src_path: Path, dst_path: Path, fingerprint: list = None):
+        # The frame analysis may hold symlinks of its own with the symlink option
+        src_path = src_path.resolve()
+        if fingerprint is None:
+            fingerprint = get_files_fingerprint([src_path])
+
+        if self.manifest and self.manifest.is_unchanged(dst_path, fingerprint):
+            return self.count_method(dst_path, "unchanged")
+
+        # Never write through a link left by a previous export
+        remove_file(dst_path)
+
+        method = None
+        if self.link:
+            method = link_file(src_path, dst_path)
+        if method is None:
+            shutil.copyfile(src_path, dst_path)
+            method = "copy"
+
+        if self.manifest:
+            self.manifest.add(dst_path, fingerprint)
+        return self.count_method(dst_path, method)
+
+    def write_file(self, dst_path: Path, fingerprint: list, write_file):
+        """
+        Writes dst_path with write_file(f), given the file opened in binary
+        mode, unless it is unchanged. A fingerprint of None always writes it.
+        """
+        if self.manifest and self.manifest.is_unchanged(dst_path, fingerprint):
+            return self.count_method(dst_path, "unchanged")
+
+        remove_file(dst_path)
+        with open(dst_path, "wb") as f:
+            write_file(f)
+
+        if self.manifest:
+            self.manifest.add(dst_path, fingerprint)
+        return self.count_method(dst_path, "write")
+
+    def count_method(self, dst_path: Path, method: str):
+        logger.debug("Exported <PATH>%s</PATH> (%s)", dst_path.name, method)
+        with self.lock:
+            self.methods[method] += 1
+
+        return method
+
+    def get_summary(self):
+        with self.lock:
+            return ", ".join([
+                "{} {}".format(count, method)
+                for method, count in self.methods.most_common()
+            ])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Files are exported in place, there is nothing left to finish
+        return False
+
+
+class ArchiveExporter(FileExporter):
+    """
+    Exports the files into a single zip or tar archive instead, as they
+    are produced, each under its path relative to root_path. Textures are
+    stored as they are. Everything else is deflated in zip archives, by the
+    thread exporting it, and tar archives aren't compressed at all. The
+    archive is written next to archive_path and only moved there once
+    complete.
+    """
+
+    def __init__(self, archive_path: Path, archive_format: str, root_path: Path):
+        super().__init__()
+        self.archive_path = archive_path
+        self.part_path = archive_path.with_name(archive_path.name + ".part")
+        self.root_path = root_path
+        if (archive_writer := ARCHIVE_WRITERS.get(archive_format)) is None:
+            raise Exception("Unsupported archive format {}".format(archive_format))
+        self.archive = archive_writer(self.part_path)
+
+        # Written members, for the files that are exported again under another name
+        self.members: dict[Path, ArchiveMember] = {}
+
+    def get_member_name(self, dst_path: Path):
+        return dst_path.relative_to(self.root_path).as_posix()
+
+    def export_file(self, src_path: Path, dst_path: Path, fingerprint: list = None):
+        member_name = self.get_member_name(dst_path)
+
+        with self.lock:
+            member = self.members.get(src_path)
+        if member is not None:
+            self.archive.add_member(member_name, member)
+            return self.count_method(dst_path, "archived")
+
+        src_path = src_path.resolve()
+        if not self.archive.compresses or src_path.suffix.lower() in STORED_SUFFIXES:
+            self.archive.add_file(member_name, src_path)
+            return self.count_method(dst_path, "stored")
+
+        member = ArchiveMember(compress=True)
+        with open(src_path, "rb") as f:
+            shutil.copyfileobj(f, member)
+        member.finish()
+        self.archive.add_member(member_name, member)
+        member.close()
+        return self.count_method(dst_path, "deflated")
+
+    def write_file(self, dst_path: Path, fingerprint: list, write_file):
+        member = ArchiveMember(compress=self.archive.compresses)
+        write_file(member)
+        member.finish()
+        self.archive.add_member(self.get_member_name(dst_path), member)
+
+        with self.lock:
+            self.members[dst_path] = member
+        return self.count_method(
+            dst_path, "deflated" if self.archive.compresses else "stored"
+        )
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        with self.lock:
+            for member in self.members.values():
+                member.close()
+            self.members = {}
+
+        if exc_type is not None:
+            self.archive.discard()
+            remove_file(self.part_path)
+            return False
+
+        self.archive.close()
+        os.replace(self.part_path, self.archive_path)
+        logger.info("Exported to <PATH>%s</PATH>", self.archive_path)
+        return False
+
+
+def get_files_fingerprint(paths: list[Path]):
+    """
+    Identifies the current content of the files by their path, size and
+    mtime, without reading them. Missing files are fingerprinted too.
+    """
+    fingerprint = []
+    for path in paths:
+        try:
+            st = path.stat()
+            fingerprint.append([str(path), st.st_size, st.st_mtime_ns])
+        except FileNotFoundError:
+            fingerprint.append([str(path), None, None])
+
+    return fingerprint
+
+
+def write_text(file: BinaryIO, text: str):
+    # Same encoding and newlines as Path.write_text
+    text_file = io.TextIOWrapper(file)
+    text_file.write(text)
+    text_file.detach()
+
+
+def remove_file(path: Path):
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def link_file(src_path: Path, dst_path: Path):
+    """
+    Returns the name of the method that placed src_path at dst_path,
+    or None if none of them is supported between both paths
+    """
+    try:
+        os.link(src_path, dst_path)
+        return "hardlink"
+    except OSError:
+        pass
+
+    if fcntl is None and not hasattr(os, "copy_file_range"):
+        return None
+
+    with open(src_path, "rb") as src, open(dst_path, "wb") as dst:
+        if fcntl is not None:
+            try:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+                return "reflink"
+            except OSError:
+                pass
+
+        if hasattr(os, "copy_file_range"):
+            size = os.fstat(src.fileno()).st_size
+            copied = 0
+            try:
+                while copied < size and (
+                    n := os.copy_file_range(src.fileno(), dst.fileno(), size - copied)
+                ):
+                    copied += n
+            except OSError:
+                pass
+            if copied == size:
+                return "copy_file_range"
+
+    # Whatever was partially cloned is overwritten by the copy
+    return None
@@ -1,4 +1,6 @@
+import queue
 import logging
+import threading
 
 from collections.abc import Callable
 
@@ -6,13 +8,35 @@ from gui_collect.common.terminal_logging_formatter import TerminalLoggingFormatt
 
 
 def get_terminal_logging_handler(_emit: Callable[[str], None]):
+    """
+    _emit is only ever called from the main thread, which runs Tk. Records
+    logged by other threads are queued until the main thread emits them,
+    either with emit_pending or before the next record it logs itself.
+    """
     formatter = TerminalLoggingFormatter()
 
     class TerminalLoggingHandler(logging.Handler):
+        def __init__(self):
+            super().__init__()
+            self.pending = queue.SimpleQueue()
+
         def emit(self, record):
             msg = self.format(record)
+            if threading.current_thread() is not threading.main_thread():
+                self.pending.put(msg)
+                return
+
+            self.emit_pending()
             _emit(msg)
 
+        def emit_pending(self):
+            while True:
+                try:
+                    msg = self.pending.get_nowait()
+                except queue.Empty:
+                    return
+                _emit(msg)
+
     handler = TerminalLoggingHandler()
     handler.setFormatter(formatter)
     return handler
@@ -7,6 +7,7 @@ from tkinter import filedialog
 from tkinter.font import Font
 
 from gui_collect.backend.config.Config import Config
+from gui_collect.backend.analysis.log_tailer import LogTailer
 
 from .data import Page
 from .xtk.FlatImageButton import FlatImageButton
@@ -28,8 +29,12 @@ class AddressFrame(tk.Frame):
         self.path: str = ""
         self.path_text = ""
 
+        self.log_tailer: LogTailer = None
+        self.analysis_status_job = None
+
         self.create_widgets()
-        self.load_latest_frame_analysis()
+        # Don't parse a dump the user may never extract from on every launch
+        self.load_latest_frame_analysis(tail_log=False)
 
     def refresh_path_text(self):
         if not self.path:
@@ -49,6 +54,15 @@ class AddressFrame(tk.Frame):
         )
         self.folder_path_label.bind("<Configure>", lambda _: self.refresh_path_text())
 
+        self.analysis_status_label = tk.Label(
+            self,
+            text="",
+            fg="#555",
+            anchor="e",
+            padx=12,
+            font=("Arial", 12, "bold"),
+        )
+
         img = tk.PhotoImage(
             file=Path("./resources/images/buttons/folder_open.32.png").absolute()
         )
@@ -80,15 +94,64 @@ class AddressFrame(tk.Frame):
         )
 
         self.folder_path_label.grid(row=0, column=0, sticky="nsew")
-        pick_latest_dump_btn.grid(row=0, column=1, sticky="nsew")
-        pick_folder_btn.grid(row=0, column=2, sticky="nsew")
+        self.analysis_status_label.grid(row=0, column=1, sticky="nsew")
+        pick_latest_dump_btn.grid(row=0, column=2, sticky="nsew")
+        pick_folder_btn.grid(row=0, column=3, sticky="nsew")
 
-    def set_path(self, text: str):
+    def set_path(self, text: str, tail_log: bool = True):
         self.path = str(Path(text).resolve())
         logger.info("Set frame analysis path: <PATH>%s</PATH>", str(self.path))
 
         self.refresh_path_text()
         self.parent.on_address_change(text=self.path)
+        if tail_log:
+            self.start_log_tailer()
+        else:
+            self.stop_log_tailer()
+
+    def start_log_tailer(self):
+        """
+        Parse the log.txt of the frame analysis folder in the background,
+        following it while 3DMigoto is still writing the dump, so that the
+        analysis is ready by the time extraction starts
+        """
+        self.stop_log_tailer()
+
+        log_path = Path(self.path, "log.txt")
+        if not log_path.exists():
+            return
+
+        self.log_tailer = LogTailer(log_path)
+        self.log_tailer.start()
+        self.refresh_analysis_status()
+
+    def stop_log_tailer(self):
+        """
+        Extraction reads log.txt itself, stop parsing it in the background.
+        Blocks until the tailer is done with what it was parsing, which may
+        be writing the analysis to the cache extraction then loads.
+        """
+        if self.analysis_status_job:
+            self.after_cancel(self.analysis_status_job)
+            self.analysis_status_job = None
+        if self.log_tailer:
+            self.log_tailer.stop()
+            self.log_tailer = None
+        self.analysis_status_label.config(text="")
+
+    def refresh_analysis_status(self):
+        if self.log_tailer.has_failed():
+            self.analysis_status_label.config(text="")
+            self.analysis_status_job = None
+            return
+
+        if self.log_tailer.is_ready():
+            self.analysis_status_label.config(text="Analysis Ready", fg="#3fb76b")
+        else:
+            self.analysis_status_label.config(text="Analyzing...", fg="#555")
+
+        # Keep following the log, it may grow again if the dump wasn't done
+        self.analysis_status_job = self.after(500, self.refresh_analysis_status)
 
     def handle_frame_dump_pick(self):
         path = filedialog.askdirectory(
@@ -97,7 +160,7 @@ class AddressFrame(tk.Frame):
         if path:
             self.set_path(path)
 
-    def load_latest_frame_analysis(self):
+    def load_latest_frame_analysis(self, tail_log: bool = True):
         saved_path = (
             Config
             .get_instance()
@@ -123,9 +186,9 @@ class AddressFrame(tk.Frame):
             key=os.path.getctime,
         )
         if len(frame_analysis_paths) > 0:
-            self.set_path(str(frame_analysis_paths[-1]))
+            self.set_path(str(frame_analysis_paths[-1]), tail_log)
         else:
-            self.set_path(saved_path)
+            self.set_path(saved_path, tail_log)
 
         return
 
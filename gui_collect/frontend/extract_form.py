@@ -273,6 +273,38 @@ class ExtractForm(tk.Frame):
             )
             game_options.delete_frame_analysis = newValue
 
+        def handle_change_3(newValue: bool):
+            logger.info(
+                "Set Config: /game/%s/binary_model_data = %s",
+                self.variant.value,
+                newValue,
+            )
+            game_options.binary_model_data = newValue
+
+        def handle_change_4(newValue: bool):
+            logger.info(
+                "Set Config: /game/%s/link_exported_files = %s",
+                self.variant.value,
+                newValue,
+            )
+            game_options.link_exported_files = newValue
+
+        def handle_change_5(newValue: bool):
+            logger.info(
+                "Set Config: /game/%s/incremental_export = %s",
+                self.variant.value,
+                newValue,
+            )
+            game_options.incremental_export = newValue
+
+        def handle_change_6(newValue: bool):
+            logger.info(
+                "Set Config: /game/%s/export_archive = %s",
+                self.variant.value,
+                newValue,
+            )
+            game_options.export_archive = newValue
+
         checkbox_0 = CompactCheckbox(
             self.extract_options_frame,
             height=30,
@@ -297,9 +329,61 @@ class ExtractForm(tk.Frame):
             on_change=handle_change_2,
             text="Delete frame analysis after extraction",
         )
+        checkbox_3 = CompactCheckbox(
+            self.extract_options_frame,
+            height=30,
+            active_bg=self.accent_color,
+            active=game_options.binary_model_data,
+            on_change=handle_change_3,
+            text="Export model data as binary .buf and .fmt",
+        )
+        checkbox_4 = CompactCheckbox(
+            self.extract_options_frame,
+            height=30,
+            active_bg=self.accent_color,
+            active=game_options.link_exported_files,
+            on_change=handle_change_4,
+            text="Link exported files instead of copying them",
+            tooltip_text=(
+                "Hardlinks or clones textures, IBs and repeated vb0 files where the "
+                "drive supports it, and copies them otherwise. Hardlinked files share "
+                "their data with the frame analysis, editing one in place edits both."
+            ),
+        )
+        checkbox_5 = CompactCheckbox(
+            self.extract_options_frame,
+            height=30,
+            active_bg=self.accent_color,
+            active=game_options.incremental_export,
+            on_change=handle_change_5,
+            text="Only export files that changed since the last export",
+            tooltip_text=(
+                "Keeps the files of the previous export whose sources didn't change, "
+                "and deletes the ones it no longer makes instead of cleaning the whole "
+                "folder. Decided by the file sizes and modification times."
+            ),
+        )
+        checkbox_6 = CompactCheckbox(
+            self.extract_options_frame,
+            height=30,
+            active_bg=self.accent_color,
+            active=game_options.export_archive,
+            on_change=handle_change_6,
+            text="Export into a single .{} archive".format(game_options.archive_format),
+            tooltip_text=(
+                "Writes the exported files straight into an archive next to where "
+                "the extracted folder would be. The archive format is set by "
+                "archive_format in the config: zip, which compresses everything but "
+                "the textures, or tar, which compresses nothing."
+            ),
+        )
         checkbox_0.pack(side="top", pady=(3, 0), anchor="w", fill="x")
         checkbox_1.pack(side="top", pady=(3, 0), anchor="w", fill="x")
         checkbox_2.pack(side="top", pady=(3, 0), anchor="w", fill="x")
+        checkbox_3.pack(side="top", pady=(3, 0), anchor="w", fill="x")
+        checkbox_4.pack(side="top", pady=(3, 0), anchor="w", fill="x")
+        checkbox_5.pack(side="top", pady=(3, 0), anchor="w", fill="x")
+        checkbox_6.pack(side="top", pady=(3, 0), anchor="w", fill="x")
 
     def grid_forget_widgets(self):
         for child in self.winfo_children():
@@ -426,7 +510,9 @@ class ExtractForm(tk.Frame):
             )
             return
 
-        frame_analysis = FrameAnalysis(path)
+        # Never parse log.txt twice at once, a tailer writing the cache is waited on
+        self.parent.address_frame.stop_log_tailer()
+        frame_analysis = FrameAnalysis(path, input_component_hashes)
         self.state.set_var(State.K.FRAME_ANALYSIS, frame_analysis)
         extracted_components = frame_analysis.extract(
             input_component_hashes,
@@ -482,7 +568,7 @@ class ExtractForm(tk.Frame):
                 game=self.variant.value,
             )
             if not frame_analysis.path.exists():
-                self.parent.address_frame.load_latest_frame_analysis()
+                self.parent.address_frame.load_latest_frame_analysis(tail_log=False)
             self.state.del_var(State.K.FRAME_ANALYSIS)
 
         except Exception as X:
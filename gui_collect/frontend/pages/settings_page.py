@@ -174,6 +174,11 @@ class SettingsRouter(ScrollableFrame):
             callback=lambda _: self.state.refresh_all_extract_forms(),
             pady=(0, 8),
         )
+        self.create_number_entry(
+            "Number of components exported at the same time. Set to 1 to export them one by one.",
+            cfg_key_path=["export_workers"],
+            pady=(0, 8),
+        )
 
         connector_button = ConnectorButton(
             self.frame,
@@ -371,6 +376,65 @@ class SettingsRouter(ScrollableFrame):
         frame.bind("<Leave>", handle_leave)
         checkbox.bind("<Leave>", handle_leave)
 
+    def create_number_entry(
+        self,
+        text: str,
+        *,
+        cfg_key_path: list[str],
+        pady=(0, 0),
+        accent_color="#CCC",
+    ):
+        number_entry_validate_command = self.register(
+            lambda new_text: (
+                len(new_text) <= 2 and (new_text == "" or new_text.isdecimal())
+            )
+        )
+
+        def save_text_to_cfg(_var):
+            # Keep the previous value while the entry is empty
+            if (entry_text := _var.get()) and int(entry_text) > 0:
+                self.cfg.set_config_key_value(cfg_key_path, int(entry_text))
+
+        frame = tk.Frame(self.frame, bg="#222", padx=8, pady=8)
+        frame.grid(sticky="nsew", pady=pady, column=0)
+        frame.grid_columnconfigure(0, weight=1)
+        frame.grid_rowconfigure(0, weight=1)
+
+        lbl = tk.Label(
+            frame,
+            text=text,
+            anchor="w",
+            font=("Arial", 16),
+            fg="#CCC",
+            bg="#222",
+            relief="flat",
+        )
+        lbl.grid(row=0, column=0, rowspan=2, sticky="nsew")
+
+        border = tk.Frame(frame, bg=accent_color, height=4)
+        border.grid(row=1, column=1, sticky="nsew")
+
+        string_var = tk.StringVar(value=self.cfg.get_config_key_value(cfg_key_path))
+        string_var.trace_add(
+            "write",
+            callback=lambda a, b, c, _var=string_var: save_text_to_cfg(_var),
+        )
+
+        entry = tk.Entry(
+            frame,
+            textvariable=string_var,
+            fg="#e8eaed",
+            bg="#181818",
+            relief="flat",
+            font=("arial", 20),
+            width=5,
+            insertbackground="grey",
+            justify="center",
+            validate="key",
+            validatecommand=(number_entry_validate_command, "%P"),
+        )
+        entry.grid(row=0, column=1, sticky="nsew", ipadx=8)
+
 
 class ConnectorButton(tk.Frame):
     def __init__(self, parent, enabled_cfg_path: list[str], *args, **kwargs):
@@ -0,0 +1,4 @@
+import os
+
+# gui_collect resolves the path of explorer.exe when imported
+os.environ.setdefault("WINDIR", "C:\\Windows")
@@ -0,0 +1,174 @@
+import random
+
+from pathlib import Path
+
+
+BINDING_KEYWORDS = [
+    "IASetVertexBuffers",
+    "SOSetTargets",
+    "CSSetUnorderedAccessViews",
+    "CSSetShaderResources",
+    "CSSetConstantBuffers",
+    "PSSetShaderResources",
+]
+VIEW_BINDING_KEYWORDS = [
+    "PSSetShaderResources",
+    "CSSetShaderResources",
+    "CSSetUnorderedAccessViews",
+]
+
+
+def generate_log(
+    log_path: Path,
+    draw_count: int,
+    seed: int = 0,
+    *,
+    crlf: bool = False,
+    non_ascii: bool = False,
+    encoding: str = "utf-8",
+    hash_count: int = 200,
+):
+    """
+    Write a random log.txt in the layout 3DMigoto logs frame analysis dumps
+    with. Draw ids log shaders, index and vertex buffers, resource bindings,
+    CopyResource calls, texture dumps and draw calls, along with the resets
+    and lines the parser skips. Returns the resource hashes it drew from.
+    """
+    r = random.Random(seed)
+    resource_hashes = ["%08x" % r.getrandbits(32) for _ in range(hash_count)]
+    shader_hashes = ["%016x" % r.getrandbits(64) for _ in range(30)]
+    folder = "C:\\Games\\{}\\FrameAnalysis-2024-01-01-000000".format(
+        "Ünïcödé" if non_ascii else "Game"
+    )
+
+    def pick():
+        return r.choice(resource_hashes)
+
+    lines = ["analyse_options: 00000000"]
+    for draw_id in ["%06d" % i for i in range(1, draw_count + 1)]:
+        for _ in range(r.randint(1, 8)):
+            k = r.random()
+            if k < 0.12:
+                lines.append(
+                    f"{draw_id} VSSetShader(pVertexShader:0x0000020A1A1A4CF8, "
+                    f"ppClassInstances:0x0000000000000000, NumClassInstances:0) "
+                    f"hash={r.choice(shader_hashes)}"
+                )
+            elif k < 0.22:
+                lines.append(
+                    f"{draw_id} PSSetShader(pPixelShader:0x0000020A1A1A4CF8, "
+                    f"ppClassInstances:0x0000000000000000, NumClassInstances:0) "
+                    f"hash={r.choice(shader_hashes)}"
+                )
+            elif k < 0.28:
+                lines.append(
+                    f"{draw_id} CSSetShader(pComputeShader:0x0000020A1A1A4CF8, "
+                    f"ppClassInstances:0x0000000000000000, NumClassInstances:0) "
+                    f"hash={r.choice(shader_hashes)}"
+                )
+            elif k < 0.36:
+                lines.append(
+                    f"{draw_id} IASetIndexBuffer(pIndexBuffer:0x0000020A1B2F5F38, "
+                    f"Format:57, Offset:0) hash={pick()}"
+                )
+            elif k < 0.37:
+                # Unbinding the index buffer isn't logged with a hash
+                lines.append(
+                    f"{draw_id} IASetIndexBuffer(pIndexBuffer:0x0000000000000000, "
+                    f"Format:0, Offset:0)"
+                )
+            elif k < 0.62:
+                keyword = r.choice(BINDING_KEYWORDS)
+                count = r.randint(1, 4)
+                lines.append(
+                    f"{draw_id} {keyword}(StartSlot:0, NumBuffers:{count}, "
+                    f"ppVertexBuffers:0x000000F4E8AFF4F0)"
+                )
+                for slot in range(count):
+                    if r.random() > 0.8:
+                        slot = r.randint(0, 9)
+                    if keyword in VIEW_BINDING_KEYWORDS and r.random() < 0.5:
+                        lines.append(
+                            f"       {slot}: view=0x0000020A1B30D1F8 "
+                            f"resource=0x0000020A1B2E9DB8 hash={pick()}"
+                        )
+                    else:
+                        lines.append(
+                            f"       {slot}: resource=0x0000020A1B2F6078 hash={pick()}"
+                        )
+            elif k < 0.67:
+                src_hash, dst_hash = pick(), pick()
+                if r.random() < 0.1:
+                    dst_hash = src_hash
+                lines.append(
+                    f"{draw_id} CopyResource(pDstResource:0x0000020A1B2F6078, "
+                    f"pSrcResource:0x0000020A1B2F6079)"
+                )
+                lines.append(f"       Src: resource=0x0000020A1B2F6079 hash={src_hash}")
+                lines.append(f"       Dst: resource=0x0000020A1B2F6078 hash={dst_hash}")
+            elif k < 0.72:
+                first_index = r.choice([0, 3000, 6000, 9000])
+                if r.random() < 0.5:
+                    lines.append(
+                        f"{draw_id} DrawIndexed(IndexCount:{r.randint(3, 90000)}, "
+                        f"StartIndexLocation:{first_index}, BaseVertexLocation:0)"
+                    )
+                else:
+                    lines.append(
+                        f"{draw_id} DrawIndexedInstanced("
+                        f"IndexCountPerInstance:{r.randint(3, 90000)}, "
+                        f"InstanceCount:1, StartIndexLocation:{first_index}, "
+                        f"BaseVertexLocation:0, StartInstanceLocation:0)"
+                    )
+                break
+            elif k < 0.80:
+                texture_hash = pick()
+                prefix = r.choice(["ps-t", "ps-t", "o"])
+                contamination = r.choice(["", "", "!U!="])
+                extension = r.choice(["dds", "jpg"])
+                texture_format = r.choice(
+                    ["BC7_UNORM_SRGB", "R8G8B8A8_UNORM", "BC1_UNORM"]
+                )
+                lines.append(
+                    f"{draw_id} 3DMigoto Dumping Texture2D {folder}\\{draw_id}-"
+                    f"{prefix}{r.randint(0, 7)}={contamination}{texture_hash}-"
+                    f"vs={r.choice(shader_hashes)}-ps={r.choice(shader_hashes)}"
+                    f".{extension} -> {folder}\\deduped\\{texture_hash}-"
+                    f"{texture_format}.{extension}"
+                )
+            elif k < 0.81:
+                lines.append(
+                    f"{draw_id} 3DMigoto Dumping Buffer "
+                    f"{folder}\\{draw_id}-vb0={pick()}.txt"
+                )
+            elif k < 0.815:
+                lines.append(
+                    f"{draw_id} DrawIndexedInstancedIndirect("
+                    f"pBufferForArgs:0x0000020A1B2F6078, AlignedByteOffsetForArgs:0)"
+                )
+            elif k < 0.82:
+                lines.append(
+                    f"{draw_id} ClearRenderTargetView("
+                    f"pRenderTargetView:0x0000020A1B2F6078, "
+                    f"ColorRGBA:0x000000F4E8AFF4F0)"
+                )
+            elif k < 0.9:
+                lines.append(
+                    f"{draw_id} Dispatch(ThreadGroupCountX:1, "
+                    f"ThreadGroupCountY:1, ThreadGroupCountZ:1)"
+                )
+                break
+            else:
+                lines.append(
+                    f"{draw_id} OMSetRenderTargets(NumViews:1, "
+                    f"ppRenderTargetViews:0x000000F4E8AFF4F0, "
+                    f"pDepthStencilView:0x0000020A1B2F6078)"
+                )
+                lines.append(
+                    f"       0: view=0x0000020A1B30D1F8 "
+                    f"resource=0x0000020A1B2E9DB8 hash={pick()}"
+                )
+
+    newline = "\r\n" if crlf else "\n"
+    Path(log_path).write_bytes((newline.join(lines) + newline).encode(encoding))
+    return resource_hashes
@@ -0,0 +1,91 @@
+import tarfile
+import zipfile
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+
+import pytest
+
+from gui_collect.backend.config.structs import ConfigData
+from gui_collect.backend.utils import archive_utils
+from gui_collect.backend.utils.file_utils import ArchiveExporter
+
+
+def export_archive(tmp_path, archive_format: str):
+    """
+    Exports text buffers written in place, a texture and a buffer copied
+    from their sources, and the written buffers again under other names,
+    from several threads at once. Returns the archive and the expected
+    contents of each member.
+    """
+    source_path = tmp_path / "source"
+    source_path.mkdir()
+    root_path = tmp_path / "_Extracted"
+    extract_path = root_path / "Model"
+    archive_path = root_path / "Model.{}".format(archive_format)
+
+    texture_path = source_path / "diffuse.dds"
+    texture_path.write_bytes(bytes(range(256)) * 64)
+    buffer_path = source_path / "vb1.txt"
+    buffer_path.write_text("vb1[0]+000 POSITION: 0.0, 1.0, 2.0\n" * 500)
+
+    expected = {
+        "Model/Texture.dds": texture_path.read_bytes(),
+        "Model/vb1.txt": buffer_path.read_bytes(),
+    }
+    for i in range(32):
+        data = "vb0[{0}]+000 POSITION: {0}.0, 1.0, 2.0\n".format(i).encode() * 300
+        expected["Model/Part{}.vb".format(i)] = data
+        expected["Model/Copy{}.vb".format(i)] = data
+
+    def export_part(exporter: ArchiveExporter, i: int):
+        data = expected["Model/Part{}.vb".format(i)]
+        written_path = extract_path / "Part{}.vb".format(i)
+        exporter.write_file(written_path, None, lambda f: f.write(data))
+        exporter.export_file(written_path, extract_path / "Copy{}.vb".format(i))
+
+    root_path.mkdir()
+    with ArchiveExporter(archive_path, archive_format, root_path) as exporter:
+        exporter.export_file(texture_path, extract_path / "Texture.dds")
+        exporter.export_file(buffer_path, extract_path / "vb1.txt")
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(lambda i: export_part(exporter, i), range(32)))
+
+    assert not archive_path.with_name(archive_path.name + ".part").exists()
+    return archive_path, expected
+
+
+@pytest.mark.parametrize("zip64_limit", [archive_utils.ZIP64_LIMIT, 1000])
+def test_zip_archive_reads_back_with_zipfile(tmp_path, monkeypatch, zip64_limit):
+    # A low limit puts every large size and offset in zip64 records
+    monkeypatch.setattr(archive_utils, "ZIP64_LIMIT", zip64_limit)
+    archive_path, expected = export_archive(tmp_path, "zip")
+
+    with zipfile.ZipFile(archive_path) as archive:
+        assert archive.testzip() is None
+        assert sorted(archive.namelist()) == sorted(expected)
+        for name, data in expected.items():
+            assert archive.read(name) == data
+            assert archive.getinfo(name).compress_type == (
+                zipfile.ZIP_STORED if name.endswith(".dds") else zipfile.ZIP_DEFLATED
+            )
+
+
+def test_tar_archive_reads_back_with_tarfile(tmp_path):
+    archive_path, expected = export_archive(tmp_path, "tar")
+
+    with tarfile.open(archive_path) as archive:
+        assert sorted(archive.getnames()) == sorted(expected)
+        for name, data in expected.items():
+            assert archive.extractfile(name).read() == data
+
+
+def test_unsupported_archive_format(tmp_path):
+    with pytest.raises(Exception, match="Unsupported archive format"):
+        ArchiveExporter(tmp_path / "Model.7z", "7z", tmp_path)
+
+    config_data = asdict(ConfigData())
+    config_data["game"]["zzz"]["game_options"]["archive_format"] = "7z"
+    ConfigData.validate_config_data(config_data)
+    assert config_data["game"]["zzz"]["game_options"]["archive_format"] == "zip"
+    assert config_data["game"]["hsr"]["game_options"]["archive_format"] == "zip"
@@ -0,0 +1,129 @@
+import math
+import random
+import struct
+
+import pytest
+
+from gui_collect.backend.utils.buffer_utils import buffer_decoder
+from gui_collect.backend.utils.buffer_utils.buffer_decoder import (
+    collect_binary_buffer_data,
+    reverse_applied_shapekeys,
+)
+
+np = pytest.importorskip("numpy")
+
+
+BUFFER_FORMATS = [
+    "R32G32B32_FLOAT",
+    "R16G16B16A16_FLOAT",
+    "R8G8B8A8_UNORM",
+    "R8G8B8A8_SNORM",
+    "R16G16_UNORM",
+    "R16G16_SNORM",
+    "R32_UINT",
+    "R8G8B8A8_UINT",
+    "R16G16_SINT",
+    "R32G32_SINT",
+    "R10G10B10A2_UNORM",
+    "R10G10B10A2_UINT",
+    "R11G11B10_FLOAT",
+    "B5G6R5_UNORM",
+    "D24_UNORM_S8_UINT",
+]
+
+SHAPEKEY_STRIDE = 40
+
+
+def to_bits(values):
+    """
+    Python values of a decoded column, with floats as their bits so that
+    -0.0 and rounding differences compare unequal. Half floats unpacked by
+    struct drop the payload of a nan, which is written out as nan either way.
+    """
+    if not isinstance(values, list):
+        values = values.tolist()
+    return [
+        [
+            value
+            if not isinstance(value, float)
+            else "nan"
+            if math.isnan(value)
+            else struct.pack("<d", value)
+            for value in components
+        ]
+        for components in values
+    ]
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_numpy_decode_matches_struct_decode(tmp_path, monkeypatch, seed):
+    r = random.Random(seed)
+    buffer_formats = r.sample(BUFFER_FORMATS, 6)
+    stride = sum(
+        buffer_decoder.get_byte_width(buffer_format) for buffer_format in buffer_formats
+    )
+    # Elements don't have to fill the whole stride
+    stride += r.choice([0, 4, 12])
+    vertex_count = r.randint(1, 500)
+
+    buffer_path = tmp_path / "vb0.buf"
+    buffer_path.write_bytes(r.randbytes(stride * vertex_count))
+
+    buffer_data = collect_binary_buffer_data(buffer_path, buffer_formats, stride)
+    monkeypatch.setattr(buffer_decoder, "np", None)
+    struct_buffer_data = collect_binary_buffer_data(buffer_path, buffer_formats, stride)
+
+    assert len(buffer_data) == len(struct_buffer_data) == vertex_count
+    for buffer_format, column, struct_column in zip(
+        buffer_formats, buffer_data.columns, struct_buffer_data.columns
+    ):
+        assert to_bits(column) == to_bits(struct_column), buffer_format
+
+
+def create_shapekeys(tmp_path, vertex_count: int, block_count: int, seed: int):
+    """
+    Returns random positions, shapekeys and the constant buffers splitting
+    the shapekeys into blocks. Half the seeds list only a few distinct vertices,
+    so that most are listed several times per block.
+    """
+    rng = np.random.default_rng(seed)
+    positions = rng.normal(0, 2, vertex_count * SHAPEKEY_STRIDE // 4).astype("<f4")
+
+    shapekey_dtype = np.dtype([("index", "<u4"), ("values", "<f4", (9,))])
+    listed_count = vertex_count if seed % 2 else max(1, vertex_count // 20)
+    blocks = []
+    cb_paths = []
+    offset = 0
+    for i in range(block_count):
+        count = int(rng.integers(0, 600))
+        block = np.empty(count, dtype=shapekey_dtype)
+        block["index"] = rng.integers(0, listed_count, count)
+        block["values"] = rng.normal(0, 0.05, (count, 9))
+        blocks.append(block.tobytes())
+
+        cb_path = tmp_path / "cb{}.buf".format(i)
+        multiplier = float(rng.uniform(-2, 2))
+        cb_path.write_bytes(struct.pack("<LLff", offset, count, multiplier, 0.0))
+        cb_paths.append(cb_path)
+        offset += count
+
+    return positions.tobytes(), b"".join(blocks), cb_paths
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_numpy_shapekey_reversal_matches_struct_loop(tmp_path, monkeypatch, seed):
+    r = random.Random(seed)
+    positions, shapekeys, cb_paths = create_shapekeys(
+        tmp_path, r.randint(1, 3000), r.randint(1, 12), seed
+    )
+
+    reversed_positions = reverse_applied_shapekeys(
+        bytearray(positions), shapekeys, cb_paths
+    )
+    monkeypatch.setattr(buffer_decoder, "np", None)
+    struct_reversed_positions = reverse_applied_shapekeys(
+        bytearray(positions), shapekeys, cb_paths
+    )
+
+    assert reversed_positions != bytearray(positions)
+    assert reversed_positions == struct_reversed_positions
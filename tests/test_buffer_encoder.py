@@ -0,0 +1,230 @@
+import io
+import os
+import random
+import struct
+
+import pytest
+
+from gui_collect.backend.utils.buffer_utils import buffer_decoder, buffer_encoder
+from gui_collect.backend.utils.buffer_utils.buffer_decoder import (
+    collect_binary_buffer_data,
+    get_byte_width,
+)
+from gui_collect.backend.utils.buffer_utils.buffer_encoder import (
+    construct_combined_buffer,
+    handle_no_weight_blend,
+    merge_buffers,
+    write_combined_buffer,
+)
+from gui_collect.backend.utils.buffer_utils.structs import BufferData, BufferElement
+
+
+def make_buffer(tmp_path, name: str, formats: list[str], vertex_count: int, seed=0):
+    r = random.Random(seed)
+    stride = sum([get_byte_width(format) for format in formats])
+    buffer_path = tmp_path / "{}.buf".format(name)
+    buffer_path.write_bytes(r.randbytes(stride * vertex_count))
+
+    elements = [
+        BufferElement({
+            "Name": "{}{}".format(name.upper(), i),
+            "SemanticName": name.upper(),
+            "SemanticIndex": str(i),
+            "Format": format,
+            "ByteWidth": get_byte_width(format),
+        })
+        for i, format in enumerate(formats)
+    ]
+    return collect_binary_buffer_data(buffer_path, formats, stride), elements
+
+
+def legacy_construct_combined_buffer(buffer_data, buffer_elements):
+    """
+    The text vb0 writer from before columns were formatted as a whole,
+    taking the decoded values of every vertex as a list of rows
+    """
+    stride = sum([element.ByteWidth for element in buffer_elements])
+
+    vb_merged = "\n".join([
+        "stride: {}".format(stride),
+        "first vertex: 0",
+        "vertex count: {}".format(len(buffer_data)),
+        "topology: trianglelist",
+        "",
+    ])
+
+    byte_offset = 0
+    byte_offsets, element_names = [], []
+    for i, element in enumerate(buffer_elements):
+        byte_offsets.append(f"{str(byte_offset).zfill(3)}")
+        element_names.append(element.Name)
+
+        vb_merged += "\n".join([
+            f"element[{i}]:",
+            f"  SemanticName: {element.SemanticName}",
+            f"  SemanticIndex: {element.SemanticIndex}",
+            f"  Format: {element.Format}",
+            f"  InputSlot: 0",
+            f"  AlignedByteOffset: {byte_offset}",
+            f"  InputSlotClass: per-vertex",
+            f"  InstanceDataStepRate: 0",
+            "",
+        ])
+        byte_offset += element.ByteWidth
+
+    vb_merged += "\nvertex-data:\n\n"
+
+    vb_merged += "\n".join([
+        "".join([
+            f"vb0[{i}]+{byte_offsets[j]} {element_names[j]}: {', '.join(map(str, buffer_data[i][j]))}\n"
+            for j in range(len(buffer_elements))
+        ])
+        for i in range(len(buffer_data))
+    ])
+
+    return vb_merged
+
+
+def get_rows(buffers: list[BufferData]):
+    columns = [column for buffer in buffers for column in buffer.columns]
+    return [[column[i] for column in columns] for i in range(len(buffers[0]))]
+
+
+class RecordingFile:
+    def __init__(self):
+        self.writes: list[str] = []
+
+    def write(self, text: str):
+        self.writes.append(text)
+        return len(text)
+
+
+def test_write_combined_buffer_writes_one_block_at_a_time(tmp_path, monkeypatch):
+    block_size = 64
+    monkeypatch.setattr(buffer_encoder, "COMBINED_BUFFER_BLOCK_SIZE", block_size)
+
+    vertex_count = 1000
+    position, position_elements = make_buffer(
+        tmp_path,
+        "position",
+        ["R32G32B32_FLOAT", "R32G32B32_FLOAT", "R32G32B32A32_FLOAT"],
+        vertex_count,
+    )
+    texcoord, texcoord_elements = make_buffer(
+        tmp_path, "texcoord", ["R8G8B8A8_UNORM", "R16G16_FLOAT"], vertex_count
+    )
+    merged = merge_buffers(
+        [position, texcoord], [position_elements, texcoord_elements]
+    )
+
+    file = RecordingFile()
+    write_combined_buffer(file, merged.buffer_data, merged.buffer_elements)
+
+    # No write holds more than the lines of a single block of vertices
+    element_count = len(merged.buffer_elements)
+    assert len(file.writes) > vertex_count // block_size
+    assert max([text.count("vb0[") for text in file.writes]) <= (
+        block_size * element_count
+    )
+
+    text = "".join(file.writes)
+    assert text.count("vb0[") == vertex_count * element_count
+    assert text == construct_combined_buffer(
+        merged.buffer_data, merged.buffer_elements
+    )
+
+    # Written in text mode, like a file opened with open(path, "w")
+    binary_file = io.BytesIO()
+    merged.write(binary_file)
+    assert binary_file.getvalue() == text.replace("\n", os.linesep).encode()
+
+
+def test_combined_buffer_golden_output(tmp_path):
+    values = [0.1, -0.0, 1e-05, 123456789.0, float("inf"), float("nan")]
+    position_path = tmp_path / "position.buf"
+    position_path.write_bytes(struct.pack("<6f", *values))
+    normal_path = tmp_path / "normal.buf"
+    normal_path.write_bytes(bytes([0, 128, 255, 127, 1, 129, 254, 64]))
+
+    position = collect_binary_buffer_data(position_path, ["R32G32B32_FLOAT"], 12)
+    normal = collect_binary_buffer_data(normal_path, ["R8G8_UNORM", "R8G8_SNORM"], 4)
+    elements = [
+        BufferElement({
+            "Name": "POSITION",
+            "SemanticName": "POSITION",
+            "SemanticIndex": "0",
+            "Format": "R32G32B32_FLOAT",
+            "ByteWidth": 12,
+        }),
+        BufferElement({
+            "Name": "NORMAL",
+            "SemanticName": "NORMAL",
+            "SemanticIndex": "0",
+            "Format": "R8G8_UNORM",
+            "ByteWidth": 2,
+        }),
+        BufferElement({
+            "Name": "TANGENT{0}",
+            "SemanticName": "TANGENT",
+            "SemanticIndex": "0",
+            "Format": "R8G8_SNORM",
+            "ByteWidth": 2,
+        }),
+    ]
+    merged = merge_buffers([position, normal], [elements[:1], elements[1:]])
+
+    vertex_data = construct_combined_buffer(
+        merged.buffer_data, merged.buffer_elements
+    ).split("vertex-data:\n\n")[1]
+    assert vertex_data == (
+        "vb0[0]+000 POSITION: 0.10000000149011612, -0.0, 9.999999747378752e-06\n"
+        "vb0[0]+012 NORMAL: 0.0, 0.5019607843137255\n"
+        "vb0[0]+014 TANGENT{0}: -0.007874015748031496, 1.0\n"
+        "\n"
+        "vb0[1]+000 POSITION: 123456792.0, inf, nan\n"
+        "vb0[1]+012 NORMAL: 0.00392156862745098, 0.5058823529411764\n"
+        "vb0[1]+014 TANGENT{0}: -0.015748031496062992, 0.5039370078740157\n"
+    )
+
+
+@pytest.mark.parametrize("block_size", [1, 7, 4096])
+def test_combined_buffer_matches_legacy_writer(tmp_path, monkeypatch, block_size):
+    pytest.importorskip("numpy")
+    monkeypatch.setattr(buffer_encoder, "COMBINED_BUFFER_BLOCK_SIZE", block_size)
+
+    vertex_count = 300
+    buffer_formats = {
+        "position": ["R32G32B32_FLOAT", "R16G16B16A16_FLOAT"],
+        "normal": ["R8G8B8A8_UNORM", "R16G16_SNORM", "R10G10B10A2_UNORM"],
+        "texcoord": ["R11G11B10_FLOAT", "R32G32_UINT", "R16G16_SINT"],
+        "blend": ["D24_UNORM_S8_UINT", "R8G8B8A8_UINT"],
+        "weight": ["R32_UINT"],
+    }
+
+    def make_buffers():
+        buffers, elements = [], []
+        for seed, (name, formats) in enumerate(buffer_formats.items()):
+            buffer, buffer_elements = make_buffer(
+                tmp_path, name, formats, vertex_count, seed
+            )
+            # A lone R32_UINT BLENDINDICES gets a BLENDWEIGHTS column of "1"
+            if name == "weight":
+                buffer_elements[0].Name = "BLENDINDICES"
+            buffer, buffer_elements = handle_no_weight_blend(buffer, buffer_elements)
+            buffers.append(buffer)
+            elements.append(buffer_elements)
+        return buffers, elements
+
+    buffers, elements = make_buffers()
+    merged = merge_buffers(buffers, elements)
+    text = construct_combined_buffer(merged.buffer_data, merged.buffer_elements)
+
+    # Decoded by struct, one tuple per vertex, like the legacy writer got them
+    monkeypatch.setattr(buffer_decoder, "np", None)
+    legacy_buffers, _ = make_buffers()
+    legacy_text = legacy_construct_combined_buffer(
+        get_rows(legacy_buffers), merged.buffer_elements
+    )
+
+    assert text.count("vb0[") == vertex_count * len(merged.buffer_elements)
+    assert text == legacy_text
@@ -0,0 +1,81 @@
+import threading
+
+import pytest
+
+from gui_collect.backend.utils import deletion_service
+from gui_collect.backend.utils.deletion_service import DeletionService, TRASH_DIR_NAME
+
+
+class TrackedDeletionService(DeletionService):
+    """
+    Keeps the deletion threads, so that tests can wait for them
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.threads: list[threading.Thread] = []
+
+    def start_deletion(self, trashed_path, original_path):
+        thread = super().start_deletion(trashed_path, original_path)
+        self.threads.append(thread)
+        return thread
+
+    def join(self):
+        for thread in self.threads:
+            thread.join()
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(DeletionService, "_DeletionService__instance", None)
+    monkeypatch.setattr(deletion_service, "DELETION_BATCH_SIZE", 4)
+    service = TrackedDeletionService()
+    yield service
+    service.join()
+    service.executor.shutdown()
+
+
+def create_folder(path, file_count: int):
+    (path / "sub").mkdir(parents=True)
+    for i in range(file_count):
+        (path / "file{}".format(i)).write_bytes(b"x")
+        (path / "sub" / "file{}".format(i)).write_bytes(b"x")
+
+
+def test_concurrent_deletions_share_the_trash(tmp_path, monkeypatch, service):
+    def rmtree(path):
+        raise AssertionError("{} wasn't moved to the trash".format(path))
+
+    monkeypatch.setattr(deletion_service.shutil, "rmtree", rmtree)
+    paths = [tmp_path / "FrameAnalysis-{}".format(i) for i in range(40)]
+    for path in paths:
+        create_folder(path, 10)
+
+    # Deletions keep being queued while earlier ones finish and release the
+    # trash folder, none of them may find it removed from under them
+    callers = [
+        threading.Thread(
+            target=lambda paths: [service.delete(path) for path in paths],
+            args=[paths[i::4]],
+        )
+        for i in range(4)
+    ]
+    for caller in callers:
+        caller.start()
+    for caller in callers:
+        caller.join()
+    assert not any(path.exists() for path in paths)
+
+    service.join()
+    assert list(tmp_path.iterdir()) == []
+    assert service.trash_users == {}
+
+
+def test_reclaim_trash(tmp_path, service):
+    trash_path = tmp_path / TRASH_DIR_NAME
+    create_folder(trash_path / "FrameAnalysis.abcd1234" / "FrameAnalysis", 10)
+    create_folder(trash_path / "FrameAnalysis-old.1234abcd", 3)
+
+    service.reclaim_trash([tmp_path, tmp_path / "missing"])
+    service.join()
+    assert not trash_path.exists()
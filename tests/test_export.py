@@ -0,0 +1,303 @@
+import json
+import time
+import random
+
+import pytest
+
+from gui_collect.backend.analysis.FrameAnalysis import FrameAnalysis
+from gui_collect.backend.analysis.structs import Component, Texture
+from gui_collect.backend.config.structs import ConfigData
+from gui_collect.backend.utils.file_utils import (
+    EXPORT_MANIFEST_NAME,
+    EXPORT_MANIFEST_VERSION,
+    FileExporter,
+)
+
+
+EXPORT_NAME = "Model"
+VERTEX_COUNT = 300
+PART_COUNT = 3
+COMPONENT_OPTIONS = {
+    "collect_model_data": True,
+    "collect_model_hashes": True,
+    "collect_texture_data": True,
+    "collect_texture_hashes": True,
+}
+
+
+def generate_component(path, name: str, seed: int):
+    """
+    Writes the position, blend and text IB dumps of a component of
+    PART_COUNT parts, along with a diffuse and normal map texture per part.
+    Returns the component and its textures.
+    """
+    r = random.Random(seed)
+    draw_hash = "{:08x}".format(r.getrandbits(32))
+    ib_hash = "{:08x}".format(r.getrandbits(32))
+
+    position_path = path / "{:06}-vb0={}.buf".format(seed, draw_hash)
+    position_path.write_bytes(r.randbytes(40 * VERTEX_COUNT))
+    blend_path = path / "{:06}-vb1={}.buf".format(seed, draw_hash)
+    blend_path.write_bytes(r.randbytes(32 * VERTEX_COUNT))
+
+    component = Component(
+        name=name,
+        options=COMPONENT_OPTIONS,
+        position_path=position_path,
+        blend_path=blend_path,
+        backup_texcoord_paths=[],
+        ib_hash=ib_hash,
+        draw_hash=draw_hash,
+        position_hash=draw_hash,
+        object_classification=["A", "B", "C"],
+    )
+    textures = {}
+    for i in range(PART_COUNT):
+        ib_path = path / "{:06}-ib={}-{}.txt".format(seed, ib_hash, i)
+        with open(ib_path, "w") as f:
+            f.write("byte offset: 0\nfirst index: {}\n".format(i * 30))
+            f.write("index count: 30\ntopology: trianglelist\n")
+            f.write("format: DXGI_FORMAT_R16_UINT\n\n")
+            for _ in range(10):
+                f.write(" ".join(str(r.randrange(VERTEX_COUNT)) for _ in range(3)))
+                f.write("\n")
+        component.ib_paths.append(ib_path)
+        component.object_indices.append(i * 30)
+        component.object_indices_counts.append(30)
+
+        textures[i * 30] = []
+        for slot, texture_type in enumerate(["Diffuse", "NormalMap"]):
+            texture_hash = "{:08x}".format(r.getrandbits(32))
+            texture_path = path / "{:06}-ps-t{}={}.dds".format(seed, slot, texture_hash)
+            texture_path.write_bytes(r.randbytes(r.randint(100, 5000)))
+            texture = Texture(
+                texture_path,
+                texture_slot=str(slot),
+                texture_hash=texture_hash,
+                contamination="",
+                extension="dds",
+                bleed=False,
+            )
+            textures[i * 30].append((texture, texture_type))
+
+    return component, textures
+
+
+def create_frame_analysis(tmp_path, export_workers=1, **game_options):
+    """
+    Returns a FrameAnalysis of an empty frame analysis folder, exporting to
+    tmp_path/_Extracted with the given game options. Skips __init__, which
+    reads log.txt.
+    """
+    frame_analysis = FrameAnalysis.__new__(FrameAnalysis)
+    frame_analysis.path = tmp_path / "FrameAnalysis"
+    frame_analysis.path.mkdir(parents=True, exist_ok=True)
+    frame_analysis.file_exporter = FileExporter()
+
+    cfg = ConfigData(export_workers=export_workers)
+    cfg.game["zzz"].extract_path = str(tmp_path / "_Extracted")
+    cfg.game["zzz"].game_options.open_extract_folder = False
+    for option, value in game_options.items():
+        setattr(cfg.game["zzz"].game_options, option, value)
+    frame_analysis.cfg = cfg
+    return frame_analysis
+
+
+def export(frame_analysis: FrameAnalysis, components, textures, monkeypatch):
+    """
+    Exports the components and returns the method each file was exported with
+    """
+    methods = {}
+    count_method = FileExporter.count_method
+
+    def record_method(self, dst_path, method):
+        methods[dst_path.name] = method
+        return count_method(self, dst_path, method)
+
+    monkeypatch.setattr(FileExporter, "count_method", record_method)
+    frame_analysis.export(EXPORT_NAME, components, textures, game="zzz")
+    monkeypatch.setattr(FileExporter, "count_method", count_method)
+    return methods
+
+
+def get_stats(extract_path):
+    return {
+        path.name: (path.stat().st_mtime_ns, path.read_bytes())
+        for path in extract_path.iterdir()
+    }
+
+
+@pytest.fixture
+def frame_analysis(tmp_path):
+    return create_frame_analysis(tmp_path, incremental_export=True)
+
+
+@pytest.fixture
+def exported(frame_analysis, monkeypatch):
+    """
+    Body and Hair components, exported once incrementally
+    """
+    components, textures = [], []
+    for seed, name in enumerate(["Body", "Hair"]):
+        component, component_textures = generate_component(
+            frame_analysis.path, name, seed
+        )
+        components.append(component)
+        textures.append(component_textures)
+
+    methods = export(frame_analysis, components, textures, monkeypatch)
+    assert "unchanged" not in methods.values()
+    return components, textures
+
+
+def test_reexport_only_touches_changed_texture(
+    tmp_path, frame_analysis, exported, monkeypatch
+):
+    components, textures = exported
+    extract_path = tmp_path / "_Extracted" / EXPORT_NAME
+    stats = get_stats(extract_path)
+
+    texture, _ = textures[1][30][0]
+    texture.path.write_bytes(b"changed")
+
+    methods = export(frame_analysis, components, textures, monkeypatch)
+    touched = {name for name, method in methods.items() if method != "unchanged"}
+    assert touched == {"ModelHairBDiffuse.dds", "hash.json"}
+    assert (extract_path / "ModelHairBDiffuse.dds").read_bytes() == b"changed"
+
+    new_stats = get_stats(extract_path)
+    assert new_stats.keys() == stats.keys()
+    for name, stat in stats.items():
+        if name not in touched and name != EXPORT_MANIFEST_NAME:
+            assert new_stats[name] == stat, name
+
+
+@pytest.mark.parametrize("clean_extract_folder", [False, True])
+def test_remove_stale_files(
+    tmp_path, frame_analysis, exported, monkeypatch, clean_extract_folder
+):
+    components, textures = exported
+    extract_path = tmp_path / "_Extracted" / EXPORT_NAME
+    (extract_path / "notes.txt").write_text("Not exported")
+    body_names = {path.name for path in extract_path.iterdir() if "Body" in path.name}
+    assert len(body_names) == PART_COUNT * 4
+
+    frame_analysis.cfg.game["zzz"].game_options.clean_extract_folder = (
+        clean_extract_folder
+    )
+    export(frame_analysis, components[:1], textures[:1], monkeypatch)
+
+    # Only the previous export's outputs are stale, unless the folder is cleaned
+    expected_names = body_names | {"hash.json", EXPORT_MANIFEST_NAME}
+    if not clean_extract_folder:
+        expected_names.add("notes.txt")
+    assert {path.name for path in extract_path.iterdir()} == expected_names
+
+
+def modify_output(extract_path):
+    (vb0_path,) = extract_path.glob("ModelBodyA-vb0=*.txt")
+    with open(vb0_path, "ab") as f:
+        f.write(b"edited\n")
+
+
+def corrupt_manifest(extract_path):
+    manifest_path = extract_path / EXPORT_MANIFEST_NAME
+    manifest_path.write_bytes(manifest_path.read_bytes()[:100])
+
+
+def downgrade_manifest(extract_path):
+    manifest_path = extract_path / EXPORT_MANIFEST_NAME
+    manifest = json.loads(manifest_path.read_text())
+    manifest["version"] = EXPORT_MANIFEST_VERSION - 1
+    manifest_path.write_text(json.dumps(manifest))
+
+
+@pytest.mark.parametrize(
+    "change, rewritten_count",
+    [(modify_output, 1), (corrupt_manifest, None), (downgrade_manifest, None)],
+)
+def test_rewrite(
+    tmp_path, frame_analysis, exported, monkeypatch, change, rewritten_count
+):
+    """
+    A modified output is rewritten. Without a valid manifest
+    of the current version, every output is rewritten.
+    """
+    components, textures = exported
+    extract_path = tmp_path / "_Extracted" / EXPORT_NAME
+    stats = get_stats(extract_path)
+
+    change(extract_path)
+    methods = export(frame_analysis, components, textures, monkeypatch)
+
+    rewritten = [
+        name
+        for name, method in methods.items()
+        if method != "unchanged" and name != "hash.json"
+    ]
+    assert len(rewritten) == (rewritten_count or len(methods) - 1)
+    # The outputs are back to what the first export wrote
+    new_stats = get_stats(extract_path)
+    for name, (_, data) in stats.items():
+        if name != EXPORT_MANIFEST_NAME:
+            assert new_stats[name][1] == data, name
+
+    # and the next export finds all of them unchanged again
+    methods = export(frame_analysis, components, textures, monkeypatch)
+    assert {
+        name for name, method in methods.items() if method != "unchanged"
+    } == {"hash.json"}
+
+
+@pytest.mark.parametrize("export_workers", [4, 8])
+def test_concurrent_export_matches_sequential(tmp_path, export_workers):
+    """
+    Components sharing a name write the same files, which hold those of the
+    last one either way. Earlier components are slowed down, so that they
+    would finish last if they weren't exported in order.
+    """
+    sequential = create_frame_analysis(tmp_path / "sequential")
+    concurrent = create_frame_analysis(
+        tmp_path / "concurrent", export_workers=export_workers
+    )
+
+    components, textures = [], []
+    for seed, name in enumerate(["Body", "Hair", "Body", "Face", "Hair", "Body"]):
+        component, component_textures = generate_component(
+            sequential.path, name, seed
+        )
+        if same_name_components := [c for c in components if c.name == name]:
+            component.ib_hash = same_name_components[0].ib_hash
+            component.draw_hash = component.position_hash = (
+                same_name_components[0].draw_hash
+            )
+        components.append(component)
+        textures.append(component_textures)
+
+    def slowed_down(export_component):
+        def slow_export_component(export_name, extract_path, component, *args):
+            i = next(i for i, c in enumerate(components) if c is component)
+            time.sleep(0.01 * (len(components) - i))
+            export_component(export_name, extract_path, component, *args)
+
+        return slow_export_component
+
+    for method in ["export_component_model", "export_component_textures"]:
+        setattr(concurrent, method, slowed_down(getattr(concurrent, method)))
+
+    sequential.export(EXPORT_NAME, components, textures, game="zzz")
+    concurrent.export(EXPORT_NAME, components, textures, game="zzz")
+
+    sequential_path = tmp_path / "sequential" / "_Extracted" / EXPORT_NAME
+    concurrent_path = tmp_path / "concurrent" / "_Extracted" / EXPORT_NAME
+    sequential_files = {p.name: p.read_bytes() for p in sequential_path.iterdir()}
+    concurrent_files = {p.name: p.read_bytes() for p in concurrent_path.iterdir()}
+    assert len(sequential_files) == 3 * PART_COUNT * 4 + 1
+    assert concurrent_files.keys() == sequential_files.keys()
+    for name, data in sequential_files.items():
+        assert concurrent_files[name] == data, name
+
+    texture, _ = textures[5][0][0]
+    assert sequential_files["ModelBodyADiffuse.dds"] == texture.path.read_bytes()
+    hash_json = json.loads(sequential_files["hash.json"])
+    assert [c["component_name"] for c in hash_json] == [c.name for c in components]
@@ -0,0 +1,128 @@
+import os
+
+import pytest
+
+from gui_collect.backend.analysis.FrameAnalysis import _export_component_buffers
+from gui_collect.backend.utils import file_utils
+from gui_collect.backend.utils.buffer_utils.buffer_encoder import merge_buffers
+from gui_collect.backend.utils.file_utils import FileExporter
+
+from .test_buffer_encoder import make_buffer
+from .test_index_buffers import IB_HASH, VERTEX_COUNT, write_frame_analysis_ibs
+
+
+@pytest.fixture
+def src_path(tmp_path):
+    src_path = tmp_path / "source.dds"
+    src_path.write_bytes(bytes(range(256)) * 16)
+    return src_path
+
+
+def fail_link(src, dst):
+    raise OSError("Cross-device link")
+
+
+def test_hardlink_on_the_same_volume(tmp_path, src_path):
+    dst_path = tmp_path / "Texture.dds"
+    exporter = FileExporter(link=True)
+
+    assert exporter.export_file(src_path, dst_path) == "hardlink"
+    assert dst_path.samefile(src_path)
+    assert dst_path.stat().st_nlink == 2
+    assert exporter.get_summary() == "1 hardlink"
+
+
+def test_copy_without_link(tmp_path, src_path):
+    dst_path = tmp_path / "Texture.dds"
+    exporter = FileExporter()
+
+    assert exporter.export_file(src_path, dst_path) == "copy"
+    assert not dst_path.samefile(src_path)
+    assert dst_path.read_bytes() == src_path.read_bytes()
+
+
+def test_clone_when_hardlinking_fails(tmp_path, monkeypatch, src_path):
+    monkeypatch.setattr(file_utils.os, "link", fail_link)
+    dst_path = tmp_path / "Texture.dds"
+    exporter = FileExporter(link=True)
+
+    # Whichever of the clones the filesystem supports, or a copy
+    method = exporter.export_file(src_path, dst_path)
+    assert method in ["reflink", "copy_file_range", "copy"]
+    assert not dst_path.samefile(src_path)
+    assert dst_path.stat().st_nlink == 1
+    assert dst_path.read_bytes() == src_path.read_bytes()
+    assert exporter.methods == {method: 1}
+
+
+def test_copy_when_nothing_else_is_supported(tmp_path, monkeypatch, src_path):
+    monkeypatch.setattr(file_utils.os, "link", fail_link)
+    monkeypatch.setattr(file_utils, "fcntl", None)
+    monkeypatch.delattr(file_utils.os, "copy_file_range", raising=False)
+    dst_path = tmp_path / "Texture.dds"
+    exporter = FileExporter(link=True)
+
+    assert exporter.export_file(src_path, dst_path) == "copy"
+    assert not dst_path.samefile(src_path)
+    assert dst_path.read_bytes() == src_path.read_bytes()
+
+
+@pytest.mark.parametrize("link", [False, True])
+def test_existing_link_is_replaced(tmp_path, src_path, link):
+    """
+    Exporting again over a link left by a previous export
+    must not write through it into the frame analysis
+    """
+    src_data = src_path.read_bytes()
+    dst_path = tmp_path / "Texture.dds"
+    os.link(src_path, dst_path)
+
+    other_path = tmp_path / "other.dds"
+    other_path.write_bytes(b"other")
+    FileExporter(link=link).export_file(other_path, dst_path)
+    assert dst_path.read_bytes() == b"other"
+    assert src_path.read_bytes() == src_data
+
+    os.unlink(dst_path)
+    os.link(src_path, dst_path)
+    FileExporter(link=link).write_file(dst_path, None, lambda f: f.write(b"written"))
+    assert dst_path.read_bytes() == b"written"
+    assert src_path.read_bytes() == src_data
+
+
+def test_vb0_parts_are_placed_from_the_written_file(tmp_path):
+    frame_analysis_path = tmp_path / "FrameAnalysis"
+    frame_analysis_path.mkdir()
+    component = write_frame_analysis_ibs(
+        frame_analysis_path,
+        "DXGI_FORMAT_R16_UINT",
+        "trianglelist",
+        [(0, 0, 30), (0, 30, 30), (0, 60, 30)],
+    )
+    export_path = tmp_path / "export"
+    export_path.mkdir()
+    buffer, elements = make_buffer(
+        tmp_path, "position", ["R32G32B32_FLOAT"], VERTEX_COUNT
+    )
+
+    exporter = FileExporter(link=True)
+    _export_component_buffers(
+        "Model",
+        export_path,
+        component,
+        merge_buffers([buffer], [elements]),
+        exporter,
+        None,
+    )
+
+    vb0_paths = [
+        export_path / "ModelBody{}-vb0={}.txt".format(c, component.draw_hash)
+        for c in component.object_classification
+    ]
+    assert all(vb0_path.samefile(vb0_paths[0]) for vb0_path in vb0_paths[1:])
+    assert vb0_paths[0].stat().st_nlink == 3
+    for c in component.object_classification:
+        assert (export_path / "ModelBody{}-ib={}.txt".format(c, IB_HASH)).exists()
+    # One vb0 and every part's IB written, the other vb0 linked
+    assert exporter.methods == {"write": 4, "hardlink": 2}
+    assert exporter.get_summary() == "4 write, 2 hardlink"
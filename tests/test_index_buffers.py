@@ -0,0 +1,134 @@
+import random
+import struct
+
+import pytest
+
+from gui_collect.backend.analysis.FrameAnalysis import (
+    _IndexBuffers,
+    _export_component_buffers,
+)
+from gui_collect.backend.analysis.structs import Component
+from gui_collect.backend.utils.buffer_utils.buffer_encoder import merge_buffers
+from gui_collect.backend.utils.file_utils import FileExporter
+
+from .test_buffer_encoder import make_buffer
+
+
+IB_HASH = "abcd1234"
+VERTEX_COUNT = 1000
+
+INDEX_STRUCT_CODES = {"DXGI_FORMAT_R16_UINT": "H", "DXGI_FORMAT_R32_UINT": "I"}
+
+
+def write_frame_analysis_ibs(
+    path, ib_format: str, topology: str, parts: list[tuple[int, int, int]], seed=0
+):
+    """
+    Writes the binary IB 3dmigoto dumps for the first part, and the text IB
+    it dumps for every part, given as (byte offset, first index, index count).
+    The text IB holds the indices the draw reads, past the byte offset the IB
+    is bound at and the first index. Returns the component of the parts.
+    """
+    r = random.Random(seed)
+    struct_code = INDEX_STRUCT_CODES.get(ib_format, "H")
+    index_byte_width = struct.calcsize(struct_code)
+    index_count = max([
+        byte_offset // index_byte_width + first_index + count
+        for byte_offset, first_index, count in parts
+    ])
+    indices = [r.randrange(VERTEX_COUNT) for _ in range(index_count)]
+
+    component = Component(name="Body", ib_hash=IB_HASH, draw_hash="ffff0000")
+    for i, (byte_offset, first_index, count) in enumerate(parts):
+        ib_path = path / "{:06}-ib={}.txt".format(i + 1, IB_HASH)
+        if i == 0:
+            ib_path.with_suffix(".buf").write_bytes(
+                struct.pack("<{}{}".format(index_count, struct_code), *indices)
+            )
+
+        start = byte_offset // index_byte_width + first_index
+        part_indices = indices[start : start + count]
+        line_size = {"pointlist": 1, "linelist": 2}.get(topology, 3)
+        # Text mode, like 3dmigoto writes it
+        with open(ib_path, "w") as f:
+            f.write("byte offset: {}\n".format(byte_offset))
+            f.write("first index: {}\n".format(first_index))
+            f.write("index count: {}\n".format(count))
+            f.write("topology: {}\n".format(topology))
+            f.write("format: {}\n".format(ib_format))
+            f.write("\n")
+            for j in range(0, count, line_size):
+                f.write(" ".join(map(str, part_indices[j : j + line_size])) + "\n")
+
+        component.ib_paths.append(ib_path)
+        component.object_indices.append(first_index)
+        component.object_indices_counts.append(count)
+        component.object_classification.append("ABCDEFGH"[i])
+
+    return component
+
+
+def export_ibs(tmp_path, component: Component):
+    export_path = tmp_path / "export"
+    export_path.mkdir()
+    buffer, elements = make_buffer(
+        tmp_path, "position", ["R32G32B32_FLOAT"], VERTEX_COUNT
+    )
+    _export_component_buffers(
+        "Model",
+        export_path,
+        component,
+        merge_buffers([buffer], [elements]),
+        FileExporter(),
+        None,
+    )
+    return [
+        export_path / "ModelBody{}-ib={}.txt".format(c, IB_HASH)
+        for c in component.object_classification
+    ]
+
+
+@pytest.mark.parametrize(
+    "ib_format, topology, parts",
+    [
+        ("DXGI_FORMAT_R16_UINT", "trianglelist", [(0, 0, 300), (0, 300, 600)]),
+        # Bound past the start of the IB, at a byte offset
+        ("DXGI_FORMAT_R16_UINT", "trianglelist", [(600, 0, 300), (600, 450, 150)]),
+        ("DXGI_FORMAT_R32_UINT", "trianglelist", [(1200, 30, 300), (0, 0, 9)]),
+        ("DXGI_FORMAT_R32_UINT", "linelist", [(8, 2, 100)]),
+    ],
+)
+def test_regenerated_text_ib_matches_frame_analysis(
+    tmp_path, ib_format, topology, parts
+):
+    frame_analysis_path = tmp_path / "FrameAnalysis"
+    frame_analysis_path.mkdir()
+    component = write_frame_analysis_ibs(
+        frame_analysis_path, ib_format, topology, parts
+    )
+    assert _IndexBuffers(component, VERTEX_COUNT).binary_path is not None
+
+    exported_paths = export_ibs(tmp_path, component)
+    for ib_path, exported_path in zip(component.ib_paths, exported_paths):
+        assert exported_path.read_bytes() == ib_path.read_bytes()
+
+
+@pytest.mark.parametrize(
+    "ib_format, topology",
+    [
+        ("DXGI_FORMAT_R16_UINT", "trianglestrip"),
+        ("DXGI_FORMAT_R8_UINT", "trianglelist"),
+        ("DXGI_FORMAT_UNKNOWN", "trianglelist"),
+    ],
+)
+def test_unhandled_text_ib_is_copied(tmp_path, ib_format, topology):
+    frame_analysis_path = tmp_path / "FrameAnalysis"
+    frame_analysis_path.mkdir()
+    component = write_frame_analysis_ibs(
+        frame_analysis_path, ib_format, topology, [(0, 0, 30), (6, 3, 30)]
+    )
+    assert _IndexBuffers(component, VERTEX_COUNT).binary_path is None
+
+    exported_paths = export_ibs(tmp_path, component)
+    for ib_path, exported_path in zip(component.ib_paths, exported_paths):
+        assert exported_path.read_bytes() == ib_path.read_bytes()
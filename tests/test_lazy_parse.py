@@ -0,0 +1,150 @@
+import random
+
+import pytest
+
+from gui_collect.backend.analysis import LogAnalysis as log_analysis_module
+from gui_collect.backend.analysis import log_cache, log_parser
+from gui_collect.backend.analysis.LogAnalysis import analyze_log_data
+from gui_collect.backend.analysis.log_parser import (
+    get_followed_hashes,
+    parse_log_file,
+    parse_log_file_lazy,
+)
+from gui_collect.backend.analysis.structs import Component
+from gui_collect.backend.utils.buffer_utils.structs import BufferType
+
+from .log_generator import generate_log
+from .test_pipeline_state import create_log_analysis
+
+
+DRAW_ID_QUERIES = [
+    "get_vertex_shader_hash",
+    "get_pixel_shader_hash",
+    "get_compute_shader_hash",
+    "get_ib_hash",
+]
+
+
+def call(method, *args):
+    try:
+        return method(*args)
+    except Exception as e:
+        return type(e)
+
+
+def get_reachable_hashes(log_data: dict, target_hashes: list[str]):
+    bound_by = {}
+    for draw_id, draw_call in log_data.items():
+        for resource_hash in get_followed_hashes(draw_call):
+            bound_by.setdefault(resource_hash, []).append(draw_id)
+
+    reachable, pending = set(), list(target_hashes)
+    while pending:
+        if (resource_hash := pending.pop()) in reachable:
+            continue
+        reachable.add(resource_hash)
+        for draw_id in bound_by.get(resource_hash, []):
+            pending.extend(get_followed_hashes(log_data[draw_id]))
+    return sorted(reachable)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_lazy_parse_matches_full_parse(tmp_path, monkeypatch, seed):
+    monkeypatch.setattr(log_parser, "LAZY_PARSE_MAX_COVERAGE", 1.0)
+    log_path = tmp_path / "log.txt"
+    resource_hashes = generate_log(
+        log_path, 1500, seed, crlf=bool(seed % 2), hash_count=3000
+    )
+    full_log_data = parse_log_file(log_path)
+    full = create_log_analysis(tmp_path, analyze_log_data(full_log_data))
+
+    r = random.Random(seed)
+    for _ in range(5):
+        target_hashes = r.sample(resource_hashes, r.choice([1, 2]))
+        lazy_log_data = parse_log_file_lazy(log_path, target_hashes)
+        assert lazy_log_data is not None
+        assert len(lazy_log_data) < len(full_log_data)
+        lazy = create_log_analysis(tmp_path, analyze_log_data(lazy_log_data))
+
+        for resource_hash in target_hashes:
+            assert call(lazy.guess_hash_type, resource_hash) == call(
+                full.guess_hash_type, resource_hash
+            )
+
+        reachable_hashes = get_reachable_hashes(full_log_data, target_hashes)
+        for resource_hash in reachable_hashes:
+            assert lazy.copy_graph.get_chain(resource_hash) == (
+                full.copy_graph.get_chain(resource_hash)
+            )
+            for buffer_type in [BufferType.IB, BufferType.Draw_VB, BufferType.Blend_VB]:
+                draw_ids = call(full.get_relevant_ids, resource_hash, buffer_type)
+                assert call(lazy.get_relevant_ids, resource_hash, buffer_type) == (
+                    draw_ids
+                )
+                for draw_id in draw_ids if isinstance(draw_ids, list) else []:
+                    for query in DRAW_ID_QUERIES:
+                        assert call(getattr(lazy, query), draw_id) == call(
+                            getattr(full, query), draw_id
+                        )
+
+            component = Component(
+                draw_hash=resource_hash,
+                texcoord_hash=r.choice(reachable_hashes),
+                draw_vb2_hash=r.choice(reachable_hashes),
+            )
+            for query in ["get_pose_id", "get_cs_pose_id"]:
+                assert call(getattr(lazy, query), component) == call(
+                    getattr(full, query), component
+                )
+
+
+def test_lazy_parse_falls_back_on_missing_followed_hash(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_parser, "LAZY_PARSE_MAX_COVERAGE", 1.0)
+    log_path = tmp_path / "log.txt"
+    resource_hashes = generate_log(log_path, 300, hash_count=1000)
+    target_hashes = resource_hashes[:1]
+    assert parse_log_file_lazy(log_path, target_hashes) is not None
+    # A target hash missing from the log is only an empty result
+    assert parse_log_file_lazy(log_path, ["ffffffff0"]) == {}
+
+    def get_followed_hashes_and_missing(draw_call):
+        yield from get_followed_hashes(draw_call)
+        yield "ffffffff0"
+
+    monkeypatch.setattr(
+        log_parser, "get_followed_hashes", get_followed_hashes_and_missing
+    )
+    assert parse_log_file_lazy(log_path, target_hashes) is None
+
+
+def test_lazy_parse_is_cached_by_target_hashes(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_parser, "LAZY_PARSE_MAX_COVERAGE", 1.0)
+    monkeypatch.setattr(log_analysis_module, "LAZY_PARSE_THRESHOLD", 0)
+    monkeypatch.setattr(log_cache, "LOG_CACHE_DIR", tmp_path / "cache")
+    log_path = tmp_path / "FrameAnalysis" / "log.txt"
+    log_path.parent.mkdir()
+    resource_hashes = generate_log(log_path, 300, hash_count=1000)
+
+    read_lazy = log_analysis_module.read_frame_analysis_log_file_lazy
+    parsed_log = read_lazy(log_path, resource_hashes[:2])
+    assert log_cache.get_cache_path(log_path, resource_hashes[:2]).exists()
+    assert not log_cache.get_cache_path(log_path, resource_hashes[:1]).exists()
+    assert not log_cache.has_cached_log(log_path)
+
+    def fail(*args):
+        raise AssertionError("lazy parse wasn't loaded from the cache")
+
+    monkeypatch.setattr(log_analysis_module, "parse_log_file_lazy", fail)
+    cached_log = read_lazy(log_path, resource_hashes[1::-1])
+    assert cached_log[0].keys() == parsed_log[0].keys()
+    assert {
+        draw_id: pipeline_state.ib_hash
+        for draw_id, pipeline_state in cached_log[1].items()
+    } == {
+        draw_id: pipeline_state.ib_hash
+        for draw_id, pipeline_state in parsed_log[1].items()
+    }
+
+    # The full analysis covers every target
+    log_analysis_module.read_frame_analysis_log_file(log_path)
+    assert read_lazy(log_path, resource_hashes[:2]) is None
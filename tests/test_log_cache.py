@@ -0,0 +1,97 @@
+import os
+
+import pytest
+
+from gui_collect.backend.analysis import LogAnalysis as log_analysis_module
+from gui_collect.backend.analysis import log_cache
+
+from .log_generator import generate_log
+
+
+@pytest.fixture
+def log_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_cache, "LOG_CACHE_DIR", tmp_path / "cache")
+    log_path = tmp_path / "FrameAnalysis" / "log.txt"
+    log_path.parent.mkdir()
+    generate_log(log_path, 300)
+    return log_path
+
+
+def truncate_cache(log_path, monkeypatch):
+    cache_path = log_cache.get_cache_path(log_path)
+    cache_path.write_bytes(cache_path.read_bytes()[: cache_path.stat().st_size // 2])
+
+
+def garble_cache(log_path, monkeypatch):
+    cache_path = log_cache.get_cache_path(log_path)
+    data = bytearray(cache_path.read_bytes())
+    data[log_cache.CACHE_HEADER.size :] = bytes(
+        b ^ 0x5A for b in data[log_cache.CACHE_HEADER.size :]
+    )
+    cache_path.write_bytes(data)
+
+
+def garble_cache_header(log_path, monkeypatch):
+    cache_path = log_cache.get_cache_path(log_path)
+    cache_path.write_bytes(b"\xff" * 7 + cache_path.read_bytes()[7:])
+
+
+def bump_parser_version(log_path, monkeypatch):
+    monkeypatch.setattr(
+        log_cache, "LOG_PARSER_VERSION", log_cache.LOG_PARSER_VERSION + 1
+    )
+
+
+def touch_log(log_path, monkeypatch):
+    st = log_path.stat()
+    os.utime(log_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def grow_log(log_path, monkeypatch):
+    st = log_path.stat()
+    with open(log_path, "ab") as f:
+        f.write(b"999999 Dispatch(ThreadGroupCountX:1)\n")
+    # Same mtime, only the size tells the log changed
+    os.utime(log_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        truncate_cache,
+        garble_cache,
+        garble_cache_header,
+        bump_parser_version,
+        touch_log,
+        grow_log,
+    ],
+)
+def test_stale_or_corrupt_cache_is_rebuilt(log_path, monkeypatch, change):
+    parse_count = 0
+    parse_frame_analysis_log_file = log_analysis_module.parse_frame_analysis_log_file
+
+    def count_parse(log_path):
+        nonlocal parse_count
+        parse_count += 1
+        return parse_frame_analysis_log_file(log_path)
+
+    monkeypatch.setattr(
+        log_analysis_module, "parse_frame_analysis_log_file", count_parse
+    )
+    read = log_analysis_module.read_frame_analysis_log_file
+
+    read(log_path)
+    assert parse_count == 1
+    read(log_path)
+    assert parse_count == 1
+
+    change(log_path, monkeypatch)
+    parsed_log = read(log_path)
+    assert parse_count == 2
+    assert repr(parsed_log[0]) == repr(parse_frame_analysis_log_file(log_path)[0])
+
+    # The cache is rewritten for the changed log and parser
+    assert log_cache.has_cached_log(log_path)
+    cached_log = read(log_path)
+    assert parse_count == 2
+    assert repr(cached_log[0]) == repr(parsed_log[0])
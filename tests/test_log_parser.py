@@ -0,0 +1,352 @@
+import re
+
+from pathlib import Path
+
+import pytest
+
+from gui_collect.backend.analysis.LogAnalysis import build_log_index
+from gui_collect.backend.analysis.log_parser import (
+    get_chunk_offsets,
+    parse_log_chunks,
+    parse_log_file,
+)
+from gui_collect.backend.analysis.pipeline_state import track_pipeline_state
+from gui_collect.backend.analysis.structs import (
+    BINDING_KEYWORD_ATTRIBUTES,
+    HASH_KEYWORD_ATTRIBUTES,
+)
+
+from .log_generator import generate_log
+
+
+# The line by line parser log.txt was read with before the byte-level parser,
+# kept as it was to check the new parser against
+LEGACY_LOG_TEXTURE_PATTERN = re.compile(
+    r"""
+    ^
+    \d{6}\ 3DMigoto\ Dumping\ Texture2D\ .*?FrameAnalysis-.*?\\
+    (?P<texture_filename>\d{6}-(?P<resource_prefix>ps-t|o)(?P<texture_slot>\d+)=(?P<contamination>!.!=)?(?P<texture_hash>[a-f0-9]{8}).*?\.(?P<extension>.{3}))
+    \ ->\ .*\\[a-f0-9]{8}-(?P<texture_format>.*)\..{3}
+    $
+    """,
+    flags=re.VERBOSE,
+)
+
+
+def legacy_parse_frame_analysis_log_file(log_path: Path):
+    log_data = {}
+
+    # "Guess" the encoding by attempting to read the log file
+    for encoding in ["UTF-8", "cp1252"]:
+        try:
+            log_path.read_text(encoding=encoding)
+            break
+        except UnicodeDecodeError as X:
+            continue
+    else:
+        return None
+
+    with open(log_path, "r", encoding=encoding) as log_file:
+        log_file.readline()  # skip first line
+
+        while line := log_file.readline():
+            if m := re.match(r"\d{6}", line):
+                draw_id = m.group()
+                if draw_id not in log_data:
+                    log_data[draw_id] = {}
+
+                    # Bleed some hashes into the previous ID
+                    if int(draw_id) > 1:
+                        prev_draw_id = "{:06}".format(int(draw_id) - 1)
+                        prev_prev_draw_id = "{:06}".format(int(draw_id) - 2)
+                        try:
+                            if (
+                                "DrawIndexedInstanced" in log_data[prev_draw_id]
+                                or "DrawIndexed" in log_data[prev_draw_id]
+                            ) and "IASetIndexBuffer" not in log_data[prev_draw_id]:
+                                log_data[prev_draw_id]["IASetIndexBuffer"] = log_data[
+                                    prev_prev_draw_id
+                                ]["IASetIndexBuffer"]
+                        except:
+                            pass
+
+                if line[7:15] == "3DMigoto":
+                    if m := LEGACY_LOG_TEXTURE_PATTERN.match(line):
+                        filepath = Path(
+                            log_path.parent, m.group("texture_filename")
+                        ).absolute()
+                        if m.group("resource_prefix") == "ps-t":
+                            if "textures" not in log_data[draw_id]:
+                                log_data[draw_id]["textures"] = {}
+                            log_data[draw_id]["textures"][str(filepath)] = {
+                                "texture_slot": m.group("texture_slot"),
+                                "texture_hash": m.group("texture_hash"),
+                                "texture_format": m.group("texture_format"),
+                                "contamination": m.group("contamination")[:-1]
+                                if m.group("contamination")
+                                else "",
+                                "extension": m.group("extension"),
+                                "bleed": (
+                                    True
+                                    if "PSSetShaderResources" not in log_data[draw_id]
+                                    else True
+                                    if m.group("texture_slot")
+                                    not in log_data[draw_id]["PSSetShaderResources"]
+                                    else m.group("texture_hash")
+                                    not in log_data[draw_id]["PSSetShaderResources"][
+                                        m.group("texture_slot")
+                                    ]
+                                ),
+                            }
+                        else:
+                            if "render_targets" not in log_data[draw_id]:
+                                log_data[draw_id]["render_targets"] = {}
+                            log_data[draw_id]["render_targets"][str(filepath)] = {
+                                "slot": m.group("texture_slot")
+                            }
+
+                    continue
+
+                keyword = line[7:].split("(", maxsplit=1)[0]
+                if keyword in [
+                    "IASetVertexBuffers",
+                    "SOSetTargets",
+                    "CSSetUnorderedAccessViews",
+                    "CSSetShaderResources",
+                    "CSSetConstantBuffers",
+                    "PSSetShaderResources",
+                ]:
+                    if keyword not in log_data[draw_id]:
+                        log_data[draw_id][keyword] = {}
+
+                    pos = log_file.tell()
+                    line = log_file.readline()
+                    while s := re.match(
+                        r"^\s*(.*):(?: view=0x.*?)? resource=.*? hash=(.*)$", line
+                    ):
+                        log_data[draw_id][keyword][s.group(1)] = s.group(2)
+                        pos = log_file.tell()
+                        line = log_file.readline()
+                    log_file.seek(pos)
+
+                elif keyword in ["CopyResource"]:
+                    if keyword not in log_data[draw_id]:
+                        log_data[draw_id][keyword] = []
+
+                    src_hash = log_file.readline().strip().split("hash=")[1]
+                    dst_hash = log_file.readline().strip().split("hash=")[1]
+                    log_data[draw_id][keyword].append((src_hash, dst_hash))
+
+                elif keyword in [
+                    "IASetIndexBuffer",
+                    "PSSetShader",
+                    "VSSetShader",
+                    "CSSetShader",
+                ]:
+                    hash_match = re.search(r"hash=([a-f0-9]+)", line)
+                    if not hash_match:
+                        continue
+                    log_data[draw_id][keyword] = hash_match.group(1)
+
+                elif keyword in ["DrawIndexedInstanced", "DrawIndexed"]:
+                    args = re.findall(
+                        r"\b([a-z]+):(.+?\b)",
+                        line.split("(")[1].split(")")[0],
+                        flags=re.IGNORECASE,
+                    )
+                    assert keyword not in log_data[draw_id]
+                    log_data[draw_id][keyword] = {arg[0]: arg[1] for arg in args}
+
+                elif keyword in ["DrawIndexedInstancedIndirect"]:
+                    log_data[draw_id] = {}
+
+                elif keyword in ["ClearRenderTargetView"]:
+                    log_data[draw_id] = {}
+
+            else:
+                continue
+
+    return log_data
+
+
+def from_legacy_log_data(legacy_log_data: dict):
+    """
+    The legacy parse results in the layout of DrawCall.to_draw_data. Only the
+    index count and first index of the draw arguments are kept, and textures
+    are keyed by their path relative to the frame analysis folder.
+    """
+    log_data = {}
+    for draw_id, legacy_draw_data in legacy_log_data.items():
+        draw_data = {}
+        for keyword, value in legacy_draw_data.items():
+            if keyword == "DrawIndexedInstanced":
+                value = (
+                    int(value["IndexCountPerInstance"]),
+                    int(value["StartIndexLocation"]),
+                )
+            elif keyword == "DrawIndexed":
+                value = (int(value["IndexCount"]), int(value["StartIndexLocation"]))
+            elif keyword == "textures":
+                value = {
+                    Path(path).name: tuple(texture.values())
+                    for path, texture in value.items()
+                }
+            elif keyword == "render_targets":
+                value = {Path(path).name: slot["slot"] for path, slot in value.items()}
+            draw_data[keyword] = value
+        log_data[int(draw_id)] = draw_data
+    return log_data
+
+
+def to_comparable_log_data(log_data: dict):
+    comparable_log_data = {}
+    for draw_id, draw_call in log_data.items():
+        draw_data = {}
+        for keyword in [
+            *HASH_KEYWORD_ATTRIBUTES,
+            *BINDING_KEYWORD_ATTRIBUTES,
+            "CopyResource",
+        ]:
+            if keyword in draw_call:
+                draw_data[keyword] = draw_call[keyword]
+        if draw_call.draw is not None:
+            draw_data[draw_call.draw] = (draw_call.index_count, draw_call.first_index)
+        if draw_call.textures is not None:
+            draw_data["textures"] = {t.filename: tuple(t[1:]) for t in draw_call.textures}
+        if draw_call.render_targets is not None:
+            draw_data["render_targets"] = dict(
+                zip(draw_call.render_targets[1::2], draw_call.render_targets[::2])
+            )
+        comparable_log_data[draw_id] = draw_data
+    return comparable_log_data
+
+
+def scan_bound_index_buffers(log_path: Path):
+    """
+    The index buffer left bound after the lines of each draw id, read straight
+    off the IASetIndexBuffer lines. Resets don't unbind it, unbinding it does.
+    """
+    bound_ibs = {}
+    ib_hash = None
+    with open(log_path, "rb") as log_file:
+        log_file.readline()  # skip first line
+        for line in log_file:
+            if not line[:6].isdigit():
+                continue
+            if line[6:24] == b" IASetIndexBuffer(":
+                m = re.search(rb"hash=([a-f0-9]+)", line)
+                ib_hash = m.group(1).decode("ascii") if m else None
+            bound_ibs[int(line[:6])] = ib_hash
+    return bound_ibs
+
+
+def assert_matches_legacy(log_path: Path, log_data: dict):
+    """
+    The legacy parser copied the index buffer of indexed draw calls that
+    didn't bind one from the draw id two before them. The new parser leaves
+    that to the pipeline state, which has to agree wherever the copy was right.
+    The copy was wrong if the draw id in between unbound the index buffer, or
+    bound another one and then reset.
+
+    Every draw id indexed at an index buffer must bind it itself,
+    or really have it bound when it is issued.
+    """
+    expected = from_legacy_log_data(legacy_parse_frame_analysis_log_file(log_path))
+    actual = to_comparable_log_data(log_data)
+    pipeline_states = track_pipeline_state(log_data)
+    bound_ibs = scan_bound_index_buffers(log_path)
+
+    bleed_count = 0
+    for draw_id, draw_data in expected.items():
+        if "IASetIndexBuffer" in draw_data and log_data[draw_id].ib_hash is None:
+            if draw_data.pop("IASetIndexBuffer") == bound_ibs[draw_id]:
+                bleed_count += 1
+
+    assert list(actual) == list(expected)
+    assert actual == expected
+
+    for draw_id in log_data:
+        assert pipeline_states[draw_id].ib_hash == bound_ibs[draw_id]
+
+    log_index = build_log_index(log_data, pipeline_states)
+    ib_hashes = {draw_call.ib_hash for draw_call in log_data.values()}
+    for ib_hash in ib_hashes | set(bound_ibs.values()):
+        for draw_id in log_index.get_ids("IASetIndexBuffer", ib_hash):
+            draw_call = log_data[int(draw_id)]
+            assert ib_hash == draw_call.ib_hash or (
+                draw_call.draw is not None and ib_hash == bound_ibs[draw_call.id]
+            )
+
+    return bleed_count
+
+
+@pytest.mark.parametrize(
+    "seed, crlf, non_ascii, encoding",
+    [
+        (0, False, False, "utf-8"),
+        (1, True, False, "utf-8"),
+        (2, False, True, "utf-8"),
+        (3, True, True, "utf-8"),
+        (4, False, True, "cp1252"),
+        (5, True, True, "cp1252"),
+    ],
+)
+def test_parse_log_file_matches_legacy_parser(tmp_path, seed, crlf, non_ascii, encoding):
+    log_path = tmp_path / "log.txt"
+    generate_log(
+        log_path, 3000, seed, crlf=crlf, non_ascii=non_ascii, encoding=encoding
+    )
+
+    bleed_count = assert_matches_legacy(log_path, parse_log_file(log_path))
+    assert bleed_count > 0
+
+
+def test_parse_log_chunks_matches_single_pass(tmp_path):
+    log_path = tmp_path / "log.txt"
+    generate_log(log_path, 3000, 6, crlf=True, non_ascii=True)
+
+    with open(log_path, "rb") as f:
+        data = f.read()
+    offsets = get_chunk_offsets(data, data.find(b"\n") + 1, 4)
+    assert len(offsets) == 5
+
+    log_data = parse_log_chunks(log_path, offsets, "UTF-8")
+    assert repr(log_data) == repr(parse_log_file(log_path))
+    assert_matches_legacy(log_path, log_data)
+
+
+def test_parse_log_file_resets(tmp_path):
+    log_path = tmp_path / "log.txt"
+    log_path.write_text(
+        "\n".join([
+            "analyse_options: 00000000",
+            "000001 IASetIndexBuffer(pIndexBuffer:0x1, Format:57, Offset:0) hash=aaaaaaaa",
+            "000001 VSSetShader(pVertexShader:0x1) hash=1111111111111111",
+            "000001 DrawIndexedInstancedIndirect(pBufferForArgs:0x1, AlignedByteOffsetForArgs:0)",
+            "000001 PSSetShader(pPixelShader:0x1) hash=2222222222222222",
+            "000002 IASetIndexBuffer(pIndexBuffer:0x1, Format:57, Offset:0) hash=bbbbbbbb",
+            "000002 ClearRenderTargetView(pRenderTargetView:0x1, ColorRGBA:0x1)",
+            "000002 DrawIndexed(IndexCount:3, StartIndexLocation:6, BaseVertexLocation:0)",
+            "",
+        ])
+    )
+
+    log_data = parse_log_file(log_path)
+    assert_matches_legacy(log_path, log_data)
+    assert log_data[1].to_draw_data() == {
+        "PSSetShader": "2222222222222222",
+        "ib_binding": "aaaaaaaa",
+    }
+    assert log_data[2].ib_hash is None
+    assert log_data[2].ib_binding == "bbbbbbbb"
+    assert (log_data[2].index_count, log_data[2].first_index) == (3, 6)
+
+
+def test_parse_log_file_empty_and_undecodable(tmp_path):
+    log_path = tmp_path / "log.txt"
+    log_path.write_bytes(b"")
+    assert parse_log_file(log_path) == legacy_parse_frame_analysis_log_file(log_path) == {}
+
+    log_path.write_bytes(b"analyse_options: 00000000\n000001 \x81\x8d\x90\n")
+    assert parse_log_file(log_path) is None
+    assert legacy_parse_frame_analysis_log_file(log_path) is None
@@ -0,0 +1,80 @@
+import random
+
+import pytest
+
+from gui_collect.backend.analysis import log_cache, log_tailer
+from gui_collect.backend.analysis.log_parser import parse_log_file
+from gui_collect.backend.analysis.log_tailer import LogTailer
+
+from .log_generator import generate_log
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_cache, "LOG_CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr(log_tailer, "LOG_TAIL_READ_SIZE", 1 << 12)
+
+
+def append_in_random_sizes(tailer: LogTailer, log_path, data: bytes, seed: int):
+    r = random.Random(seed)
+    offset = 0
+    with open(log_path, "ab") as f:
+        while offset < len(data):
+            size = r.choice([1, r.randint(1, 100), r.randint(1, 20000)])
+            f.write(data[offset : offset + size])
+            f.flush()
+            offset += size
+            if r.random() < 0.5:
+                tailer.poll()
+
+
+@pytest.mark.parametrize(
+    "seed, crlf, non_ascii", [(0, False, False), (1, True, False), (2, False, True)]
+)
+def test_tailed_log_matches_parse_log_file(
+    tmp_path, monkeypatch, seed, crlf, non_ascii
+):
+    source_path = tmp_path / "source.txt"
+    generate_log(source_path, 400, seed, crlf=crlf, non_ascii=non_ascii)
+    log_path = tmp_path / "FrameAnalysis" / "log.txt"
+    log_path.parent.mkdir()
+    log_path.write_bytes(b"")
+
+    tailer = LogTailer(log_path)
+    append_in_random_sizes(tailer, log_path, source_path.read_bytes(), seed)
+    tailer.poll()
+    assert not tailer.is_ready()
+
+    monkeypatch.setattr(log_tailer, "LOG_TAIL_SETTLE_TIME", 0)
+    tailer.poll()
+    assert tailer.is_ready() and not tailer.has_failed()
+    assert not tailer.log_data and not tailer.pending
+
+    cached_log = log_cache.load_cached_log(log_path)
+    assert repr(cached_log[0]) == repr(parse_log_file(log_path))
+
+    # The log growing again after the analysis was cached is parsed anew
+    monkeypatch.setattr(log_tailer, "LOG_TAIL_SETTLE_TIME", 60)
+    generate_log(source_path, 450, seed, crlf=crlf, non_ascii=non_ascii)
+    log_path.write_bytes(b"")
+    append_in_random_sizes(tailer, log_path, source_path.read_bytes(), seed + 1)
+    tailer.poll()
+    assert not tailer.is_ready()
+
+    monkeypatch.setattr(log_tailer, "LOG_TAIL_SETTLE_TIME", 0)
+    tailer.poll()
+    assert tailer.is_ready()
+    cached_log = log_cache.load_cached_log(log_path)
+    assert repr(cached_log[0]) == repr(parse_log_file(log_path))
+
+
+def test_stop_waits_for_the_thread(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_tailer, "LOG_TAIL_SETTLE_TIME", 0)
+    log_path = tmp_path / "log.txt"
+    generate_log(log_path, 100)
+
+    tailer = LogTailer(log_path)
+    tailer.start()
+    thread = tailer._thread
+    tailer.stop()
+    assert not thread.is_alive()
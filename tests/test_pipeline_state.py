@@ -0,0 +1,97 @@
+from pathlib import Path
+
+from gui_collect.backend.analysis.LogAnalysis import LogAnalysis, analyze_log_data
+from gui_collect.backend.analysis.log_parser import parse_log_file
+from gui_collect.backend.utils.buffer_utils.structs import BufferType
+
+from .test_log_parser import legacy_parse_frame_analysis_log_file
+
+
+VS_HASH = "1111111111111111"
+PS_HASH = "2222222222222222"
+
+LOG_LINES = [
+    "analyse_options: 00000000",
+    "000001 IASetIndexBuffer(pIndexBuffer:0x1, Format:57, Offset:0) hash=aaaaaaaa",
+    f"000001 VSSetShader(pVertexShader:0x1) hash={VS_HASH}",
+    f"000001 PSSetShader(pPixelShader:0x1) hash={PS_HASH}",
+    "000001 DrawIndexed(IndexCount:3, StartIndexLocation:0, BaseVertexLocation:0)",
+    "000002 DrawIndexed(IndexCount:6, StartIndexLocation:3, BaseVertexLocation:0)",
+    "000003 Dispatch(ThreadGroupCountX:1, ThreadGroupCountY:1, ThreadGroupCountZ:1)",
+    "000004 DrawIndexed(IndexCount:9, StartIndexLocation:9, BaseVertexLocation:0)",
+    "000005 IASetIndexBuffer(pIndexBuffer:0x1, Format:57, Offset:0) hash=bbbbbbbb",
+    "000005 DrawIndexedInstancedIndirect(pBufferForArgs:0x1, AlignedByteOffsetForArgs:0)",
+    "000006 DrawIndexed(IndexCount:3, StartIndexLocation:18, BaseVertexLocation:0)",
+    "000007 IASetIndexBuffer(pIndexBuffer:0x0000000000000000, Format:0, Offset:0)",
+    "000007 DrawIndexed(IndexCount:3, StartIndexLocation:21, BaseVertexLocation:0)",
+    "000008 IASetIndexBuffer(pIndexBuffer:0x1, Format:57, Offset:0) hash=bbbbbbbb",
+    "000008 DrawIndexed(IndexCount:3, StartIndexLocation:0, BaseVertexLocation:0)",
+    "000009 DrawIndexed(IndexCount:3, StartIndexLocation:3, BaseVertexLocation:0)",
+    "000010 Dispatch(ThreadGroupCountX:1, ThreadGroupCountY:1, ThreadGroupCountZ:1)",
+    "",
+]
+
+
+def create_log_analysis(frame_analysis_path: Path, parsed_log: tuple):
+    # Skips __init__, which reads log.txt and needs the texture manager
+    log_analysis = LogAnalysis.__new__(LogAnalysis)
+    log_analysis.frame_analysis_path = frame_analysis_path
+    log_analysis.lazy = False
+    (
+        log_analysis.log_data,
+        log_analysis.pipeline_states,
+        log_analysis.log_index,
+        log_analysis.copy_graph,
+    ) = parsed_log
+    return log_analysis
+
+
+def test_index_buffer_carries_over_until_rebound(tmp_path):
+    """
+    An indexed draw call that doesn't bind an index buffer uses the last
+    one bound, however far back. Binding one counts even when a reset later
+    in the same draw id drops the rest of its data, and unbinding it leaves
+    later draw calls without an index buffer.
+
+    The legacy parser only copied the index buffer bound two draw ids back
+    into the draw id before, so a draw id in between that didn't bind one
+    stopped it from carrying over.
+    """
+    log_path = tmp_path / "log.txt"
+    log_path.write_text("\n".join(LOG_LINES))
+    log_analysis = create_log_analysis(
+        tmp_path, analyze_log_data(parse_log_file(log_path))
+    )
+
+    assert log_analysis.get_relevant_ids("aaaaaaaa", BufferType.IB) == [
+        "000001",
+        "000002",
+        "000004",
+    ]
+    assert log_analysis.get_relevant_ids("bbbbbbbb", BufferType.IB) == [
+        "000006",
+        "000008",
+        "000009",
+    ]
+    assert log_analysis.get_ib_hash("000006") == "bbbbbbbb"
+    assert log_analysis.get_ib_hash("000007") is None
+    assert log_analysis.get_vertex_shader_hash("000009") == VS_HASH
+    assert log_analysis.get_pixel_shader_hash("000009") == PS_HASH
+
+    legacy_log_data = legacy_parse_frame_analysis_log_file(log_path)
+    assert [
+        draw_id
+        for draw_id, draw_data in legacy_log_data.items()
+        if draw_data.get("IASetIndexBuffer") == "aaaaaaaa"
+    ] == ["000001", "000002"]
+
+
+def test_draw_calls_binding_nothing_share_the_previous_state(tmp_path):
+    log_path = tmp_path / "log.txt"
+    log_path.write_text("\n".join(LOG_LINES))
+    pipeline_states = analyze_log_data(parse_log_file(log_path))[1]
+
+    assert pipeline_states[2] is pipeline_states[1]
+    assert pipeline_states[3] is pipeline_states[1]
+    assert pipeline_states[8] is not pipeline_states[7]
+    assert pipeline_states[8].vs_hash is pipeline_states[1].vs_hash
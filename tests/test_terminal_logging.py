@@ -0,0 +1,31 @@
+import logging
+import threading
+
+from gui_collect.common import get_terminal_logging_handler
+
+
+def test_records_from_other_threads_wait_for_the_main_thread():
+    emitted = []
+    handler = get_terminal_logging_handler(emitted.append)
+    logger = logging.getLogger("tests.terminal_logging")
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    try:
+        thread = threading.Thread(target=logger.info, args=["from worker"])
+        thread.start()
+        thread.join()
+        assert emitted == []
+
+        # Pending records are emitted first, in the order they were logged
+        logger.info("from main")
+        assert ["from worker" in msg for msg in emitted] == [True, False]
+        assert "from main" in emitted[1]
+
+        thread = threading.Thread(target=logger.info, args=["from worker again"])
+        thread.start()
+        thread.join()
+        handler.emit_pending()
+        assert len(emitted) == 3 and "from worker again" in emitted[2]
+    finally:
+        logger.removeHandler(handler)